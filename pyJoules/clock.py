@@ -0,0 +1,119 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+from typing import Union
+
+#: wall clock (time.time), timestamps are stored as float seconds
+WALL_CLOCK = 'wall'
+#: performance counter (time.perf_counter_ns), timestamps are stored as integer nanoseconds
+PERF_COUNTER_CLOCK = 'perf_counter_ns'
+#: monotonic clock (time.monotonic_ns), timestamps are stored as integer nanoseconds
+MONOTONIC_CLOCK = 'monotonic_ns'
+
+
+class Clock:
+    """
+    Clock used by an energy meter to timestamp its measures. Raw timestamps are converted to wall clock timestamps and
+    durations in seconds when the energy trace is generated
+    """
+
+    #: True if the clock returns integer timestamps
+    integer = False
+
+    def now(self) -> Union[int, float]:
+        """
+        :return: the current raw timestamp
+        """
+        raise NotImplementedError()
+
+    def anchor(self):
+        """
+        record the wall clock time corresponding to the current raw timestamp. Called when a new trace begins
+        """
+
+    def to_timestamp(self, raw_timestamp):
+        """
+        :return: the wall clock timestamp (in seconds) corresponding to the given raw timestamp
+        """
+        raise NotImplementedError()
+
+    def to_duration(self, raw_duration):
+        """
+        :return: the given difference between two raw timestamps converted in seconds
+        """
+        raise NotImplementedError()
+
+
+class WallClock(Clock):
+    """
+    Float wall clock based on time.time, subject to NTP adjustments
+    """
+
+    def now(self):
+        return time.time()
+
+    def to_timestamp(self, raw_timestamp):
+        return raw_timestamp
+
+    def to_duration(self, raw_duration):
+        return raw_duration
+
+
+class NanosecondClock(Clock):
+    """
+    Integer nanosecond clock. A wall clock anchor is recorded at the beginning of each trace to convert the raw
+    timestamps into absolute timestamps
+    """
+
+    integer = True
+
+    def __init__(self, clock_name: str):
+        """
+        :param clock_name: name of the time module function used to read the clock
+        """
+        self._clock_name = clock_name
+        self.wall_clock_anchor = None
+        self.raw_anchor = None
+        self.anchor()
+
+    def now(self):
+        return getattr(time, self._clock_name)()
+
+    def anchor(self):
+        self.raw_anchor = self.now()
+        self.wall_clock_anchor = time.time()
+
+    def to_timestamp(self, raw_timestamp):
+        return self.wall_clock_anchor + (raw_timestamp - self.raw_anchor) / 1e9
+
+    def to_duration(self, raw_duration):
+        return raw_duration / 1e9
+
+
+def create_clock(clock_name: str) -> Clock:
+    """
+    :param clock_name: WALL_CLOCK, PERF_COUNTER_CLOCK or MONOTONIC_CLOCK
+    :raise ValueError: if the clock name is unknown
+    """
+    if clock_name == WALL_CLOCK:
+        return WallClock()
+    if clock_name in (PERF_COUNTER_CLOCK, MONOTONIC_CLOCK):
+        return NanosecondClock(clock_name)
+    raise ValueError('unknown clock : ' + str(clock_name))
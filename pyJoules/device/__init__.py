@@ -21,3 +21,4 @@
 from .domain import Domain
 from .device import Device, NotConfiguredDeviceException
 from .device_factory import DeviceFactory
+from .device_registry import DeviceRegistry, get_device_registry
@@ -59,8 +59,13 @@ class Device:
             domains = self._available_domains
         else:
             # check if given domain list are available
+            try:
+                available_domains = set(self._available_domains)
+            except TypeError:
+                # domains defined outside of pyJoules may not be hashable
+                available_domains = self._available_domains
             for domain in domains:
-                if domain not in self._available_domains:
+                if domain not in available_domains:
                     raise NoSuchDomainError(domain)
 
         self._configured_domains = domains
@@ -85,3 +90,25 @@ class Device:
             raise NotConfiguredDeviceException
 
         return self._configured_domains
+
+    def get_max_energy_ranges(self) -> List[Optional[float]]:
+        """
+        Get the values at which the energy counters of the configured domains wrap around
+
+        :return: a list containing, for each configured domain, the range of its energy counter or None if this counter
+                 never wraps around. Value order is the same than the configured domain order
+        :raise NotConfiguredDeviceException: if the device was not configured
+        """
+        return [None] * len(self.get_configured_domains())
+
+    def close(self):
+        """
+        Release the system resources (file descriptors, library handles, ...) acquired by the device when it was
+        configured. Calling :py:meth:`pyJoules.device.Device.get_energy` on a closed device acquires them again
+        """
+
+    def __enter__(self) -> 'Device':
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
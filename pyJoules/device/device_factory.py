@@ -23,24 +23,33 @@ import logging
 from operator import add
 from . import Domain, Device
 from .rapl_device import RaplDevice
-try:
-    from .nvidia_device import NvidiaGPUDevice
-except ImportError: 
-    NvidiaGPUDevice=None
-    logging.warning('pynvml not found you can\'t use NVIDIA devices') 
-
+from ..optional_dependency import load_module
 from ..exception import NoSuchDeviceError
 
 from functools import reduce
 
 
+def _load_nvidia_device_type():
+    """
+    import the nvidia device module on first use, as it depends on pynvml whose import is slow
+
+    :return: NvidiaGPUDevice class, None if pynvml is not installed
+    """
+    if load_module('pynvml') is None:
+        logging.warning('pynvml not found you can\'t use NVIDIA devices')
+        return None
+    from .nvidia_device import NvidiaGPUDevice
+    return NvidiaGPUDevice
+
+
 class DeviceFactory:
 
     @staticmethod
     def _gen_all_available_domains() -> List[Device]:
         available_api = [RaplDevice]
-        if NvidiaGPUDevice is not None : 
-            available_api.append(NvidiaGPUDevice)
+        nvidia_device_type = _load_nvidia_device_type()
+        if nvidia_device_type is not None:
+            available_api.append(nvidia_device_type)
         available_domains = []
         for api in available_api:
             try:
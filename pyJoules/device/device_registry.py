@@ -0,0 +1,108 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import threading
+from typing import List, Optional
+
+from . import Domain, Device
+from .device_factory import DeviceFactory
+
+
+class DeviceRegistry:
+    """
+    Process wide cache of configured devices, shared by the decorators and the context managers monitoring the same
+    domains. Each acquired device list is reference counted. Devices stay open when their last user releases them, so
+    contexts created for each measure reuse the already opened devices. They are closed by :py:meth:`shutdown`
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @staticmethod
+    def _gen_key(domains):
+        if domains is None:
+            return None
+        return tuple((type(domain), str(domain)) for domain in domains)
+
+    def acquire(self, domains: Optional[List[Domain]] = None) -> List[Device]:
+        """
+        Return the devices configured with the given domains, create them if they are not already cached. The
+        returned list is shared between all the users of these domains and must not be modified
+
+        :param domains: a list of Domain instance that as to be monitored (if None, all the monitorable domains)
+        :raise NoSuchDeviceError: if a domain depend on a device that doesn't exist on the current machine
+        :raise NoSuchDomainError: if the given domain is not available on the device
+        """
+        key = self._gen_key(domains)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = [DeviceFactory.create_devices(domains), 0]
+                self._entries[key] = entry
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, devices: List[Device]):
+        """
+        Release devices returned by :py:meth:`DeviceRegistry.acquire`. Devices without users stay open and cached until
+        :py:meth:`shutdown` is called
+
+        :raise ValueError: if the devices were not acquired from this registry
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                if entry[0] is devices:
+                    break
+            else:
+                raise ValueError('devices were not acquired from this registry')
+
+            entry[1] = max(entry[1] - 1, 0)
+
+    def get_reference_count(self, devices: List[Device]) -> int:
+        """
+        :return: number of users of the given devices, 0 if they are not cached by this registry
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                if entry[0] is devices:
+                    return entry[1]
+            return 0
+
+    def shutdown(self):
+        """
+        Close all the cached devices and empty the registry
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries = {}
+        for devices, _ in entries:
+            for device in devices:
+                device.close()
+
+
+_DEVICE_REGISTRY = DeviceRegistry()
+
+
+def get_device_registry() -> DeviceRegistry:
+    """
+    :return: the registry used by :py:func:`pyJoules.energy_meter.measure_energy` and
+             :py:class:`pyJoules.energy_meter.EnergyContext`
+    """
+    return _DEVICE_REGISTRY
@@ -19,11 +19,54 @@
 # SOFTWARE.
 
 
+import inspect
+import itertools
+import threading
+
+
+def _create_domain(domain_type, args, kwargs):
+    return domain_type(*args, **kwargs)
+
+
 class Domain:
     """
     Identify a domain, a monitorable sub-part of a device
+
+    Domains are interned : creating a domain with the same parameters than an existing one return the existing
+    instance. Each domain instance has a stable integer index, that can be used to address per domain values
+
+    :var index: index of the domain, unique in the current process
+    :vartype index: int
     """
 
+    _instances = {}
+    _index_counter = itertools.count()
+    _instances_lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if kwargs:
+            # give the same key to domains created with positional or keyword arguments
+            bound_arguments = inspect.signature(cls.__init__).bind(None, *args, **kwargs)
+            args, kwargs = bound_arguments.args[1:], bound_arguments.kwargs
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        instance = Domain._instances.get(key)
+        if instance is not None:
+            return instance
+
+        with Domain._instances_lock:
+            instance = Domain._instances.get(key)
+            if instance is None:
+                instance = object.__new__(cls)
+                instance.index = next(Domain._index_counter)
+                instance._new_args = (args, kwargs)
+                Domain._instances[key] = instance
+        return instance
+
+    def __reduce__(self):
+        # unpickled domains are created again, so they get the interned instance and the index of the current process
+        args, kwargs = self._new_args
+        return _create_domain, (type(self), args, kwargs)
+
     def __repr__(self) -> str:
         raise NotImplementedError()
 
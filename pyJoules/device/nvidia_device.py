@@ -38,6 +38,9 @@ class NvidiaGPUDomain(Domain):
     def __eq__(self, other) -> bool:
         return isinstance(other, NvidiaGPUDomain) and self.__repr__() == other.__repr__()
 
+    def __hash__(self) -> int:
+        return hash(self._repr)
+
     def __lt__(self, other) -> bool:
         if isinstance(other, NvidiaGPUDomain):
             return self.device_id < other.device_id
@@ -18,10 +18,12 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import os
+import threading
 from typing import List
 
 from . import Device, Domain, NotConfiguredDeviceException
 from pyJoules.exception import NoSuchDeviceError
+from .rapl_topology import RAPL_API_DIR, get_topology
 
 
 class RaplDomain(Domain):
@@ -49,6 +51,9 @@ class RaplDomain(Domain):
     def __eq__(self, other) -> bool:
         return isinstance(other, RaplDomain) and self.__repr__() == other.__repr__()
 
+    def __hash__(self) -> int:
+        return hash(self._repr)
+
     def __lt__(self, other) -> bool:
         if isinstance(other, RaplDomain):
             return self.__repr__() < other.__repr__()
@@ -80,7 +85,8 @@ class RaplPackageDomain(RaplDomain):
         return "package"
 
 
-RAPL_API_DIR = '/sys/class/powercap/intel-rapl'
+# energy_uj files contain an unsigned 64 bits integer followed by a new line character
+ENERGY_FILE_READ_SIZE = 24
 
 
 class RaplDevice(Device):
@@ -94,6 +100,12 @@ class RaplDevice(Device):
         """
         Device.__init__(self)
         self._api_file_names = None
+        self._api_fds = None
+        self._max_energy_ranges = None
+        self._read_buffer = bytearray(ENERGY_FILE_READ_SIZE)
+        self._read_view = memoryview(self._read_buffer)
+        # devices may be shared between threads by the device registry, the read buffer is protected by this lock
+        self._lock = threading.Lock()
 
     @staticmethod
     def _rapl_api_available():
@@ -111,110 +123,97 @@ class RaplDevice(Device):
                 RaplDevice.available_core_domains() + RaplDevice.available_uncore_domains())
 
     @staticmethod
-    def _get_socket_id_list():
-        socket_id_list = []
-        socket_id = 0
-        while True:
-            name = RAPL_API_DIR + '/intel-rapl:' + str(socket_id)
-            if os.path.exists(name):
-                socket_id_list.append(socket_id)
-                socket_id += 1
-            else:
-                return socket_id_list
+    def _available_domains_of_type(domain_type, domain_name):
+        return [domain_type(socket_id) for socket_id in get_topology().get_sockets(domain_name)]
 
     @staticmethod
     def available_package_domains() -> List[RaplPackageDomain]:
         """
         return a the list of the available energy Package domains
         """
-        package_domains = []
-
-        for socket_id in RaplDevice._get_socket_id_list():
-            domain_name_file_str = RAPL_API_DIR + '/intel-rapl:' + str(socket_id) + '/name'
-            if os.path.exists(domain_name_file_str):
-                 with open(domain_name_file_str) as domain_name_file:
-                     if domain_name_file.readline() == 'package-' + str(socket_id) + '\n':
-                         package_domains.append(RaplPackageDomain(socket_id))
-        return package_domains
-
-    @staticmethod
-    def _domain_exist_on_socket(socket_id, domain_name):
-        domain_id = 0
-        while True:
-            domain_name_file_str = (RAPL_API_DIR + '/intel-rapl:' + str(socket_id) + '/intel-rapl:' + str(socket_id) +
-                                    ':' + str(domain_id) + '/name')
-            if os.path.exists(domain_name_file_str):
-                with open(domain_name_file_str) as domain_name_file:
-                    if domain_name_file.readline() == domain_name + '\n':
-                        return True
-                    domain_id += 1
-            else:
-                return False
+        return RaplDevice._available_domains_of_type(RaplPackageDomain, 'package')
 
     @staticmethod
     def available_dram_domains() -> List[RaplDramDomain]:
         """
         return a the list of the available energy Dram domains
         """
-        dram_domains = []
-        for socket_id in RaplDevice._get_socket_id_list():
-            if RaplDevice._domain_exist_on_socket(socket_id, 'dram'):
-                dram_domains.append(RaplDramDomain(socket_id))
-        return dram_domains
+        return RaplDevice._available_domains_of_type(RaplDramDomain, 'dram')
 
     @staticmethod
     def available_core_domains() -> List[RaplCoreDomain]:
         """
         return a the list of the available energy Core domains
         """
-        core_domains = []
-        for socket_id in RaplDevice._get_socket_id_list():
-            if RaplDevice._domain_exist_on_socket(socket_id, 'core'):
-                core_domains.append(RaplCoreDomain(socket_id))
-        return core_domains
+        return RaplDevice._available_domains_of_type(RaplCoreDomain, 'core')
 
     @staticmethod
     def available_uncore_domains() -> List[RaplUncoreDomain]:
         """
         return a the list of the available energy Uncore domains
         """
-        uncore_domains = []
-        for socket_id in RaplDevice._get_socket_id_list():
-            if RaplDevice._domain_exist_on_socket(socket_id, 'uncore'):
-                uncore_domains.append(RaplUncoreDomain(socket_id))
-        return uncore_domains
+        return RaplDevice._available_domains_of_type(RaplUncoreDomain, 'uncore')
 
     def _get_domain_file_name(self, domain):
-        socket_id = domain.socket
-
-        if isinstance(domain, RaplPackageDomain):
-            return RAPL_API_DIR + '/intel-rapl:' + str(socket_id) + '/energy_uj'
-
-        domain_id = 0
-        while True:
-            domain_name_file_str = (RAPL_API_DIR + '/intel-rapl:' + str(socket_id) + '/intel-rapl:' + str(socket_id) +
-                                    ':' + str(domain_id) + '/name')
-            if os.path.exists(domain_name_file_str):
-                with open(domain_name_file_str) as domain_name_file:
-                    if domain_name_file.readline() == domain.get_domain_name() + '\n':
-                        return (RAPL_API_DIR + '/intel-rapl:' + str(socket_id) + '/intel-rapl:' + str(socket_id) + \
-                            ':' + str(domain_id) + '/energy_uj')
-                    else:
-                        domain_id += 1
-            else:
-                raise ValueError()
+        try:
+            return get_topology().get_energy_file_name(domain.get_domain_name(), domain.socket)
+        except KeyError:
+            raise ValueError()
 
     def _collect_domain_api_file_name(self, domain_list):
         return [self._get_domain_file_name(domain) for domain in domain_list]
 
+    @staticmethod
+    def _get_max_energy_range(domain):
+        return get_topology().get_max_energy_range(domain.get_domain_name(), domain.socket)
+
     def configure(self, domains=None):
+        self.close()
         Device.configure(self, domains)
 
         self._api_file_names = self._collect_domain_api_file_name(self._configured_domains)
+        self._max_energy_ranges = [self._get_max_energy_range(domain) for domain in self._configured_domains]
+        self._open_api_files()
+
+    def _open_api_files(self):
+        fds = []
+        try:
+            for api_file_name in self._api_file_names:
+                fds.append(os.open(api_file_name, os.O_RDONLY))
+        except OSError:
+            for fd in fds:
+                os.close(fd)
+            raise
+        self._api_fds = fds
+
+    def get_max_energy_ranges(self):
+        """
+        :return: for each configured domain, the value of its max_energy_range_uj file (read when the device was
+                 configured) or None if this file is not available
+        """
+        if self._max_energy_ranges is None:
+            raise NotConfiguredDeviceException()
+        return self._max_energy_ranges
+
+    def close(self):
+        """
+        close the energy files opened when the device was configured
+        """
+        with self._lock:
+            if self._api_fds is None:
+                return
+            for fd in self._api_fds:
+                os.close(fd)
+            self._api_fds = None
 
-    def _read_energy_value(self, api_file):
-        return float(api_file.readline())
+    def _read_energy_value(self, api_fd):
+        read_size = os.preadv(api_fd, [self._read_buffer], 0)
+        return float(self._read_view[:read_size])
 
     def get_energy(self):
-        energies = [self._read_energy_value(open(api_file_name, 'r')) for api_file_name in self._api_file_names]
-        return energies
+        with self._lock:
+            if self._api_fds is None:
+                if self._api_file_names is None:
+                    raise NotConfiguredDeviceException()
+                self._open_api_files()
+            return [self._read_energy_value(api_fd) for api_fd in self._api_fds]
@@ -0,0 +1,215 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+
+from ..exception import NoSuchDeviceError
+
+
+RAPL_API_DIR = '/sys/class/powercap/intel-rapl'
+BOOT_ID_FILE = '/proc/sys/kernel/random/boot_id'
+
+ZONE_PREFIX = 'intel-rapl:'
+PACKAGE_DOMAIN_NAME = 'package'
+SUBZONE_DOMAIN_NAMES = ('dram', 'core', 'uncore')
+
+
+class RaplTopology:
+    """
+    Index of the RAPL domains exposed by the powercap sysfs. Each domain, identified by its name (package, dram, core
+    or uncore) and its socket id, is mapped to its energy file and to the range of its energy counter
+    """
+
+    def __init__(self, domains: Dict[Tuple[str, int], Tuple[str, Optional[float]]]):
+        """
+        :param domains: dictionary mapping (domain name, socket id) tuples to (energy file name, max energy range)
+                        tuples
+        """
+        self._domains = domains
+
+    def get_sockets(self, domain_name: str) -> List[int]:
+        """
+        :return: sorted list of the socket ids on which the given domain is available
+        """
+        return sorted(socket_id for name, socket_id in self._domains if name == domain_name)
+
+    def get_energy_file_name(self, domain_name: str, socket_id: int) -> str:
+        """
+        :return: the name of the file containing the energy consumed by the given domain
+        :raise KeyError: if the domain isn't available
+        """
+        return self._domains[(domain_name, socket_id)][0]
+
+    def get_max_energy_range(self, domain_name: str, socket_id: int) -> Optional[float]:
+        """
+        :return: the range of the energy counter of the given domain or None if it isn't exposed
+        :raise KeyError: if the domain isn't available
+        """
+        return self._domains[(domain_name, socket_id)][1]
+
+    def to_dict(self) -> Dict:
+        """
+        :return: a json serializable representation of the topology
+        """
+        return {'domains': [[name, socket_id, file_name, max_range]
+                            for (name, socket_id), (file_name, max_range) in self._domains.items()]}
+
+    @staticmethod
+    def from_dict(topology_dict: Dict) -> 'RaplTopology':
+        """
+        build a topology from the representation returned by :py:meth:`RaplTopology.to_dict`
+        """
+        domains = {}
+        for name, socket_id, file_name, max_range in topology_dict['domains']:
+            domains[(name, socket_id)] = (file_name, max_range)
+        return RaplTopology(domains)
+
+    @staticmethod
+    def scan(api_dir: str = RAPL_API_DIR) -> 'RaplTopology':
+        """
+        build the topology by walking the powercap sysfs once
+
+        :raise NoSuchDeviceError: if the RAPL API isn't available on this machine
+        """
+        try:
+            zone_entries = list(os.scandir(api_dir))
+        except OSError:
+            raise NoSuchDeviceError()
+
+        domains = {}
+        for zone_entry in sorted(zone_entries, key=lambda entry: entry.name):
+            socket_id = _parse_zone_id(zone_entry.name)
+            if socket_id is None or not zone_entry.is_dir():
+                continue
+
+            if _read_zone_name(zone_entry.path) == PACKAGE_DOMAIN_NAME + '-' + str(socket_id):
+                domains[(PACKAGE_DOMAIN_NAME, socket_id)] = _read_zone_files(zone_entry.path)
+
+            for subzone_entry in sorted(os.scandir(zone_entry.path), key=lambda entry: entry.name):
+                if not subzone_entry.name.startswith(zone_entry.name + ':') or not subzone_entry.is_dir():
+                    continue
+                domain_name = _read_zone_name(subzone_entry.path)
+                if domain_name in SUBZONE_DOMAIN_NAMES and (domain_name, socket_id) not in domains:
+                    domains[(domain_name, socket_id)] = _read_zone_files(subzone_entry.path)
+
+        return RaplTopology(domains)
+
+
+def _parse_zone_id(entry_name):
+    if not entry_name.startswith(ZONE_PREFIX):
+        return None
+    zone_id = entry_name[len(ZONE_PREFIX):]
+    return int(zone_id) if zone_id.isdigit() else None
+
+
+def _read_zone_name(zone_dir_name):
+    try:
+        with open(os.path.join(zone_dir_name, 'name'), 'r') as name_file:
+            return name_file.readline().rstrip('\n')
+    except OSError:
+        return None
+
+
+def _read_zone_files(zone_dir_name):
+    max_range = None
+    try:
+        with open(os.path.join(zone_dir_name, 'max_energy_range_uj'), 'r') as max_range_file:
+            max_range = float(max_range_file.readline())
+    except (OSError, ValueError):
+        pass
+    return os.path.join(zone_dir_name, 'energy_uj'), max_range
+
+
+def _read_boot_id():
+    try:
+        with open(BOOT_ID_FILE, 'r') as boot_id_file:
+            return boot_id_file.readline().strip()
+    except OSError:
+        return None
+
+
+def _load_cache_file(cache_file_name, boot_id):
+    try:
+        with open(cache_file_name, 'r') as cache_file:
+            content = json.load(cache_file)
+        if content['boot_id'] != boot_id or content['api_dir'] != RAPL_API_DIR:
+            return None
+        return RaplTopology.from_dict(content['topology'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_cache_file(cache_file_name, boot_id, topology):
+    tmp_file_name = cache_file_name + '.' + str(os.getpid())
+    try:
+        with open(tmp_file_name, 'w') as cache_file:
+            json.dump({'boot_id': boot_id, 'api_dir': RAPL_API_DIR, 'topology': topology.to_dict()}, cache_file)
+        os.replace(tmp_file_name, cache_file_name)
+    except OSError:
+        pass
+
+
+_topology = None
+_cache_file_name = None
+
+
+def set_topology_cache_file(cache_file_name: Optional[str]):
+    """
+    persist the RAPL topology in the given file, to share it between processes launched on the same boot. The file is
+    discarded when the machine reboots
+
+    :param cache_file_name: name of the cache file, None to disable the persistent cache
+    """
+    global _cache_file_name
+    _cache_file_name = cache_file_name
+
+
+def clear_topology_cache():
+    """
+    drop the RAPL topology cached by the current process, the next call to :py:func:`get_topology` will build it again
+    """
+    global _topology
+    _topology = None
+
+
+def get_topology() -> RaplTopology:
+    """
+    return the RAPL topology of the machine. The topology is built once per process, or loaded from the cache file if
+    one was given with :py:func:`set_topology_cache_file`
+
+    :raise NoSuchDeviceError: if the RAPL API isn't available on this machine
+    """
+    global _topology
+    if _topology is not None:
+        return _topology
+
+    if not os.path.exists(RAPL_API_DIR):
+        raise NoSuchDeviceError()
+
+    boot_id = _read_boot_id() if _cache_file_name is not None else None
+    if boot_id is not None:
+        _topology = _load_cache_file(_cache_file_name, boot_id)
+
+    if _topology is None:
+        _topology = RaplTopology.scan(RAPL_API_DIR)
+        if boot_id is not None:
+            _write_cache_file(_cache_file_name, boot_id, _topology)
+    return _topology
@@ -18,16 +18,21 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import time
+import inspect
 import operator
 import functools
 
+from array import array
 from functools import reduce
-from typing import List, Optional, Dict
+from itertools import chain
+from typing import List, Optional, Dict, Iterator, Tuple
 
+from .optional_dependency import load_numpy
+from .clock import Clock, WALL_CLOCK, create_clock
 from .exception import PyJoulesException
-from .device import Device, Domain, DeviceFactory
+from .device import Device, Domain, get_device_registry
 from .handler import EnergyHandler, PrintHandler
-from .energy_trace import EnergySample, EnergyTrace
+from .energy_trace import EnergySample, EnergyTrace, ColumnarEnergyTrace, DomainSchema
 
 class NoNextStateException(PyJoulesException):
     """Exception raised when trying to compute duration or energy from a state
@@ -58,25 +63,47 @@ class SampleNotFoundError(PyJoulesException):
     """
 
 
+STOP_TAG = '__stop__'
+
+
 class EnergyMeter:
     """
     Tool used to record the energy consumption of given devices
     """
 
-    def __init__(self, devices: List[Device], default_tag: str = ''):
+    def __init__(self, devices: List[Device], default_tag: str = '', columnar: bool = False,
+                 clock: str = WALL_CLOCK):
         """
         :param devices: list of the monitored devices
         :param default_tag: tag given if no tag were given to a measure
+        :param columnar: if True, store the measured states in a :py:class:`ColumnarStateBuffer` instead of a linked
+                         list of :py:class:`EnergyState`. This reduces the memory footprint and the trace generation
+                         time of traces with many states
+        :param clock: clock used to timestamp the measures : ``pyJoules.clock.WALL_CLOCK`` (time.time),
+                      ``pyJoules.clock.PERF_COUNTER_CLOCK`` (time.perf_counter_ns) or ``pyJoules.clock.MONOTONIC_CLOCK``
+                      (time.monotonic_ns). Nanosecond clocks are stored as integers and converted to absolute
+                      timestamps using a wall clock anchor recorded when the meter is started
+        :raise ValueError: if the clock is unknown
         """
         self.devices = devices
         self.default_tag = default_tag
+        self.clock = create_clock(clock)
 
         self._last_state = None
         self._first_state = None
+        self._state_buffer = None
+        if columnar:
+            domain_number = sum(len(device.get_configured_domains()) for device in devices)
+            self._state_buffer = ColumnarStateBuffer(domain_number, self.clock)
+
+    def _read_devices(self):
+        """
+        :return: the current timestamp and the energy values of each monitored device
+        """
+        return self.clock.now(), [device.get_energy() for device in self.devices]
 
     def _measure_new_state(self, tag):
-        timestamp = time.time()
-        values = [device.get_energy() for device in self.devices]
+        timestamp, values = self._read_devices()
 
         return EnergyState(timestamp, tag if tag is not None else self.default_tag, values)
 
@@ -84,15 +111,28 @@ class EnergyMeter:
         self._last_state.add_next_state(new_state)
         self._last_state = new_state
 
+    def _record_new_state(self, tag):
+        if self._state_buffer is None:
+            self._append_new_state(self._measure_new_state(tag))
+        else:
+            timestamp, values = self._read_devices()
+            self._state_buffer.append(timestamp, tag if tag is not None else self.default_tag, values)
+
     def _is_meter_started(self):
+        if self._state_buffer is not None:
+            return len(self._state_buffer) > 0
         return not self._first_state is None
 
     def _is_meter_stoped(self):
-        return self._last_state.tag == '__stop__'
+        if self._state_buffer is not None:
+            return self._state_buffer.last_tag() == STOP_TAG
+        return self._last_state.tag == STOP_TAG
 
     def _reinit(self):
         self._first_state = None
         self._last_state = None
+        if self._state_buffer is not None:
+            self._state_buffer.clear()
 
     def start(self, tag: Optional[str] = None):
         """
@@ -100,6 +140,12 @@ class EnergyMeter:
 
         :param tag: sample name
         """
+        self.clock.anchor()
+        if self._state_buffer is not None:
+            self._state_buffer.clear()
+            self._record_new_state(tag)
+            return
+
         new_state = self._measure_new_state(tag)
         self._first_state = new_state
         self._last_state = new_state
@@ -114,8 +160,7 @@ class EnergyMeter:
         if not self._is_meter_started():
             raise EnergyMeterNotStartedError()
 
-        new_state = self._measure_new_state(tag)
-        self._append_new_state(new_state)
+        self._record_new_state(tag)
 
     def resume(self, tag: Optional[str] = None):
         """
@@ -130,8 +175,7 @@ class EnergyMeter:
         if not self._is_meter_stoped():
             raise EnergyMeterNotStoppedError()
 
-        new_state = self._measure_new_state(tag)
-        self._append_new_state(new_state)
+        self._record_new_state(tag)
 
     def stop(self):
         """
@@ -142,8 +186,7 @@ class EnergyMeter:
         if not self._is_meter_started():
             raise EnergyMeterNotStartedError()
 
-        new_state = self._measure_new_state('__stop__')
-        self._append_new_state(new_state)
+        self._record_new_state(STOP_TAG)
 
     def get_trace(self) -> EnergyTrace:
         """
@@ -159,15 +202,42 @@ class EnergyMeter:
 
         return self._generate_trace()
 
+    def iter_trace(self) -> Iterator[EnergySample]:
+        """
+        return an iterator on the samples of the last trace measured. Samples are generated lazily, the meter must not
+        be restarted until the end of the iteration
+
+        :raise EnergyMeterNotStoppedError: if the energy meter isn't stopped
+        """
+        if not self._is_meter_started():
+            return iter([])
+
+        if not self._is_meter_stoped():
+            raise EnergyMeterNotStoppedError()
+
+        domains = self._get_domain_list()
+        max_energy_ranges = self._get_max_energy_range_list()
+        if self._state_buffer is not None:
+            return self._state_buffer.iter_samples(domains, max_energy_ranges)
+        return TraceGenerator(self._first_state, domains, max_energy_ranges, self.clock).iter_samples()
+
     def _get_domain_list(self):
         """
         return the list of all monitored domains for each monitored energy devices
         """
         return reduce(operator.add, [device.get_configured_domains() for device in self.devices])
 
+    def _get_max_energy_range_list(self):
+        """
+        return the list of the energy counters ranges of all monitored domains, in the same order than the domain list
+        """
+        return reduce(operator.add, [device.get_max_energy_ranges() for device in self.devices])
+
     def _generate_trace(self):
         domains = self._get_domain_list()
-        generator = TraceGenerator(self._first_state, domains)
+        if self._state_buffer is not None:
+            return self._state_buffer.generate_trace(domains, self._get_max_energy_range_list())
+        generator = TraceGenerator(self._first_state, domains, self._get_max_energy_range_list(), self.clock)
         return generator.generate()
 
     def gen_idle(self, trace: EnergyTrace) -> List[Dict[str, float]]:
@@ -186,33 +256,57 @@ class EnergyMeter:
             self.stop()
 
         for sample in self.get_trace():
-            idle_values.append(sample.energy)
+            idle_values.append(dict(sample.energy))
 
         return idle_values
 
 
+_domain_schemas = {}
+
+
+def _get_domain_schema(domains: List[Domain]) -> DomainSchema:
+    """
+    :return: the schema of the given domains names. Schemas are cached by domain indexes to avoid building the domain
+             names for each trace
+    """
+    try:
+        key = tuple(domain.index for domain in domains)
+    except AttributeError:
+        return DomainSchema.get(str(domain) for domain in domains)
+    schema = _domain_schemas.get(key)
+    if schema is None:
+        schema = DomainSchema.get(str(domain) for domain in domains)
+        _domain_schemas[key] = schema
+    return schema
+
+
 class TraceGenerator:
 
-    def __init__(self, first_state, domains):
+    def __init__(self, first_state, domains, max_energy_ranges=None, clock: Optional[Clock] = None):
         self.domains = domains
+        self.schema = _get_domain_schema(domains)
+        self.max_energy_ranges = max_energy_ranges
+        self.clock = clock if clock is not None else create_clock(WALL_CLOCK)
         self._current_state = first_state
 
-    def generate(self):
-        def generate_next(current_state, samples):
-            if current_state.next_state is None:
-                return samples
-            if current_state.tag == '__stop__':
-                return generate_next(current_state.next_state, samples)
-
-            sample = self._gen_sample(current_state)
-            samples.append(sample)
-            return generate_next(current_state.next_state, samples)
+    def iter_samples(self) -> Iterator[EnergySample]:
+        """
+        lazily generate the samples of the trace, one sample for each state that is not the last state of the trace
+        nor a stop state
+        """
+        current_state = self._current_state
+        while current_state.next_state is not None:
+            if current_state.tag != STOP_TAG:
+                yield self._gen_sample(current_state)
+            current_state = current_state.next_state
 
-        samples = generate_next(self._current_state, [])
-        return EnergyTrace(samples)
+    def generate(self) -> EnergyTrace:
+        return EnergyTrace(self.iter_samples())
 
     def _gen_sample(self, state):
-        return EnergySample(state.timestamp, state.tag, state.compute_duration(), state.compute_energy(self.domains))
+        return EnergySample.from_values(self.clock.to_timestamp(state.timestamp), state.tag,
+                                        self.clock.to_duration(state.compute_duration()), self.schema,
+                                        state.compute_energy_values(self.max_energy_ranges))
 
 
 class EnergyState:
@@ -250,9 +344,12 @@ class EnergyState:
 
         return self.next_state.timestamp - self.timestamp
 
-    def compute_energy(self, domains) -> List[float]:
+    def compute_energy_values(self, max_energy_ranges: Optional[List[Optional[float]]] = None) -> Tuple[float, ...]:
         """
-        :return: compute the energy consumed between the current state and the next state
+        :param max_energy_ranges: range of the energy counter of each domain (None if the counter never wraps around),
+                                  used to correct the energy consumed by a domain when its counter overflowed
+        :return: compute the energy consumed by each domain between the current state and the next state, in the
+                 measured values order
         :raise NoNextStateException: if the state is the last state of the trace
         """
         if self.next_state is None:
@@ -263,15 +360,22 @@ class EnergyState:
             for next_value, current_value in zip(next_state_device, current_state_device):
                 energy.append(next_value - current_value)
 
-        values_dict = {}
-        for value, key in zip(energy, domains):
-            if value < 0:
-                device = key.get_device_type()
-                domain_dirname = device._get_domain_file_name(None, key)[:-9]
-                with open(domain_dirname + 'max_energy_range_uj', 'r') as file:
-                    value += float(file.readline())
-            values_dict[str(key)] = value
-        return values_dict
+        if max_energy_ranges is not None:
+            for index, (value, max_energy_range) in enumerate(zip(energy, max_energy_ranges)):
+                if value < 0 and max_energy_range is not None:
+                    energy[index] = value + max_energy_range
+        return tuple(energy)
+
+    def compute_energy(self, domains, max_energy_ranges: Optional[List[Optional[float]]] = None) -> Dict[str, float]:
+        """
+        :param domains: monitored domains, in the same order than the measured values
+        :param max_energy_ranges: range of the energy counter of each domain (None if the counter never wraps around),
+                                  used to correct the energy consumed by a domain when its counter overflowed
+        :return: compute the energy consumed between the current state and the next state
+        :raise NoNextStateException: if the state is the last state of the trace
+        """
+        values = self.compute_energy_values(max_energy_ranges)
+        return {str(key): value for key, value in zip(domains, values)}
 
     def add_next_state(self, state: 'EnergyState'):
         """
@@ -283,16 +387,195 @@ class EnergyState:
         self.next_state = state
 
 
+class ColumnarStateBuffer:
+    """
+    Internal class that store the energy states measured by an EnergyMeter as columns of raw values : one column for
+    the timestamps, one for the tag ids and one for each monitored domain
+    """
+
+    def __init__(self, domain_number: int, clock: Optional[Clock] = None, capacity: Optional[int] = None):
+        """
+        :param domain_number: number of monitored domains, for all the monitored devices
+        :param clock: clock used to timestamp the stored states, integer clocks are stored as 64 bits integers
+        :param capacity: maximum number of stored states. When the buffer is full, new states overwrite the oldest
+                         ones. If None, the buffer grows without limit
+        """
+        if capacity is not None and capacity < 2:
+            raise ValueError('buffer capacity must be at least 2')
+        self.clock = clock if clock is not None else create_clock(WALL_CLOCK)
+        self.capacity = capacity
+        self._timestamp_typecode = 'q' if self.clock.integer else 'd'
+        self.timestamps = array(self._timestamp_typecode)
+        self.tag_ids = array('L')
+        self.energy_columns = [array('d') for _ in range(domain_number)]
+        self._oldest = 0
+        self._tags = []
+        self._tag_ids = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def clear(self):
+        """
+        remove all the stored states
+        """
+        self.timestamps = array(self._timestamp_typecode)
+        self.tag_ids = array('L')
+        self.energy_columns = [array('d') for _ in self.energy_columns]
+        self._oldest = 0
+
+    def _get_tag_id(self, tag):
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = len(self._tags)
+            self._tags.append(tag)
+            self._tag_ids[tag] = tag_id
+        return tag_id
+
+    def append(self, timestamp: float, tag: str, values: List[List[float]]):
+        """
+        store a new state
+
+        :param timestamp: timestamp of the measure
+        :param tag: tag of the measure
+        :param values: measured energy consumption values for each monitored device
+        """
+        if self.capacity is not None and len(self) == self.capacity:
+            self._overwrite_oldest(timestamp, tag, values)
+            return
+
+        self.timestamps.append(timestamp)
+        self.tag_ids.append(self._get_tag_id(tag))
+        for column, value in zip(self.energy_columns, chain.from_iterable(values)):
+            column.append(value)
+
+    def _overwrite_oldest(self, timestamp, tag, values):
+        index = self._oldest
+        self.timestamps[index] = timestamp
+        self.tag_ids[index] = self._get_tag_id(tag)
+        for column, value in zip(self.energy_columns, chain.from_iterable(values)):
+            column[index] = value
+        self._oldest = (index + 1) % self.capacity
+
+    def last_tag(self) -> Optional[str]:
+        """
+        :return: tag of the last stored state, None if the buffer is empty
+        """
+        if len(self.tag_ids) == 0:
+            return None
+        return self._tags[self.tag_ids[self._oldest - 1]]
+
+    def _ordered(self, column):
+        if self._oldest == 0:
+            return column
+        return column[self._oldest:] + column[:self._oldest]
+
+    def _compute_numpy_columns(self, numpy, max_energy_ranges):
+        timestamps = numpy.frombuffer(self._ordered(self.timestamps), dtype=self._timestamp_typecode)
+        durations = numpy.diff(timestamps)
+        energy = numpy.empty((len(self.energy_columns), len(durations)))
+        for domain_energy, column, max_energy_range in zip(energy, self.energy_columns, max_energy_ranges):
+            column = numpy.frombuffer(self._ordered(column), dtype=numpy.float64)
+            numpy.subtract(column[1:], column[:-1], out=domain_energy)
+            if max_energy_range is not None:
+                domain_energy[domain_energy < 0] += max_energy_range
+
+        stop_id = self._tag_ids.get(STOP_TAG)
+        tag_ids = numpy.frombuffer(self._ordered(self.tag_ids), dtype=self.tag_ids.typecode)[:-1]
+        indexes = numpy.flatnonzero(tag_ids != stop_id) if stop_id is not None else numpy.arange(len(durations))
+        return (self.clock.to_timestamp(timestamps[indexes]), tag_ids[indexes],
+                self.clock.to_duration(durations[indexes]), energy[:, indexes].T)
+
+    def _compute_columns(self, max_energy_ranges):
+        numpy = load_numpy()
+        if numpy is None:
+            return self._compute_columns_without_numpy(max_energy_ranges)
+        return [column.tolist() for column in self._compute_numpy_columns(numpy, max_energy_ranges)]
+
+    def _compute_columns_without_numpy(self, max_energy_ranges):
+        stop_id = self._tag_ids.get(STOP_TAG)
+        ordered_timestamps = self._ordered(self.timestamps)
+        ordered_tag_ids = self._ordered(self.tag_ids)
+        indexes = [index for index in range(len(self) - 1) if ordered_tag_ids[index] != stop_id]
+
+        timestamps = [self.clock.to_timestamp(ordered_timestamps[index]) for index in indexes]
+        tag_ids = [ordered_tag_ids[index] for index in indexes]
+        durations = [self.clock.to_duration(ordered_timestamps[index + 1] - ordered_timestamps[index])
+                     for index in indexes]
+        energy = [[] for _ in indexes]
+        for column, max_energy_range in zip(self.energy_columns, max_energy_ranges):
+            column = self._ordered(column)
+            for sample_energy, index in zip(energy, indexes):
+                value = column[index + 1] - column[index]
+                if value < 0 and max_energy_range is not None:
+                    value += max_energy_range
+                sample_energy.append(value)
+        return timestamps, tag_ids, durations, energy
+
+    def iter_samples(self, domains, max_energy_ranges: Optional[List[Optional[float]]] = None) -> Iterator[EnergySample]:
+        """
+        compute the energy deltas of the stored states and lazily generate the corresponding samples
+
+        :param domains: monitored domains, in the same order than the measured values
+        :param max_energy_ranges: range of the energy counter of each domain (None if the counter never wraps around)
+        """
+        if len(self) < 2:
+            return
+        if max_energy_ranges is None:
+            max_energy_ranges = [None] * len(self.energy_columns)
+
+        schema = _get_domain_schema(domains)
+        for timestamp, tag_id, duration, energy in zip(*self._compute_columns(max_energy_ranges)):
+            yield EnergySample.from_values(timestamp, self._tags[tag_id], duration, schema, tuple(energy))
+
+    def generate_trace(self, domains, max_energy_ranges: Optional[List[Optional[float]]] = None) -> EnergyTrace:
+        """
+        compute the energy trace of the stored states
+
+        :param domains: monitored domains, in the same order than the measured values
+        :param max_energy_ranges: range of the energy counter of each domain (None if the counter never wraps around)
+        :return: a ColumnarEnergyTrace sharing the computed columns if numpy is installed, an EnergyTrace otherwise
+        """
+        numpy = load_numpy()
+        if numpy is None:
+            return EnergyTrace(self.iter_samples(domains, max_energy_ranges))
+
+        domain_names = list(_get_domain_schema(domains).names)
+        if len(self) < 2:
+            return ColumnarEnergyTrace(domains=domain_names)
+        if max_energy_ranges is None:
+            max_energy_ranges = [None] * len(self.energy_columns)
+        timestamps, tag_ids, durations, energy = self._compute_numpy_columns(numpy, max_energy_ranges)
+        return ColumnarEnergyTrace.from_columns(timestamps, tag_ids, durations, numpy.ascontiguousarray(energy),
+                                                self._tags, domain_names)
+
+
 def measure_energy(func=None ,handler: EnergyHandler = PrintHandler(), domains: Optional[List[Domain]] = None):
     """
     Measure the energy consumption of monitored devices during the execution of the decorated function
 
+    Coroutine functions are supported : the measure covers the awaited coroutine and the handler processes the trace
+    in the default executor of the event loop, so a slow handler never blocks it
+
     :param handler: handler instance that will receive the power consummation data
     :param domains: list of the monitored energy domains
     """
     def decorator_measure_energy(func):
 
-        devices = DeviceFactory.create_devices(domains)
+        devices = get_device_registry().acquire(domains)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper_measure(*args, **kwargs):
+                # concurrent calls of the coroutine must not share the same meter
+                energy_meter = EnergyMeter(devices)
+                energy_meter.start(tag=func.__name__)
+                val = await func(*args, **kwargs)
+                energy_meter.stop()
+                await _process_in_executor(handler, energy_meter)
+                return val
+            return async_wrapper_measure
+
         energy_meter = EnergyMeter(devices)
 
         @functools.wraps(func)
@@ -311,26 +594,51 @@ def measure_energy(func=None ,handler: EnergyHandler = PrintHandler(), domains:
         return decorator_measure_energy(func)
 
 
+async def _process_in_executor(handler: EnergyHandler, energy_meter: EnergyMeter):
+    """
+    generate the trace of the given stopped meter and give it to the handler, outside of the event loop thread
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, lambda: handler.process(energy_meter.get_trace()))
+
+
 class EnergyContext():
 
     def __init__(self, handler: EnergyHandler = PrintHandler(), domains: Optional[List[Domain]] = None, start_tag: str = 'start'):
         """
         Measure the energy consumption of monitored devices during the execution of the contextualized code
 
+        The context can also be used with ``async with``, the handler then processes the trace in the default executor
+        of the event loop
+
         :param handler: handler instance that will receive the power consummation data
         :param domains: list of the monitored energy domains
         :param start_tag: first tag of the trace
         """
         self.handler = handler
         self.start_tag = start_tag
+        self.domains = domains
 
-        devices = DeviceFactory.create_devices(domains)
-        self.energy_meter = EnergyMeter(devices)
+        # devices are acquired when the context is entered, so a context that is never entered holds no device
+        self.energy_meter = None
 
     def __enter__(self) -> EnergyMeter:
+        self.energy_meter = EnergyMeter(get_device_registry().acquire(self.domains))
         self.energy_meter.start(self.start_tag)
         return self.energy_meter
 
-    def __exit__(self, type, value, traceback):
+    def _stop_meter(self):
         self.energy_meter.stop()
+        get_device_registry().release(self.energy_meter.devices)
+
+    def __exit__(self, type, value, traceback):
+        self._stop_meter()
         self.handler.process(self.energy_meter.get_trace())
+
+    async def __aenter__(self) -> EnergyMeter:
+        return self.__enter__()
+
+    async def __aexit__(self, type, value, traceback):
+        self._stop_meter()
+        await _process_in_executor(self.handler, self.energy_meter)
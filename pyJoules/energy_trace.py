@@ -17,9 +17,79 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from typing import Dict, Any, List, Callable
+import math
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from typing import Dict, Any, List, Callable, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
 from functools import reduce
-from operator import and_
+from operator import itemgetter
+
+from .optional_dependency import load_numpy, require_module
+
+
+class DomainSchema:
+    """
+    Immutable ordered list of energy domain names. Schemas are interned : all the samples measuring the same domains
+    share the same schema instance
+
+    :var names: domain names
+    :vartype names: Tuple[str, ...]
+    """
+    __slots__ = ('names', 'positions')
+
+    _interned_schemas = {}
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = names
+        self.positions = {name: position for position, name in enumerate(names)}
+
+    @staticmethod
+    def get(names: Iterable[str]) -> 'DomainSchema':
+        """
+        :param names: domain names
+        :return: the shared schema of the given domain names
+        """
+        names = tuple(names)
+        schema = DomainSchema._interned_schemas.get(names)
+        if schema is None:
+            schema = DomainSchema._interned_schemas.setdefault(names, DomainSchema(names))
+        return schema
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return 'DomainSchema' + repr(self.names)
+
+    def __reduce__(self):
+        # unpickled schemas are interned too
+        return DomainSchema.get, (self.names,)
+
+
+class EnergyView(Mapping):
+    """
+    Read only dictionary view on the energy values of a sample, indexed by domain name
+    """
+    __slots__ = ('_schema', '_values')
+
+    def __init__(self, schema: DomainSchema, values: Tuple[float, ...]):
+        self._schema = schema
+        self._values = values
+
+    def __getitem__(self, domain: str) -> float:
+        return self._values[self._schema.positions[domain]]
+
+    def __contains__(self, domain: Any) -> bool:
+        return domain in self._schema.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._schema.names)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return repr(dict(zip(self._schema.names, self._values)))
 
 
 class EnergySample:
@@ -30,15 +100,174 @@ class EnergySample:
     :vartype tag: str
     :var duration: duration of the sample in seconds
     :vartype duration: float
-    :var energy: dictionary that contains the energy consumed during this sample
-    :vartype energy: Dict[str, float]
+    :var energy: read only dictionary view on the energy consumed during this sample, indexed by domain name
+    :vartype energy: Mapping[str, float]
+    :var schema: domain names of the energy values
+    :vartype schema: DomainSchema
+    :var values: energy consumed by each domain during this sample, in the schema order
+    :vartype values: Tuple[float, ...]
     """
+    __slots__ = ('timestamp', 'tag', 'duration', 'schema', 'values')
+
     def __init__(self, timestamp: float, tag: str, duration: float, energy: Dict[str, float]):
         self.timestamp = timestamp
         self.tag = tag
         self.duration = duration
         self.energy = energy
 
+    @staticmethod
+    def from_values(timestamp: float, tag: str, duration: float, schema: DomainSchema,
+                    values: Tuple[float, ...]) -> 'EnergySample':
+        """
+        create a sample from its energy values, without building a dictionary
+
+        :param schema: domain names of the energy values
+        :param values: energy consumed by each domain during this sample, in the schema order
+        """
+        sample = EnergySample.__new__(EnergySample)
+        sample.timestamp = timestamp
+        sample.tag = tag
+        sample.duration = duration
+        sample.schema = schema
+        sample.values = values
+        return sample
+
+    @property
+    def energy(self) -> EnergyView:
+        return EnergyView(self.schema, self.values)
+
+    @energy.setter
+    def energy(self, energy: Dict[str, float]):
+        if isinstance(energy, EnergyView):
+            self.schema = energy._schema
+            self.values = energy._values
+            return
+        self.schema = DomainSchema.get(energy.keys())
+        self.values = tuple(energy.values())
+
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class EnergyAggregate:
+    """
+    Statistics of a group of samples of an energy trace
+
+    :var key: key of the group (the samples tag when the trace is aggregated by tag)
+    :var count: number of samples in the group
+    :vartype count: int
+    :var duration: total duration of the samples in seconds
+    :vartype duration: float
+    :var energy_total: total energy consumed during the samples, for each domain
+    :vartype energy_total: Dict[str, float]
+    :var energy_mean: mean energy consumed during a sample, for each domain
+    :vartype energy_mean: Dict[str, float]
+    :var energy_min: minimal energy consumed during a sample, for each domain
+    :vartype energy_min: Dict[str, float]
+    :var energy_max: maximal energy consumed during a sample, for each domain
+    :vartype energy_max: Dict[str, float]
+    :var mean_power: total energy divided by the total duration, for each domain (None if the duration is null)
+    :vartype mean_power: Dict[str, Optional[float]]
+    :var percentiles: percentiles of the energy consumed during a sample, for each domain and each percentile
+    :vartype percentiles: Dict[str, Dict[float, float]]
+    """
+    def __init__(self, key: Any, count: int, duration: float, energy_total: Dict[str, float],
+                 energy_mean: Dict[str, float], energy_min: Dict[str, float], energy_max: Dict[str, float],
+                 percentiles: Dict[str, Dict[float, float]]):
+        self.key = key
+        self.count = count
+        self.duration = duration
+        self.energy_total = energy_total
+        self.energy_mean = energy_mean
+        self.energy_min = energy_min
+        self.energy_max = energy_max
+        self.mean_power = {domain: (total / duration if duration != 0 else None)
+                           for domain, total in energy_total.items()}
+        self.percentiles = percentiles
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """
+    compute a percentile of the given sorted values, using linear interpolation between the closest ranks
+    """
+    position = (len(sorted_values) - 1) * percentile / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class _GroupAccumulator:
+    """
+    accumulate the samples of a group to compute its EnergyAggregate
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.values = {}
+
+    def add(self, sample: EnergySample):
+        self.count += 1
+        self.duration += sample.duration
+        for domain, value in sample.energy.items():
+            if domain in self.values:
+                self.values[domain].append(value)
+            else:
+                self.values[domain] = [value]
+
+    def compute(self, key, percentiles) -> EnergyAggregate:
+        total, mean, minimum, maximum, domain_percentiles = {}, {}, {}, {}, {}
+        for domain, values in self.values.items():
+            total[domain] = sum(values)
+            mean[domain] = total[domain] / len(values)
+            values.sort()
+            minimum[domain] = values[0]
+            maximum[domain] = values[-1]
+            domain_percentiles[domain] = {percentile: _percentile(values, percentile) for percentile in percentiles}
+        return EnergyAggregate(key, self.count, self.duration, total, mean, minimum, maximum, domain_percentiles)
+
+
+class _TimestampView:
+    """
+    read only sequence of the timestamps of a sample list, used to bisect the list without copying its timestamps
+    """
+    def __init__(self, samples: List[EnergySample]):
+        self._samples = samples
+
+    def __getitem__(self, index: int) -> float:
+        return self._samples[index].timestamp
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+def _prorate(sample: EnergySample, begin: float, end: float) -> EnergySample:
+    """
+    :return: a sample covering the overlap between the given sample and the [begin, end) window. Its energy is
+             pro-rated by the overlap duration
+    """
+    overlap_begin = max(sample.timestamp, begin)
+    overlap_end = min(sample.timestamp + sample.duration, end)
+    duration = max(overlap_end - overlap_begin, 0)
+    ratio = duration / sample.duration if sample.duration > 0 else 1
+    return EnergySample.from_values(overlap_begin, sample.tag, duration, sample.schema,
+                                    tuple(value * ratio for value in sample.values))
+
+
+def _check_window(begin, end):
+    if end < begin:
+        raise ValueError('window end is before its begining : ' + str(begin) + ' ' + str(end))
+
+
+def _gen_resampling_bins(begin: float, end: float, period: float) -> List[float]:
+    """
+    :return: the begining timestamps of the bins of length period covering the [begin, end) window
+    """
+    if period <= 0:
+        raise ValueError('resampling period must be positive : ' + str(period))
+    _check_window(begin, end)
+    bin_number = max(math.ceil((end - begin) / period), 0)
+    return [begin + index * period for index in range(bin_number)]
+
 
 class EnergyTrace:
     """
@@ -49,13 +278,35 @@ class EnergyTrace:
         :param samples: samples containing in the trace
         """
         self._samples = []
+        self._tag_index = {}
         for sample in samples:
-            self._samples.append(sample)
+            self.append(sample)
+
+    def _index_samples(self, first_index: int):
+        """
+        add samples stored from the given position to the tag index
+        """
+        for index in range(first_index, len(self._samples)):
+            tag = self._samples[index].tag
+            if tag in self._tag_index:
+                self._tag_index[tag].append(index)
+            else:
+                self._tag_index[tag] = [index]
 
     def _get_sample_from_tag(self, tag):
-        for sample in self._samples:
-            if sample.tag == tag:
-                return sample
+        indexes = self._tag_index.get(tag)
+        if indexes is None:
+            return None
+        return self._samples[indexes[0]]
+
+    def get_all(self, tag: str) -> List[EnergySample]:
+        """
+        Return all the samples with the given tag
+
+        :param tag: tag of the needed samples
+        :return: samples with the given tag, in the trace order. Empty list if no sample match the tag
+        """
+        return [self._samples[index] for index in self._tag_index.get(tag, [])]
 
     def __getitem__(self, key: Any) -> EnergySample:
         """
@@ -89,14 +340,16 @@ class EnergyTrace:
         return len(self._samples)
 
     def __contains__(self, key: str):
-        return not self._get_sample_from_tag(key) is None
+        return key in self._tag_index
 
     def __add__(self, trace:  'EnergySample'):
-        samples = self._samples + trace._samples
+        samples = self._samples + list(trace)
         return EnergyTrace(samples)
 
     def __iadd__(self, trace: 'EnergySample'):
-        self._samples += trace._samples
+        first_index = len(self._samples)
+        self._samples += list(trace)
+        self._index_samples(first_index)
         return self
 
     def append(self, sample: EnergySample):
@@ -104,11 +357,177 @@ class EnergyTrace:
         append a new sample to the trace
         """
         self._samples.append(sample)
+        self._index_samples(len(self._samples) - 1)
+
+    def to_columnar(self) -> 'ColumnarEnergyTrace':
+        """
+        convert the trace into a columnar trace
+
+        :raise ImportError: if numpy is not installed
+        :raise ValueError: if the samples of the trace don't have the same energy domains
+        """
+        return ColumnarEnergyTrace(self._samples)
+
+    def _window_bounds(self, begin: float, end: float):
+        """
+        :return: positions of the first sample overlapping the window and of the first sample after it
+        """
+        timestamps = _TimestampView(self._samples)
+        first = bisect_right(timestamps, begin) - 1
+        if first < 0 or self._samples[first].timestamp + self._samples[first].duration <= begin:
+            first += 1
+        return first, max(bisect_left(timestamps, end), first)
+
+    def between(self, begin: float, end: float, prorate: bool = False) -> 'EnergyTrace':
+        """
+        Return the samples overlapping the [begin, end) time window. Sample timestamps must be increasing, as in the
+        traces produced by an energy meter. The returned trace shares its samples with the current trace
+
+        :param begin: begining timestamp of the window
+        :param end: end timestamp of the window
+        :param prorate: if True, replace the samples partially overlapping the window by samples covering only the
+                        overlap, with an energy pro-rated by the overlap duration
+        :raise ValueError: if end is before begin
+        """
+        _check_window(begin, end)
+        first, last = self._window_bounds(begin, end)
+        samples = self._samples[first:last]
+        if prorate and samples:
+            samples[0] = _prorate(samples[0], begin, end)
+            samples[-1] = _prorate(samples[-1], begin, end)
+        return EnergyTrace(samples)
+
+    def at(self, timestamp: float) -> EnergySample:
+        """
+        Return the sample measured at the given time. Sample timestamps must be increasing, as in the traces produced
+        by an energy meter
+
+        :param timestamp: timestamp of the needed sample
+        :raise KeyError: if no sample cover the given timestamp
+        """
+        index = bisect_right(_TimestampView(self._samples), timestamp) - 1
+        if index >= 0 and timestamp < self._samples[index].timestamp + self._samples[index].duration:
+            return self._samples[index]
+        raise KeyError('no sample measured at this timestamp : ' + str(timestamp))
+
+    def to_power(self) -> List[Tuple[float, Dict[str, float]]]:
+        """
+        Return the mean power of each domain during each sample, in energy unit per second. Samples with a null
+        duration are ignored
+
+        :return: a list of (timestamp, power) tuples, where timestamp is the beginning of the sample and power a
+                 dictionary associating each domain name to its mean power during the sample
+        """
+        power_trace = []
+        for sample in self:
+            if sample.duration <= 0:
+                continue
+            power = {domain: energy / sample.duration for domain, energy in sample.energy.items()}
+            power_trace.append((sample.timestamp, power))
+        return power_trace
+
+    def _get_time_range(self):
+        first_sample = self[0]
+        last_sample = self[len(self) - 1]
+        return first_sample.timestamp, last_sample.timestamp + last_sample.duration
+
+    def resample(self, period: float, begin: Optional[float] = None,
+                 end: Optional[float] = None) -> List[Tuple[float, Dict[str, float]]]:
+        """
+        Return the mean power of each domain on evenly spaced periods. The energy of each sample is spread uniformly
+        over its duration and redistributed to the periods it overlaps. Sample timestamps must be increasing, as in the
+        traces produced by an energy meter
+
+        :param period: length of a period, in seconds
+        :param begin: begining of the first period (default: timestamp of the first sample)
+        :param end: end of the resampled time range (default: end of the last sample). The last period is truncated
+                    if the range is not a multiple of the period, its power is computed on its truncated length
+        :return: a list of (timestamp, power) tuples, where timestamp is the beginning of the period and power a
+                 dictionary associating each domain name to its mean power during the period
+        :raise ValueError: if period isn't positive or if end is before begin
+        """
+        if len(self) == 0:
+            return []
+        trace_begin, trace_end = self._get_time_range()
+        begin = trace_begin if begin is None else begin
+        end = trace_end if end is None else end
+        bins = _gen_resampling_bins(begin, end, period)
+
+        bin_ends = [min(timestamp + period, end) for timestamp in bins]
+        energy = {}
+        for sample in self.between(begin, end) if bins else []:
+            sample_end = sample.timestamp + sample.duration
+            first_bin = max(int((sample.timestamp - begin) // period), 0)
+            last_bin = min(int(math.ceil((sample_end - begin) / period)), len(bins))
+            for domain, value in sample.energy.items():
+                if domain not in energy:
+                    energy[domain] = [0.0] * len(bins)
+                domain_energy = energy[domain]
+                if sample.duration <= 0:
+                    domain_energy[first_bin] += value
+                    continue
+                for index in range(first_bin, last_bin):
+                    overlap = min(bin_ends[index], sample_end) - max(bins[index], sample.timestamp)
+                    domain_energy[index] += value * max(overlap, 0) / sample.duration
+        return [(timestamp, {domain: energy[domain][index] / (bin_end - timestamp) for domain in energy})
+                for index, (timestamp, bin_end) in enumerate(zip(bins, bin_ends))]
+
+    def aggregate(self, by: Union[str, Callable[[EnergySample], Any]] = 'tag',
+                  percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[Any, EnergyAggregate]:
+        """
+        Compute statistics on the samples of the trace, grouped by tag
+
+        :param by: 'tag' to group the samples by tag, or a function that take a sample as parameter and return the key
+                   of its group
+        :param percentiles: energy percentiles to compute, between 0 and 100
+        :return: statistics of each group, indexed by group key in the order of their first sample
+        :raise ValueError: if the grouping criterion is unknown
+        """
+        if by == 'tag':
+            by = lambda sample: sample.tag
+        elif not callable(by):
+            raise ValueError('unknown grouping criterion : ' + str(by))
+
+        groups = {}
+        for sample in self:
+            key = by(sample)
+            accumulator = groups.get(key)
+            if accumulator is None:
+                accumulator = _GroupAccumulator()
+                groups[key] = accumulator
+            accumulator.add(sample)
+        percentiles = tuple(percentiles)
+        return {key: accumulator.compute(key, percentiles) for key, accumulator in groups.items()}
+
+    def _get_shared_schema(self) -> Optional[DomainSchema]:
+        """
+        :return: the energy domains of the samples if all the samples of the trace have the same domains, else None
+        """
+        if not self._samples:
+            return None
+        schema = self._samples[0].schema
+        for sample in self._samples:
+            if sample.schema is not schema:
+                return None
+        return schema
+
+    def _energy_matrix(self, numpy):
+        return numpy.array([sample.values for sample in self._samples], dtype=numpy.float64)
+
+    def _to_trace_columns(self, numpy, schema, energy) -> 'TraceColumns':
+        tag_codes = {}
+        tags = [tag_codes.setdefault(sample.tag, len(tag_codes)) for sample in self._samples]
+        return TraceColumns(numpy.array([sample.timestamp for sample in self._samples], dtype=numpy.float64),
+                            numpy.array(tags, dtype=numpy.intp),
+                            numpy.array([sample.duration for sample in self._samples], dtype=numpy.float64),
+                            energy, list(tag_codes), list(schema.names))
 
     def remove_idle(self, idle: List[Dict[str, float]]):
         """
         substract idle energy values from the current trace
 
+        When numpy is installed and all the samples have the same energy domains, the substraction is vectorized
+
         :param idle: list of idle consumption values to substract to current trace
                      idle consumption values must be grouped in a dictionary with their domain as key
         :raise ValueError: if the number of values in the list doesn't match the number of sample in the trace
@@ -117,11 +536,33 @@ class EnergyTrace:
         if len(idle) != len(self._samples):
             raise ValueError('idle list havn\'t the same length than the trace')
 
+        numpy = load_numpy()
+        schema = self._get_shared_schema() if numpy is not None else None
+        if schema is not None:
+            self._remove_idle_matrix(numpy, schema, idle)
+            return
+
         for idle_energy, sample in zip(idle, self._samples):
-            for domain in sample.energy:
-                if domain not in idle_energy:
-                    raise ValueError('domain not present in idle values : ' + domain)
-                sample.energy[domain] -= idle_energy[domain]
+            if not sample.energy.keys() <= idle_energy.keys():
+                missing_domain = next(domain for domain in sample.energy if domain not in idle_energy)
+                raise ValueError('domain not present in idle values : ' + missing_domain)
+
+        for index, (idle_energy, sample) in enumerate(zip(idle, self._samples)):
+            values = tuple(value - idle_energy[domain] for domain, value in zip(sample.schema.names, sample.values))
+            self._samples[index] = EnergySample.from_values(sample.timestamp, sample.tag, sample.duration,
+                                                            sample.schema, values)
+
+    def _remove_idle_matrix(self, numpy, schema, idle):
+        if not schema.names:
+            return
+        get_domain_values = itemgetter(*schema.names)
+        try:
+            idle_matrix = numpy.array([get_domain_values(idle_energy) for idle_energy in idle], dtype=numpy.float64)
+        except KeyError as exn:
+            raise ValueError('domain not present in idle values : ' + str(exn.args[0]))
+        energy = self._energy_matrix(numpy) - idle_matrix.reshape(len(self._samples), len(schema))
+        self._samples = [EnergySample.from_values(sample.timestamp, sample.tag, sample.duration, schema, tuple(values))
+                         for sample, values in zip(self._samples, energy.tolist())]
 
     def _sample_havnt_negative_values(self, sample):
         for val in sample.energy.values():
@@ -129,21 +570,451 @@ class EnergyTrace:
                 return False
         return True
 
-    def clean_data(self, guards: List[Callable[[EnergySample], bool]] = []):
+    def _evaluate_column_guards(self, column_guards):
+        """
+        :return: mask of the samples validated by all the column guards, None if there is no column guard
+        """
+        if not column_guards:
+            return None
+        numpy = require_module('numpy')
+        columns = ColumnarEnergyTrace(self._samples).to_numpy()
+        return reduce(numpy.logical_and, (guard(columns) for guard in column_guards)).tolist()
+
+    def _evaluate_vectorized_mask(self, numpy, schema, column_guards):
+        """
+        :return: mask of the samples without negative energy values and validated by all the column guards
+        """
+        energy = self._energy_matrix(numpy).reshape(len(self._samples), len(schema))
+        valid = (energy >= 0).all(axis=1)
+        if column_guards:
+            columns = self._to_trace_columns(numpy, schema, energy)
+            for guard in column_guards:
+                numpy.logical_and(valid, guard(columns), out=valid)
+        return valid.tolist()
+
+    def clean_data(self, guards: List[Callable[[EnergySample], bool]] = [],
+                   column_guards: List[Callable[['TraceColumns'], Any]] = []):
         """
         Remove sample with negative energy values from the trace
         Guards can be added to specify rules to remove sample
 
+        When numpy is installed and all the samples have the same energy domains, negative values and column guards are
+        evaluated on a matrix built once
+
         :param guards: list of function that is used as rules to remove samples. A guard is a function that take a
-                       sample as parameter and return True if it must be keept in the trace, False otherwise
+                       sample as parameter and return True if it must be keept in the trace, False otherwise. Guards
+                       are evaluated in order and the evaluation stop at the first guard that reject the sample
+        :param column_guards: list of vectorized rules to remove samples, evaluated before the guards. A column guard
+                              is a function that take the :py:class:`TraceColumns` of the trace as parameter and
+                              return a boolean numpy array, True for the samples that must be keept in the trace
+        :raise ImportError: if column guards are used without numpy installed
         """
+        numpy = load_numpy()
+        schema = self._get_shared_schema() if numpy is not None else None
+        if schema is not None:
+            valid_mask = self._evaluate_vectorized_mask(numpy, schema, column_guards)
+            valid_samples = [sample for sample, valid in zip(self._samples, valid_mask)
+                             if valid and all(guard(sample) for guard in guards)]
+        else:
+            column_mask = self._evaluate_column_guards(column_guards)
+            valid_samples = []
+            for index, sample in enumerate(self._samples):
+                if column_mask is not None and not column_mask[index]:
+                    continue
+                if self._sample_havnt_negative_values(sample) and all(guard(sample) for guard in guards):
+                    valid_samples.append(sample)
+        self._samples = valid_samples
+        self._tag_index = {}
+        self._index_samples(0)
 
-        extended_guards = [lambda s: self._sample_havnt_negative_values(s)] + guards
+class TraceColumns(NamedTuple):
+    """
+    Columns of a :py:class:`ColumnarEnergyTrace`, as numpy arrays sharing their memory with the trace
 
-        valid_samples = []
-        for sample in self._samples:
+    :var timestamps: begining timestamp of each sample
+    :var tags: tag code of each sample, the tag of code n is ``tag_names[n]``
+    :var durations: duration of each sample in seconds
+    :var energy: energy consumed during each sample, one row per sample and one column per domain
+    :var tag_names: tag names indexed by their code
+    :var domains: domain names, in the energy columns order
+    """
+    timestamps: Any
+    tags: Any
+    durations: Any
+    energy: Any
+    tag_names: List[str]
+    domains: List[str]
 
-            validity_list = [guard(sample) for guard in extended_guards]
-            if reduce(and_, validity_list):
-                valid_samples.append(sample)
-        self._samples = valid_samples
+
+class ColumnarEnergyTrace(EnergyTrace):
+    """
+    EnergyTrace storing its samples as numpy columns : timestamps, durations, tag codes and a 2-D energy matrix with
+    one column per domain. All the samples of the trace must have the same energy domains
+
+    EnergySample are created on the fly when the trace is iterated or indexed : modifying them doesn't modify the
+    trace
+    """
+
+    _INITIAL_CAPACITY = 16
+
+    def __init__(self, samples: Iterable[EnergySample] = (), domains: Optional[List[str]] = None):
+        """
+        :param samples: samples containing in the trace
+        :param domains: energy domains of the samples. If None, use the domains of the first sample
+        :raise ImportError: if numpy is not installed
+        :raise ValueError: if the samples don't have the same energy domains
+        """
+        numpy = require_module('numpy')
+        self._domains = None if domains is None else list(domains)
+        self._length = 0
+        self._tag_names = []
+        self._tag_codes = {}
+        self._first_index = {}
+        self._timestamps = numpy.empty(0)
+        self._tags = numpy.empty(0, dtype=numpy.intp)
+        self._durations = numpy.empty(0)
+        self._energy = numpy.empty((0, 0 if domains is None else len(domains)))
+        self._schema = None if domains is None else DomainSchema.get(domains)
+        for sample in samples:
+            self.append(sample)
+
+    @staticmethod
+    def from_columns(timestamps, tags, durations, energy, tag_names: List[str],
+                     domains: List[str]) -> 'ColumnarEnergyTrace':
+        """
+        create a trace using the given columns as storage, without copying them when they already are numpy arrays
+        of the right type
+
+        :param timestamps: begining timestamp of each sample
+        :param tags: tag code of each sample, the tag of code n is ``tag_names[n]``
+        :param durations: duration of each sample in seconds
+        :param energy: energy consumed during each sample, one row per sample and one column per domain
+        :param tag_names: tag names indexed by their code
+        :param domains: domain names, in the energy columns order
+        :raise ValueError: if the columns don't have the same length
+        """
+        numpy = require_module('numpy')
+        trace = ColumnarEnergyTrace(domains=domains)
+        trace._timestamps = numpy.asarray(timestamps, dtype=numpy.float64)
+        trace._tags = numpy.asarray(tags, dtype=numpy.intp)
+        trace._durations = numpy.asarray(durations, dtype=numpy.float64)
+        trace._energy = numpy.asarray(energy, dtype=numpy.float64).reshape(len(trace._timestamps), len(domains))
+        if not len(trace._timestamps) == len(trace._tags) == len(trace._durations):
+            raise ValueError('trace columns havn\'t the same length')
+        trace._length = len(trace._timestamps)
+        trace._tag_names = list(tag_names)
+        trace._tag_codes = {tag: code for code, tag in enumerate(trace._tag_names)}
+        trace._index_tags()
+        return trace
+
+    def _index_tags(self):
+        numpy = require_module('numpy')
+        codes, first_indexes = numpy.unique(self._tags[:self._length], return_index=True)
+        self._first_index = {self._tag_names[code]: index for code, index in zip(codes.tolist(), first_indexes.tolist())}
+
+    def _get_tag_code(self, tag):
+        code = self._tag_codes.get(tag)
+        if code is None:
+            code = len(self._tag_names)
+            self._tag_names.append(tag)
+            self._tag_codes[tag] = code
+        return code
+
+    def _reserve(self, capacity):
+        numpy = require_module('numpy')
+        if capacity <= len(self._timestamps):
+            return
+        capacity = max(capacity, 2 * len(self._timestamps), self._INITIAL_CAPACITY)
+        self._timestamps = numpy.resize(self._timestamps[:self._length], capacity)
+        self._tags = numpy.resize(self._tags[:self._length], capacity)
+        self._durations = numpy.resize(self._durations[:self._length], capacity)
+        energy = numpy.empty((capacity, len(self._domains)))
+        energy[:self._length] = self._energy[:self._length]
+        self._energy = energy
+
+    def _make_sample(self, index):
+        return EnergySample.from_values(float(self._timestamps[index]), self._tag_names[self._tags[index]],
+                                        float(self._durations[index]), self._schema,
+                                        tuple(self._energy[index].tolist()))
+
+    @property
+    def domains(self) -> List[str]:
+        """
+        energy domains of the trace samples
+        """
+        return [] if self._domains is None else list(self._domains)
+
+    def to_numpy(self) -> TraceColumns:
+        """
+        :return: the columns of the trace. The returned arrays are read only views on the trace storage
+        """
+        columns = []
+        for column in (self._timestamps, self._tags, self._durations, self._energy):
+            view = column[:self._length]
+            view.flags.writeable = False
+            columns.append(view)
+        return TraceColumns(*columns, tag_names=list(self._tag_names), domains=self.domains)
+
+    def to_columnar(self) -> 'ColumnarEnergyTrace':
+        return self
+
+    def _get_sample_from_tag(self, tag):
+        index = self._first_index.get(tag)
+        if index is None:
+            return None
+        return self._make_sample(index)
+
+    def get_all(self, tag: str) -> List[EnergySample]:
+        numpy = require_module('numpy')
+        if tag not in self._first_index:
+            return []
+        indexes = numpy.flatnonzero(self._tags[:self._length] == self._tag_codes[tag])
+        return [self._make_sample(index) for index in indexes]
+
+    def __getitem__(self, key: Any) -> EnergySample:
+        if isinstance(key, int):
+            index = key + self._length if key < 0 else key
+            if not 0 <= index < self._length:
+                raise IndexError('Trace index out of range : ' + str(key))
+            return self._make_sample(index)
+
+        sample = self._get_sample_from_tag(key)
+        if sample is None:
+            raise KeyError('this tag doesn\'t match any sample : ' + str(key))
+        return sample
+
+    def __iter__(self) -> Iterator[EnergySample]:
+        for index in range(self._length):
+            yield self._make_sample(index)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, key: str):
+        return key in self._first_index
+
+    def __add__(self, trace: EnergyTrace):
+        new_trace = ColumnarEnergyTrace(domains=self._domains)
+        new_trace += self
+        new_trace += trace
+        return new_trace
+
+    def __iadd__(self, trace: EnergyTrace):
+        if not isinstance(trace, ColumnarEnergyTrace) or trace._domains != self._domains or self._domains is None:
+            for sample in list(trace):
+                self.append(sample)
+            return self
+
+        length = self._length + trace._length
+        self._reserve(length)
+        self._timestamps[self._length:length] = trace._timestamps[:trace._length]
+        self._durations[self._length:length] = trace._durations[:trace._length]
+        self._energy[self._length:length] = trace._energy[:trace._length]
+        codes = [self._get_tag_code(tag) for tag in trace._tag_names]
+        self._tags[self._length:length] = [codes[code] for code in trace._tags[:trace._length].tolist()]
+        for tag, index in trace._first_index.items():
+            self._first_index.setdefault(tag, self._length + index)
+        self._length = length
+        return self
+
+    def append(self, sample: EnergySample):
+        """
+        append a new sample to the trace
+
+        :raise ValueError: if the sample energy domains are not the trace domains
+        """
+        if self._domains is None:
+            self._domains = list(sample.energy)
+            self._schema = DomainSchema.get(self._domains)
+            self._energy = self._energy.reshape(0, len(self._domains))
+        if len(sample.energy) != len(self._domains):
+            raise ValueError('sample energy domains don\'t match trace domains : ' + str(list(sample.energy)))
+
+        self._reserve(self._length + 1)
+        index = self._length
+        if sample.schema is self._schema:
+            self._energy[index] = sample.values
+        else:
+            try:
+                self._energy[index] = [sample.energy[domain] for domain in self._domains]
+            except KeyError as exn:
+                raise ValueError('domain not present in sample : ' + str(exn))
+        self._timestamps[index] = sample.timestamp
+        self._durations[index] = sample.duration
+        self._tags[index] = self._get_tag_code(sample.tag)
+        self._first_index.setdefault(sample.tag, index)
+        self._length += 1
+
+    def _window_bounds(self, begin: float, end: float):
+        timestamps = self._timestamps[:self._length]
+        first = int(timestamps.searchsorted(begin, side='right')) - 1
+        if first < 0 or timestamps[first] + self._durations[first] <= begin:
+            first += 1
+        return first, max(int(timestamps.searchsorted(end, side='left')), first)
+
+    def between(self, begin: float, end: float, prorate: bool = False) -> 'ColumnarEnergyTrace':
+        """
+        Return the samples overlapping the [begin, end) time window. Sample timestamps must be increasing, as in the
+        traces produced by an energy meter. Without pro-rating, the returned trace columns are views on the current
+        trace columns. Traces never modify their stored samples in place, so modifying one of the two traces doesn't
+        modify the other
+
+        :param begin: begining timestamp of the window
+        :param end: end timestamp of the window
+        :param prorate: if True, replace the samples partially overlapping the window by samples covering only the
+                        overlap, with an energy pro-rated by the overlap duration
+        :raise ValueError: if end is before begin
+        """
+        _check_window(begin, end)
+        first, last = self._window_bounds(begin, end)
+        timestamps = self._timestamps[first:last]
+        durations = self._durations[first:last]
+        energy = self._energy[first:last]
+        if prorate and last > first:
+            timestamps, durations, energy = timestamps.copy(), durations.copy(), energy.copy()
+            for index in {0, last - first - 1}:
+                sample = _prorate(self._make_sample(first + index), begin, end)
+                timestamps[index] = sample.timestamp
+                durations[index] = sample.duration
+                energy[index] = [sample.energy[domain] for domain in self._domains]
+        return ColumnarEnergyTrace.from_columns(timestamps, self._tags[first:last], durations, energy,
+                                                self._tag_names, self.domains)
+
+    def at(self, timestamp: float) -> EnergySample:
+        index = int(self._timestamps[:self._length].searchsorted(timestamp, side='right')) - 1
+        if index >= 0 and timestamp < self._timestamps[index] + self._durations[index]:
+            return self._make_sample(index)
+        raise KeyError('no sample measured at this timestamp : ' + str(timestamp))
+
+    def to_power(self) -> List[Tuple[float, Dict[str, float]]]:
+        numpy = require_module('numpy')
+        durations = self._durations[:self._length]
+        indexes = numpy.flatnonzero(durations > 0)
+        power = self._energy[indexes] / durations[indexes, None]
+        return [(timestamp, dict(zip(self._domains, values)))
+                for timestamp, values in zip(self._timestamps[indexes].tolist(), power.tolist())]
+
+    def resample(self, period: float, begin: Optional[float] = None,
+                 end: Optional[float] = None) -> List[Tuple[float, Dict[str, float]]]:
+        numpy = require_module('numpy')
+        if self._length == 0:
+            return []
+        trace_begin, trace_end = self._get_time_range()
+        begin = trace_begin if begin is None else begin
+        end = trace_end if end is None else end
+        bins = _gen_resampling_bins(begin, end, period)
+        if not bins:
+            return []
+
+        # cumulated energy is linear during a sample and constant between two samples : interpolate it on the period
+        # bounds and take the differences to get the energy of each period
+        timestamps = self._timestamps[:self._length]
+        bounds = numpy.empty(2 * self._length)
+        bounds[0::2] = timestamps
+        bounds[1::2] = timestamps + self._durations[:self._length]
+        cumulated_energy = numpy.cumsum(self._energy[:self._length], axis=0)
+        bound_energy = numpy.empty((2 * self._length, len(self._domains)))
+        bound_energy[0] = 0
+        bound_energy[2::2] = cumulated_energy[:-1]
+        bound_energy[1::2] = cumulated_energy
+
+        period_bounds = numpy.append(numpy.array(bins), min(bins[-1] + period, end))
+        period_lengths = numpy.diff(period_bounds)
+        power = numpy.empty((len(bins), len(self._domains)))
+        for domain_index in range(len(self._domains)):
+            period_energy = numpy.interp(period_bounds, bounds, bound_energy[:, domain_index])
+            power[:, domain_index] = numpy.diff(period_energy) / period_lengths
+        return [(timestamp, dict(zip(self._domains, values))) for timestamp, values in zip(bins, power.tolist())]
+
+    def aggregate(self, by: Union[str, Callable[[EnergySample], Any]] = 'tag',
+                  percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[Any, EnergyAggregate]:
+        if by != 'tag':
+            return EnergyTrace.aggregate(self, by, percentiles)
+
+        numpy = require_module('numpy')
+        percentiles = tuple(percentiles)
+        tags = self._tags[:self._length]
+        order = numpy.argsort(tags, kind='stable')
+        energy = self._energy[:self._length][order]
+        codes, starts, counts = numpy.unique(tags[order], return_index=True, return_counts=True)
+        if len(codes) == 0:
+            return {}
+
+        totals = numpy.add.reduceat(energy, starts, axis=0)
+        minimums = numpy.minimum.reduceat(energy, starts, axis=0)
+        maximums = numpy.maximum.reduceat(energy, starts, axis=0)
+        durations = numpy.add.reduceat(self._durations[:self._length][order], starts)
+
+        aggregates = {}
+        for code, start, count, total, minimum, maximum, duration in zip(codes.tolist(), starts, counts.tolist(),
+                                                                         totals, minimums, maximums,
+                                                                         durations.tolist()):
+            tag = self._tag_names[code]
+            group_percentiles = {domain: {} for domain in self._domains}
+            if percentiles:
+                values = numpy.percentile(energy[start:start + count], percentiles, axis=0)
+                for percentile, domain_values in zip(percentiles, values.tolist()):
+                    for domain, value in zip(self._domains, domain_values):
+                        group_percentiles[domain][percentile] = value
+            aggregates[tag] = EnergyAggregate(tag, count, duration, dict(zip(self._domains, total.tolist())),
+                                              dict(zip(self._domains, (total / count).tolist())),
+                                              dict(zip(self._domains, minimum.tolist())),
+                                              dict(zip(self._domains, maximum.tolist())), group_percentiles)
+        return {tag: aggregates[tag] for tag in sorted(aggregates, key=self._first_index.get)}
+
+    def remove_idle(self, idle: Union[List[Dict[str, float]], Any]):
+        """
+        substract idle energy values from the current trace
+
+        :param idle: list of idle consumption values to substract to current trace, grouped in a dictionary with
+                     their domain as key. Can also be a matrix with one row per sample and one column per domain, in
+                     the :py:attr:`domains` order
+        :raise ValueError: if the number of values in the list doesn't match the number of sample in the trace
+                           or if a domain of the trace is not in the idle values
+        """
+        numpy = require_module('numpy')
+        if len(idle) != self._length:
+            raise ValueError('idle list havn\'t the same length than the trace')
+        if self._length == 0:
+            return
+
+        if isinstance(idle, numpy.ndarray):
+            idle_matrix = idle
+        else:
+            for idle_energy in idle:
+                for domain in self._domains:
+                    if domain not in idle_energy:
+                        raise ValueError('domain not present in idle values : ' + domain)
+            idle_matrix = [[idle_energy[domain] for domain in self._domains] for idle_energy in idle]
+        idle_matrix = numpy.asarray(idle_matrix, dtype=numpy.float64)
+        if idle_matrix.shape != (self._length, len(self._domains)):
+            raise ValueError('idle matrix shape doesn\'t match the trace : ' + str(idle_matrix.shape))
+        # not in place : the energy column may be shared with traces returned by between
+        self._energy = self._energy[:self._length] - idle_matrix
+
+    def _evaluate_column_guards(self, column_guards):
+        numpy = require_module('numpy')
+        valid = (self._energy[:self._length] >= 0).all(axis=1)
+        if column_guards:
+            columns = self.to_numpy()
+            for guard in column_guards:
+                numpy.logical_and(valid, guard(columns), out=valid)
+        return valid
+
+    def clean_data(self, guards: List[Callable[[EnergySample], bool]] = [],
+                   column_guards: List[Callable[[TraceColumns], Any]] = []):
+        numpy = require_module('numpy')
+        valid = self._evaluate_column_guards(column_guards)
+        if guards:
+            for index in numpy.flatnonzero(valid):
+                sample = self._make_sample(index)
+                if not all(guard(sample) for guard in guards):
+                    valid[index] = False
+
+        indexes = numpy.flatnonzero(valid)
+        self._timestamps = self._timestamps[indexes]
+        self._tags = self._tags[indexes]
+        self._durations = self._durations[indexes]
+        self._energy = self._energy[indexes]
+        self._length = len(indexes)
+        self._index_tags()
@@ -0,0 +1,201 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import logging
+import queue
+import threading
+import weakref
+
+from ..energy_trace import EnergyTrace
+from .handler import EnergyHandler
+
+#: wait for a free place in the queue when it is full
+BLOCK_POLICY = 'block'
+#: drop the processed trace when the queue is full
+DROP_POLICY = 'drop'
+
+_STOP_WORKER = object()
+
+
+class DispatchMetrics:
+    """
+    Metrics of an :py:class:`AsyncDispatchHandler`
+
+    :var max_queue_depth: maximal number of traces that were waiting in the queue at the same time
+    :vartype max_queue_depth: int
+    :var dispatched_count: number of traces forwarded to the wrapped handler
+    :vartype dispatched_count: int
+    :var dropped_count: number of traces dropped because the queue was full
+    :vartype dropped_count: int
+    :var error_count: number of traces whose dispatch raised an exception
+    :vartype error_count: int
+    """
+    def __init__(self):
+        self.max_queue_depth = 0
+        self.dispatched_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+
+
+class _SaveRequest:
+    """
+    queue marker asking the worker to call the wrapped handler ``save_data`` method
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+def _dispatch(handler, trace_queue, metrics, save_after_dispatch):
+    """
+    worker thread loop : forward the queued traces to the wrapped handler until the stop marker is dequeued
+
+    the wrapped handler is only used by this thread, so traces can't be processed while it saves its data
+    """
+    while True:
+        trace = trace_queue.get()
+        try:
+            if trace is _STOP_WORKER:
+                return
+            if isinstance(trace, _SaveRequest):
+                try:
+                    handler.save_data()
+                except Exception as exn:
+                    trace.error = exn
+                trace.done.set()
+                continue
+            handler.process(trace)
+            metrics.dispatched_count += 1
+            if save_after_dispatch and trace_queue.unfinished_tasks == 1:
+                handler.save_data()
+        except Exception:
+            logging.getLogger(__name__).exception('error while dispatching an energy trace')
+            metrics.error_count += 1
+        finally:
+            trace_queue.task_done()
+
+
+def _stop_worker(trace_queue, worker):
+    """
+    ask the worker to stop once the queued traces are dispatched and wait for it
+    """
+    trace_queue.put(_STOP_WORKER)
+    worker.join()
+
+
+class AsyncDispatchHandler(EnergyHandler):
+    """
+    Handler that forward the processed traces to another handler from a background thread, so the wrapped handler
+    never slows down the measured code. Traces are stored in a bounded queue until the worker thread dispatch them.
+    Queued traces are dispatched before the worker stops, when the handler is closed, garbage collected or when the
+    interpreter exits
+
+    :var metrics: queue and dispatch metrics
+    :vartype metrics: DispatchMetrics
+    """
+
+    def __init__(self, handler: EnergyHandler, max_queue_size: int = 1000, policy: str = BLOCK_POLICY,
+                 save_after_dispatch: bool = False):
+        """
+        :param handler: handler that will receive the processed traces
+        :param max_queue_size: maximal number of traces waiting to be dispatched
+        :param policy: behaviour when a trace is processed while the queue is full. ``BLOCK_POLICY`` wait for a free
+                       place, ``DROP_POLICY`` drop the trace
+        :param save_after_dispatch: if True, call the wrapped handler ``save_data`` method each time the worker emptied
+                                    the queue
+        :raise ValueError: if the policy is unknown or if max_queue_size isn't positive
+        """
+        EnergyHandler.__init__(self)
+        if policy not in (BLOCK_POLICY, DROP_POLICY):
+            raise ValueError('unknown queue policy : ' + str(policy))
+        if max_queue_size <= 0:
+            raise ValueError('queue size must be positive : ' + str(max_queue_size))
+
+        self.handler = handler
+        self.policy = policy
+        self.metrics = DispatchMetrics()
+
+        self._queue = queue.Queue(max_queue_size)
+        self._metrics_lock = threading.Lock()
+        worker = threading.Thread(target=_dispatch, args=(handler, self._queue, self.metrics, save_after_dispatch),
+                                  name='pyJoules-handler-dispatch', daemon=True)
+        worker.start()
+        self._worker_finalizer = weakref.finalize(self, _stop_worker, self._queue, worker)
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        number of traces waiting to be dispatched
+        """
+        return self._queue.qsize()
+
+    def process(self, trace: EnergyTrace):
+        """
+        queue the trace to be dispatched to the wrapped handler
+
+        :raise ValueError: if the handler is closed
+        """
+        if not self._worker_finalizer.alive:
+            raise ValueError('trace processed by a closed handler')
+        if self.policy == BLOCK_POLICY:
+            self._queue.put(trace)
+        else:
+            try:
+                self._queue.put_nowait(trace)
+            except queue.Full:
+                with self._metrics_lock:
+                    self.metrics.dropped_count += 1
+                return
+        with self._metrics_lock:
+            self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self._queue.qsize())
+
+    def flush(self):
+        """
+        wait until all the queued traces are dispatched
+        """
+        self._queue.join()
+
+    def save_data(self):
+        """
+        wait until the traces queued before this call are dispatched and the wrapped handler ``save_data`` method is
+        called. The wrapped handler data are saved from the worker thread, so traces processed while the data are
+        saved are dispatched afterwards instead of being lost
+
+        :raise Exception: the exception raised by the wrapped handler ``save_data`` method
+        """
+        if not self._worker_finalizer.alive:
+            self.handler.save_data()
+            return
+        request = _SaveRequest()
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+
+    def close(self):
+        """
+        dispatch the queued traces and stop the worker thread
+        """
+        self._worker_finalizer()
+
+    def __enter__(self) -> 'AsyncDispatchHandler':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
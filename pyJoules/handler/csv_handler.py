@@ -18,48 +18,231 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import os.path
+import time
+import weakref
+from itertools import islice
+from typing import Iterator, Optional
+
+from . import EnergyHandler, UnconsistantSamplesError
+from ..energy_trace import EnergySample, EnergyTrace, ColumnarEnergyTrace, DomainSchema
+
+# default size of the write buffer of a persistent CSVHandler
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# default number of samples in the chunks read by iter_trace_chunks
+DEFAULT_CHUNK_SIZE = 10000
+
+HEADER_BEGINING = ['timestamp', 'tag', 'duration']
 
-from . import EnergyHandler
 
 class CSVHandler(EnergyHandler):
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, persistent: bool = False, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_interval: Optional[float] = None, max_memory_samples: Optional[int] = None,
+                 spill_directory: Optional[str] = None):
         """
         :param filename: file name to store processed trace
+        :param persistent: if True, keep the file open between two calls to :py:meth:`save_data` and buffer the
+                           written lines. The buffer is flushed when it is full, when flush_interval is elapsed, when
+                           the handler is closed and when the interpreter exits
+        :param buffer_size: size of the write buffer in bytes, in persistent mode
+        :param flush_interval: in persistent mode, maximum time in seconds between two flushes of the buffer, checked
+                               when data are saved. If None, the buffer is only flushed when it is full or closed
+        :param max_memory_samples: maximum number of processed samples kept in memory until they are saved, older
+                                   traces are spilled to a temporary file. If None, all the traces are kept in memory
+        :param spill_directory: directory of the temporary file receiving the spilled traces
         """
-        EnergyHandler.__init__(self)
+        EnergyHandler.__init__(self, max_memory_samples, spill_directory)
 
         self._filename = filename
+        self._persistent = persistent
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+
+        self._csv_file = None
+        self._file_finalizer = None
+        self._domain_names = None
+        self._line_template = None
+        self._last_flush = None
 
-    def _gen_header(self, first_sample):
-        domain_names = first_sample.energy.keys()
+    def _gen_header(self, domain_names):
         return 'timestamp;tag;duration;' + ';'.join(domain_names)
 
-    def _gen_sample_line(self, sample, domain_names):
-        line_begining = f'{sample.timestamp};{sample.tag};{sample.duration};'
-        energy_values = [str(sample.energy[domain]) for domain in domain_names]
-        return line_begining + ';'.join(energy_values)
+    @staticmethod
+    def _gen_line_template(domain_names):
+        return '{};{};{};' + ';'.join(['{}'] * len(domain_names)) + '\n'
 
-    def _init_file(self, first_sample):
+    def _gen_lines(self, trace, domain_names):
+        template = self._gen_line_template(domain_names)
+        domain_names = tuple(domain_names)
+        lines = []
+        for sample in trace:
+            if sample.schema.names == domain_names:
+                values = sample.values
+            else:
+                values = [sample.energy[domain] for domain in domain_names]
+            lines.append(template.format(sample.timestamp, sample.tag, sample.duration, *values))
+        return ''.join(lines)
+
+    def _init_file(self, domain_names):
         if os.path.exists(self._filename):
             csv_file = open(self._filename, 'a+')
             return csv_file
         else:
             csv_file = open(self._filename, 'w+')
-            csv_file.write(self._gen_header(first_sample) + '\n')
+            csv_file.write(self._gen_header(domain_names) + '\n')
             return csv_file
 
+    def _open_persistent_file(self, domain_names):
+        """
+        open the file for the handler lifetime and check once that its header match the processed samples
+        """
+        header = self._gen_header(domain_names)
+        if os.path.exists(self._filename) and os.path.getsize(self._filename) > 0:
+            with open(self._filename, 'r') as csv_file:
+                file_header = csv_file.readline().rstrip('\n')
+            if file_header != header:
+                raise UnconsistantSamplesError()
+            self._csv_file = open(self._filename, 'a', buffering=self._buffer_size)
+        else:
+            self._csv_file = open(self._filename, 'w', buffering=self._buffer_size)
+            self._csv_file.write(header + '\n')
+
+        self._domain_names = tuple(domain_names)
+        self._file_finalizer = weakref.finalize(self, self._csv_file.close)
+        self._last_flush = time.monotonic()
+
+    def _write_traces(self, csv_file, traces, domain_names):
+        for trace in traces:
+            csv_file.write(self._gen_lines(trace, domain_names))
+
+    def _save_data_in_persistent_file(self, stored):
+        if self._csv_file is None:
+            self._open_persistent_file(stored.schema.names)
+        elif stored.schema.names != self._domain_names:
+            raise UnconsistantSamplesError()
+
+        self._write_traces(self._csv_file, stored, self._domain_names)
+        if self._flush_interval is not None and time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+
     def save_data(self):
         """
         append processed trace to the file
+
+        traces processed while the data are saved are kept for the next call. If the data can't be saved, the traces
+        are kept too
+        """
+        stored = self._detach_traces()
+        if stored.schema is None:
+            stored.close()
+            return
+        try:
+            if not stored.consistent:
+                raise UnconsistantSamplesError()
+            if self._persistent:
+                self._save_data_in_persistent_file(stored)
+            else:
+                csv_file = self._init_file(stored.schema.names)
+                self._write_traces(csv_file, stored, stored.schema.names)
+                csv_file.close()
+        except Exception:
+            self._restore_traces(stored)
+            raise
+        stored.close()
+
+    def flush(self):
         """
-        flatened_trace = self._flaten_trace()
-        first_sample = flatened_trace[0]
-        domain_names = first_sample.energy.keys()
+        write the buffered lines to the file, in persistent mode
+        """
+        if self._csv_file is not None:
+            self._csv_file.flush()
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        """
+        flush the buffered lines and close the file, in persistent mode. The file is reopened by the next call to
+        :py:meth:`save_data`
+        """
+        if self._csv_file is not None:
+            self._file_finalizer()
+            self._csv_file = None
+            self._file_finalizer = None
+
+    def __enter__(self) -> 'CSVHandler':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _read_header(csv_file, filename):
+    header = csv_file.readline()
+    if header == '':
+        return None
+    columns = header.rstrip('\n').split(';')
+    if columns[:3] != HEADER_BEGINING:
+        raise ValueError('not a pyJoules csv file : ' + filename)
+    return DomainSchema.get(columns[3:])
+
+
+def _parse_line(line, schema):
+    fields = line.rstrip('\n').split(';')
+    domain_number = len(schema)
+    if len(fields) < 3 + domain_number:
+        raise ValueError('bad csv line : ' + line)
+    # tags may contain the separator, all the other fields are numbers
+    duration_position = len(fields) - domain_number - 1
+    return EnergySample.from_values(float(fields[0]), ';'.join(fields[1:duration_position]),
+                                    float(fields[duration_position]),
+                                    schema, tuple(float(value) for value in fields[duration_position + 1:]))
+
+
+def iter_samples(filename: str) -> Iterator[EnergySample]:
+    """
+    Lazily read the samples of a csv file written by a :py:class:`CSVHandler`
+
+    :param filename: name of the csv file
+    :raise ValueError: if the file is not a csv file written by a CSVHandler
+    """
+    with open(filename, 'r') as csv_file:
+        schema = _read_header(csv_file, filename)
+        if schema is None:
+            return
+        for line in csv_file:
+            if line.strip():
+                yield _parse_line(line, schema)
+
+
+def iter_trace_chunks(filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      columnar: bool = False) -> Iterator[EnergyTrace]:
+    """
+    Read a csv file written by a :py:class:`CSVHandler` as a sequence of traces, to process files that don't fit in
+    memory
+
+    :param filename: name of the csv file
+    :param chunk_size: maximum number of samples of each trace
+    :param columnar: if True, return :py:class:`~pyJoules.energy_trace.ColumnarEnergyTrace` (needs numpy)
+    :raise ValueError: if the file is not a csv file written by a CSVHandler or if chunk_size isn't positive
+    """
+    if chunk_size <= 0:
+        raise ValueError('chunk size must be positive : ' + str(chunk_size))
+    samples = iter_samples(filename)
+    while True:
+        chunk = list(islice(samples, chunk_size))
+        if not chunk:
+            return
+        yield ColumnarEnergyTrace(chunk) if columnar else EnergyTrace(chunk)
+
 
-        csv_file = self._init_file(first_sample)
+def load_trace(filename: str, columnar: bool = False) -> EnergyTrace:
+    """
+    Read a csv file written by a :py:class:`CSVHandler`
 
-        for sample in flatened_trace:
-            csv_file.write(self._gen_sample_line(sample, domain_names) + '\n')
-        csv_file.close()
-        self.traces = []
+    :param filename: name of the csv file
+    :param columnar: if True, return a :py:class:`~pyJoules.energy_trace.ColumnarEnergyTrace` (needs numpy)
+    :raise ValueError: if the file is not a csv file written by a CSVHandler
+    """
+    if columnar:
+        return ColumnarEnergyTrace(iter_samples(filename))
+    return EnergyTrace(iter_samples(filename))
@@ -17,8 +17,13 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import pickle
+import shutil
+import tempfile
+import threading
+from typing import Iterator, Optional
 
-from ..energy_trace import EnergyTrace
+from ..energy_trace import EnergyTrace, ColumnarEnergyTrace, DomainSchema
 
 
 class UnconsistantSamplesError(Exception):
@@ -39,22 +44,212 @@ def _check_samples(samples):
     return True
 
 
+def _iter_trace_schemas(trace):
+    if isinstance(trace, ColumnarEnergyTrace):
+        if len(trace) > 0:
+            yield DomainSchema.get(trace.domains)
+        return
+    for sample in trace:
+        yield sample.schema
+
+
+class _StoredTraces:
+    """
+    Traces detached from a handler storage, owned by the code saving them
+
+    :var schema: energy domains of the first stored sample, None if no sample is stored
+    :var consistent: True if all the stored samples have the same energy domains
+    """
+    def __init__(self, spill_file, spilled_trace_count, traces, schema, consistent):
+        self.spill_file = spill_file
+        self.spilled_trace_count = spilled_trace_count
+        self.traces = traces
+        self.schema = schema
+        self.consistent = consistent
+
+    def __iter__(self) -> Iterator[EnergyTrace]:
+        """
+        iterate on the traces in processing order, reading the spilled traces one at a time
+        """
+        if self.spill_file is not None:
+            self.spill_file.seek(0)
+            for _ in range(self.spilled_trace_count):
+                yield pickle.load(self.spill_file)
+        yield from self.traces
+
+    def close(self):
+        """
+        remove the spill file
+        """
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+
 class EnergyHandler:
     """
     An object that can handle the measured value of an energy trace
+
+    Processed traces are stored until the handler save them. With a memory cap, the oldest traces are spilled to a
+    temporary append-only file when the stored traces contain more samples than the cap, and replayed when the
+    handler save them
+
+    :var traces: processed traces stored in memory
+    :vartype traces: List[EnergyTrace]
     """
 
-    def __init__(self):
+    def __init__(self, max_memory_samples: Optional[int] = None, spill_directory: Optional[str] = None):
+        """
+        :param max_memory_samples: maximum number of samples stored in memory. If None, all the processed traces are
+                                   kept in memory
+        :param spill_directory: directory of the temporary file receiving the spilled traces. If None, the default
+                                temporary directory is used
+        :raise ValueError: if max_memory_samples is negative
+        """
+        if max_memory_samples is not None and max_memory_samples < 0:
+            raise ValueError('memory cap must not be negative : ' + str(max_memory_samples))
         self.traces = []
+        self.max_memory_samples = max_memory_samples
+
+        self._spill_directory = spill_directory
+        self._spill_file = None
+        self._spilled_trace_count = 0
+        self._memory_sample_count = 0
+        self._stored_schema = None
+        self._stored_consistent = True
+        self._storage_lock = threading.Lock()
+
+    @property
+    def spilled_trace_count(self) -> int:
+        """
+        number of stored traces that were spilled to disk
+        """
+        return self._spilled_trace_count
 
     def process(self, trace: EnergyTrace):
         """
         """
-        self.traces.append(trace)
+        with self._storage_lock:
+            self._check_trace_schema(trace)
+            self.traces.append(trace)
+            if self.max_memory_samples is not None:
+                self._memory_sample_count += len(trace)
+                if self._memory_sample_count > self.max_memory_samples:
+                    self._spill_traces()
+
+    def _check_trace_schema(self, trace):
+        """
+        keep track of the consistency of the stored samples energy domains, so saving handlers don't have to read the
+        stored traces twice
+        """
+        if not self._stored_consistent:
+            return
+        for schema in _iter_trace_schemas(trace):
+            if self._stored_schema is None:
+                self._stored_schema = schema
+            elif schema is not self._stored_schema:
+                self._stored_consistent = False
+                return
+
+    def _spill_traces(self):
+        """
+        append the oldest traces stored in memory to the spill file until the memory cap is respected
+        """
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix='pyjoules_spill_', dir=self._spill_directory)
+        self._spill_file.seek(0, 2)
+        spilled = 0
+        while self._memory_sample_count > self.max_memory_samples and spilled < len(self.traces):
+            trace = self.traces[spilled]
+            pickle.dump(trace, self._spill_file, pickle.HIGHEST_PROTOCOL)
+            self._memory_sample_count -= len(trace)
+            spilled += 1
+        del self.traces[:spilled]
+        self._spilled_trace_count += spilled
+
+    def _iter_traces(self) -> Iterator[EnergyTrace]:
+        """
+        iterate on the stored traces in processing order, reading the spilled traces one at a time
+        """
+        with self._storage_lock:
+            spill_file = self._spill_file
+            spilled_trace_count = self._spilled_trace_count
+            traces = list(self.traces)
+
+        position = 0
+        for _ in range(spilled_trace_count):
+            with self._storage_lock:
+                spill_file.seek(position)
+                trace = pickle.load(spill_file)
+                position = spill_file.tell()
+            yield trace
+        yield from traces
+
+    def _reset_storage(self):
+        self.traces = []
+        self._spill_file = None
+        self._spilled_trace_count = 0
+        self._memory_sample_count = 0
+        self._stored_schema = None
+        self._stored_consistent = True
+
+    def _detach_traces(self) -> _StoredTraces:
+        """
+        remove the stored traces from the handler and return them. Traces processed afterwards are stored for the next
+        save
+        """
+        with self._storage_lock:
+            stored = _StoredTraces(self._spill_file, self._spilled_trace_count, self.traces, self._stored_schema,
+                                   self._stored_consistent)
+            self._reset_storage()
+        return stored
+
+    def _restore_traces(self, stored: _StoredTraces):
+        """
+        store again traces that could not be saved, before the traces processed since they were detached
+        """
+        with self._storage_lock:
+            if self._spill_file is None:
+                spill_file = stored.spill_file
+                spilled_trace_count = stored.spilled_trace_count
+                traces = stored.traces + self.traces
+            else:
+                spill_file = stored.spill_file
+                if spill_file is None:
+                    spill_file = tempfile.TemporaryFile(prefix='pyjoules_spill_', dir=self._spill_directory)
+                spill_file.seek(0, 2)
+                for trace in stored.traces:
+                    pickle.dump(trace, spill_file, pickle.HIGHEST_PROTOCOL)
+                self._spill_file.seek(0)
+                shutil.copyfileobj(self._spill_file, spill_file)
+                self._spill_file.close()
+                spilled_trace_count = stored.spilled_trace_count + len(stored.traces) + self._spilled_trace_count
+                traces = self.traces
+
+            if stored.schema is not None:
+                if self._stored_schema is not None and self._stored_schema is not stored.schema:
+                    self._stored_consistent = False
+                self._stored_schema = stored.schema
+                self._stored_consistent = self._stored_consistent and stored.consistent
+
+            self._spill_file = spill_file
+            self._spilled_trace_count = spilled_trace_count
+            self.traces = traces
+            stored.spill_file = None
+            if self.max_memory_samples is not None:
+                self._memory_sample_count = sum(len(trace) for trace in traces)
+                if self._memory_sample_count > self.max_memory_samples:
+                    self._spill_traces()
+
+    def _clear_traces(self):
+        """
+        remove the stored traces, in memory and on disk
+        """
+        self._detach_traces().close()
 
     def _flaten_trace(self):
         flatened_trace = EnergyTrace([])
-        for trace in self.traces:
+        for trace in self._iter_traces():
             flatened_trace += trace
         if not _check_samples(flatened_trace):
             raise UnconsistantSamplesError()
@@ -17,16 +17,31 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from typing import Dict, Iterable
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
-try:
-    import pymongo
-except ImportError:
-    import logging
-    logging.getLogger().info("PyMongo is not installed.")
+from ..optional_dependency import require_module
+from . import EnergyHandler, UnconsistantSamplesError
+from .handler import _StoredTraces
+from ..energy_trace import EnergySample, EnergyTrace, ColumnarEnergyTrace, DomainSchema
 
-from . import EnergyHandler
-from ..energy_trace import EnergySample
+#: one document per trace, containing one subdocument per sample
+ROW_LAYOUT = 'row'
+#: one document per trace, containing one array per sample field and per energy domain
+COLUMNAR_LAYOUT = 'columnar'
+
+#: default maximum number of documents sent in one bulk write
+DEFAULT_BATCH_SIZE = 1000
+#: default number of retries of a bulk write that failed with a transient error
+DEFAULT_MAX_RETRIES = 3
+#: default time in seconds waited before the first retry, doubled at each retry
+DEFAULT_RETRY_BACKOFF = 0.1
+
+# mongodb error code of a duplicate key error, raised when a retried bulk write insert already inserted documents
+_DUPLICATE_KEY_ERROR = 11000
 
 
 def sample_to_dict(sample: EnergySample) -> Dict:
@@ -37,7 +52,7 @@ def sample_to_dict(sample: EnergySample) -> Dict:
         'timestamp': sample.timestamp,
         'tag': sample.tag,
         'duration': sample.duration,
-        'energy': sample.energy,
+        'energy': dict(sample.energy),
     }
 
 
@@ -51,6 +66,87 @@ def trace_to_dict(trace: Iterable[EnergySample], trace_name: str) -> Dict:
     }
 
 
+def trace_to_columnar_dict(trace: Iterable[EnergySample], trace_name: str) -> Dict:
+    """
+    convert a trace to a dictionary that could be inserted in a mongodb database, storing each sample field and the
+    energy of each domain in a separate array. The document also contains the trace total duration and energy
+
+    :raise UnconsistantSamplesError: if the samples of the trace don't have the same energy domains
+    """
+    if isinstance(trace, ColumnarEnergyTrace):
+        columns = trace.to_numpy()
+        domains = list(columns.domains)
+        timestamps = columns.timestamps.tolist()
+        tags = [columns.tag_names[code] for code in columns.tags.tolist()]
+        durations = columns.durations.tolist()
+        energy = columns.energy.T.tolist()
+    else:
+        samples = list(trace)
+        domains = list(samples[0].energy) if samples else []
+        timestamps = [sample.timestamp for sample in samples]
+        tags = [sample.tag for sample in samples]
+        durations = [sample.duration for sample in samples]
+        energy = [[] for _ in domains]
+        for sample in samples:
+            if list(sample.energy) != domains:
+                raise UnconsistantSamplesError()
+            for domain_values, value in zip(energy, sample.energy.values()):
+                domain_values.append(value)
+
+    return {
+        'name': trace_name,
+        'layout': COLUMNAR_LAYOUT,
+        'timestamps': timestamps,
+        'tags': tags,
+        'durations': durations,
+        'energy': dict(zip(domains, energy)),
+        'total': {
+            'duration': sum(durations),
+            'energy': {domain: sum(values) for domain, values in zip(domains, energy)},
+        },
+    }
+
+
+def _iter_document_samples(document):
+    if document.get('layout', ROW_LAYOUT) == ROW_LAYOUT:
+        for sample in document['trace']:
+            yield EnergySample(sample['timestamp'], sample['tag'], sample['duration'], sample['energy'])
+        return
+
+    energy = document['energy']
+    schema = DomainSchema.get(energy)
+    for timestamp, tag, duration, *values in zip(document['timestamps'], document['tags'], document['durations'],
+                                                 *energy.values()):
+        yield EnergySample.from_values(timestamp, tag, duration, schema, tuple(values))
+
+
+def dict_to_trace(document: Dict[str, Any], columnar: bool = False) -> EnergyTrace:
+    """
+    convert a document stored by a :py:class:`MongoHandler` to a trace, whatever the layout used to store it
+
+    :param document: document read from the mongodb database
+    :param columnar: if True, return a :py:class:`~pyJoules.energy_trace.ColumnarEnergyTrace` (needs numpy)
+    :raise ValueError: if the document layout is unknown
+    """
+    if document.get('layout', ROW_LAYOUT) not in (ROW_LAYOUT, COLUMNAR_LAYOUT):
+        raise ValueError('unknown trace layout : ' + str(document['layout']))
+    if columnar:
+        return ColumnarEnergyTrace(_iter_document_samples(document))
+    return EnergyTrace(_iter_document_samples(document))
+
+
+def iter_traces(collection, columnar: bool = False) -> Iterator[Tuple[str, EnergyTrace]]:
+    """
+    Read the traces stored by a :py:class:`MongoHandler` in a collection
+
+    :param collection: pymongo collection containing the traces
+    :param columnar: if True, return :py:class:`~pyJoules.energy_trace.ColumnarEnergyTrace` (needs numpy)
+    :return: an iterator on the name and the trace of each stored document
+    """
+    for document in collection.find():
+        yield document['name'], dict_to_trace(document, columnar)
+
+
 class MongoInitError(Exception):
     """
     Exception raised when mongoHandler cant be initialized due to error while
@@ -58,9 +154,39 @@ class MongoInitError(Exception):
     """
 
 
+def _flush_periodically(handler_ref, flush_interval, wake_event, stop_event):
+    """
+    flusher thread loop : save the handler data each flush_interval seconds or when the wake event is set, until the
+    stop event is set or the handler is garbage collected
+    """
+    while not stop_event.is_set():
+        wake_event.wait(flush_interval)
+        wake_event.clear()
+        handler = handler_ref()
+        if handler is None:
+            return
+        try:
+            handler.save_data()
+        except Exception:
+            logging.getLogger(__name__).exception('error while saving energy traces on mongo database')
+        del handler
+
+
+def _stop_flusher(wake_event, stop_event, flusher):
+    stop_event.set()
+    wake_event.set()
+    if flusher is not threading.current_thread():
+        flusher.join()
+
+
 class MongoHandler(EnergyHandler):
 
-    def __init__(self, uri: str, database_name: str, collection_name: str, connected_timeout: int = 30000, trace_name_prefix: str = 'trace_'):
+    def __init__(self, uri: str, database_name: str, collection_name: str, connected_timeout: int = 30000,
+                 trace_name_prefix: str = 'trace_', batch_size: int = DEFAULT_BATCH_SIZE,
+                 auto_flush: bool = False, flush_interval: Optional[float] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+                 layout: str = ROW_LAYOUT, max_memory_samples: Optional[int] = None,
+                 spill_directory: Optional[str] = None):
         """
         Create a handler that will store data on mongo database
 
@@ -72,17 +198,52 @@ class MongoHandler(EnergyHandler):
         :param trace_name_prefix: prefix of the trace name used to identify a trace in mongo database. The trace name is
                                   computed as follow : trace_name_prefix + trace_position (trace position is the
                                   position of the current trace in the trace list processed by the handler)
-
+        :param batch_size: maximum number of traces sent to the database in one unordered bulk write
+        :param auto_flush: if True, processed traces are saved on the database as soon as batch_size traces are
+                           waiting to be saved
+        :param flush_interval: if not None, a background thread save the processed traces on the database each
+                               flush_interval seconds. With auto_flush, the background thread also save the full
+                               batches, so the measured code never wait for the database
+        :param max_retries: number of retries of a bulk write that failed with a transient error (network error,
+                            primary election, ...)
+        :param retry_backoff: time in seconds waited before the first retry. This time is doubled at each retry
+        :param layout: layout of the stored documents. ``ROW_LAYOUT`` store a subdocument per sample,
+                       ``COLUMNAR_LAYOUT`` store an array per sample field and per energy domain, and the trace totals
+        :param max_memory_samples: maximum number of processed samples kept in memory until they are saved, older
+                                   traces are spilled to a temporary file. If None, all the traces are kept in memory
+        :param spill_directory: directory of the temporary file receiving the spilled traces
+        :raise ValueError: if batch_size isn't positive or if the layout is unknown
         """
-        EnergyHandler.__init__(self)
+        EnergyHandler.__init__(self, max_memory_samples, spill_directory)
+        if batch_size <= 0:
+            raise ValueError('batch size must be positive : ' + str(batch_size))
+        if layout not in (ROW_LAYOUT, COLUMNAR_LAYOUT):
+            raise ValueError('unknown trace layout : ' + str(layout))
 
         self.collection = None
         self.trace_id = 0
         self.trace_name_prefix = trace_name_prefix
+        self.batch_size = batch_size
+        self.auto_flush = auto_flush
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._trace_to_dict = trace_to_columnar_dict if layout == COLUMNAR_LAYOUT else trace_to_dict
+
+        self._documents = []
+        self._traces_lock = threading.Lock()
+        self._stored_trace_count = 0
+        self._write_lock = threading.RLock()
+        self._flusher_wake_event = None
+        self._flusher_finalizer = None
 
         self._init_database(uri, connected_timeout, database_name, collection_name)
+        if flush_interval is not None:
+            self._start_flusher(flush_interval)
 
     def _init_database(self, uri, connected_timeout, database_name, collection_name):
+        pymongo = require_module('pymongo')
+        self._transient_errors = pymongo.errors.ConnectionFailure
+        self._bulk_write_error = pymongo.errors.BulkWriteError
         try:
             database = pymongo.MongoClient(uri, connectTimeoutMS=connected_timeout, serverSelectionTimeoutMS=connected_timeout)
             database.server_info()
@@ -94,14 +255,99 @@ class MongoHandler(EnergyHandler):
         except Exception as exn:
             raise MongoInitError(' driver msg : ' + str(exn))
 
+    def _start_flusher(self, flush_interval):
+        self._flusher_wake_event = threading.Event()
+        stop_event = threading.Event()
+        flusher = threading.Thread(target=_flush_periodically,
+                                   args=(weakref.ref(self), flush_interval, self._flusher_wake_event, stop_event),
+                                   name='pyJoules-mongo-flusher', daemon=True)
+        flusher.start()
+        self._flusher_finalizer = weakref.finalize(self, _stop_flusher, self._flusher_wake_event, stop_event, flusher)
+
+    def process(self, trace):
+        """
+        store the trace until it is saved on the database. With auto_flush, save the waiting traces when a full batch
+        is waiting
+        """
+        with self._traces_lock:
+            EnergyHandler.process(self, trace)
+            self._stored_trace_count += 1
+            batch_full = self.auto_flush and self._stored_trace_count >= self.batch_size
+        if not batch_full:
+            return
+        if self._flusher_wake_event is not None:
+            self._flusher_wake_event.set()
+        else:
+            self.save_data()
+
+    def _insert_batch(self, documents):
+        """
+        insert the documents with an unordered bulk write, retried with an exponential backoff on transient errors
+
+        documents inserted by a failed attempt keep the _id given by the driver, the duplicate key errors they produce
+        when the write is retried are ignored
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._collection.insert_many(documents, ordered=False)
+                return
+            except self._bulk_write_error as exn:
+                write_errors = exn.details.get('writeErrors', [])
+                if write_errors and all(error['code'] == _DUPLICATE_KEY_ERROR for error in write_errors) and \
+                   not exn.details.get('writeConcernErrors'):
+                    return
+                raise
+            except self._transient_errors:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
     def save_data(self):
         """
         Save processed trace on the database
+
+        Traces are sent by batches of batch_size documents. If a trace can't be converted to a document or if a batch
+        can't be written, the traces that were not saved are kept and will be saved by the next call
+
+        :raise UnconsistantSamplesError: with the columnar layout, if the samples of a trace don't have the same energy
+                                         domains
+        """
+        with self._write_lock:
+            with self._traces_lock:
+                stored = self._detach_traces()
+                self._stored_trace_count = 0
+            conversion_error = None
+            traces = iter(stored)
+            for trace in traces:
+                try:
+                    document = self._trace_to_dict(trace, self.trace_name_prefix + str(self.trace_id))
+                except Exception as exn:
+                    # keep the traces that were not converted, the converted ones are still saved
+                    self._restore_traces(_StoredTraces(None, 0, [trace] + list(traces), stored.schema,
+                                                       stored.consistent))
+                    conversion_error = exn
+                    break
+                self._documents.append(document)
+                self.trace_id += 1
+            stored.close()
+
+            while self._documents:
+                batch = self._documents[:self.batch_size]
+                self._insert_batch(batch)
+                del self._documents[:len(batch)]
+            if conversion_error is not None:
+                raise conversion_error
+
+    def close(self):
+        """
+        stop the background flusher thread and save the processed traces on the database
         """
-        documents = []
-        for trace in self.traces:
-            documents.append(trace_to_dict(trace, self.trace_name_prefix + str(self.trace_id)))
-            self.trace_id += 1
-        self._collection.insert_many(documents)
+        if self._flusher_finalizer is not None:
+            self._flusher_finalizer()
+        self.save_data()
+
+    def __enter__(self) -> 'MongoHandler':
+        return self
 
-        self.traces = []
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
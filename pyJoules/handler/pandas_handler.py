@@ -17,50 +17,120 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import threading
 from typing import Iterable
 
-try:
-    import pandas
-except ImportError:
-    import logging
-    logging.getLogger().info("Pandas is not installed.")
-
+from ..optional_dependency import require_module
 from . import EnergyHandler, UnconsistantSamplesError
-from ..energy_trace import EnergyTrace, EnergySample
-
+from ..energy_trace import EnergyTrace, EnergySample, ColumnarEnergyTrace, DomainSchema
 
-def _gen_column_names(samples):
-    sample = samples[0]
-    names = ['timestamp', 'tag', 'duration']
 
-    for domain_name in sample.energy:
-        names.append(domain_name)
-    return names
+def _trace_columns(trace):
+    """
+    :return: the energy domains schema, the timestamps, tags, durations and per domain energy columns of the trace.
+             The schema is None if the trace is empty
+    :raise UnconsistantSamplesError: if the samples of the trace don't have the same energy domains
+    """
+    if isinstance(trace, ColumnarEnergyTrace):
+        columns = trace.to_numpy()
+        if len(columns.timestamps) == 0:
+            return None, [], [], [], []
+        return (DomainSchema.get(columns.domains), columns.timestamps.tolist(),
+                [columns.tag_names[code] for code in columns.tags.tolist()], columns.durations.tolist(),
+                columns.energy.T.tolist())
+
+    samples = list(trace)
+    if not samples:
+        return None, [], [], [], []
+    schema = samples[0].schema
+    for sample in samples:
+        if sample.schema is not schema:
+            raise UnconsistantSamplesError()
+    return (schema, [sample.timestamp for sample in samples], [sample.tag for sample in samples],
+            [sample.duration for sample in samples],
+            [[sample.values[position] for sample in samples] for position in range(len(schema))])
 
 
-def _gen_data(samples):
-    data = []
-    for sample in samples:
-        data.append(_gen_row(sample))
-    return data
+class _ColumnBuffer:
+    """
+    Append only storage of samples, one list per DataFrame column. Traces are appended atomically, so a buffer can be
+    filled by several threads
+    """
+    def __init__(self, schema=None):
+        self.schema = schema
+        self.timestamps = []
+        self.tags = []
+        self.durations = []
+        self.energy = [] if schema is None else [[] for _ in schema.names]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append_trace(self, trace: Iterable[EnergySample]):
+        """
+        append the samples of the trace to the columns
 
+        :raise UnconsistantSamplesError: if the samples don't have the same energy domains than the stored samples.
+                                         In this case, no sample of the trace is appended
+        """
+        schema, timestamps, tags, durations, energy = _trace_columns(trace)
+        if schema is None:
+            return
+        with self._lock:
+            if self.schema is None:
+                self.schema = schema
+                self.energy = [[] for _ in schema.names]
+            elif schema is not self.schema:
+                raise UnconsistantSamplesError()
+            self.timestamps.extend(timestamps)
+            self.tags.extend(tags)
+            self.durations.extend(durations)
+            for domain_values, trace_domain_values in zip(self.energy, energy):
+                domain_values.extend(trace_domain_values)
+
+    def detach(self) -> '_ColumnBuffer':
+        """
+        remove the stored samples, keeping the energy domains
 
-def _gen_row(sample):
-    row = [sample.timestamp, sample.tag, sample.duration]
+        :return: a buffer containing the removed samples
+        """
+        with self._lock:
+            detached = _ColumnBuffer(self.schema)
+            detached.timestamps, self.timestamps = self.timestamps, detached.timestamps
+            detached.tags, self.tags = self.tags, detached.tags
+            detached.durations, self.durations = self.durations, detached.durations
+            detached.energy, self.energy = self.energy, detached.energy
+        return detached
+
+    def to_dataframe(self, categorical_tags: bool = False, energy_dtype=None) -> 'pandas.DataFrame':
+        """
+        :raise ImportError: if pandas is not installed
+        """
+        pandas = require_module('pandas')
+        if self.schema is None:
+            return pandas.DataFrame()
 
-    for domain_name in sample.energy:
-        row.append(sample.energy[domain_name])
-    return row
+        columns = {
+            'timestamp': pandas.array(self.timestamps, dtype='float64'),
+            'tag': pandas.Categorical(self.tags) if categorical_tags else self.tags,
+            'duration': pandas.array(self.durations, dtype='float64'),
+        }
+        for domain_name, domain_values in zip(self.schema.names, self.energy):
+            columns[domain_name] = pandas.array(domain_values, dtype=energy_dtype) if energy_dtype else domain_values
+        return pandas.DataFrame(columns)
 
 
-def trace_to_dataframe(trace: Iterable[EnergySample]) -> pandas.DataFrame:
+def trace_to_dataframe(trace: Iterable[EnergySample]) -> 'pandas.DataFrame':
     """
     convert an energy trace into a pandas DataFrame
-    """
-    if len(trace) == 0:
-        return pandas.DataFrame()
 
-    return pandas.DataFrame(columns=_gen_column_names(trace), data=_gen_data(trace))
+    :raise ImportError: if pandas is not installed
+    :raise UnconsistantSamplesError: if the samples of the trace don't have the same energy domains
+    """
+    buffer = _ColumnBuffer()
+    buffer.append_trace(trace)
+    return buffer.to_dataframe()
 
 
 class NoSampleProcessedError(Exception):
@@ -72,19 +142,57 @@ class NoSampleProcessedError(Exception):
 class PandasHandler(EnergyHandler):
     """
     handle energy sample to convert them into pandas DataFrame
+
+    processed samples are stored in column buffers. The DataFrame is built incrementally : each call to
+    ``get_dataframe`` only convert the samples processed since the previous call
+
+    as processed traces are not stored as traces, the inherited ``traces`` attribute stays empty and the handler
+    doesn't use the memory cap and the spill to disk of :py:class:`EnergyHandler`
     """
-    def __init__(self):
+    def __init__(self, categorical_tags: bool = False, energy_dtype=None):
+        """
+        :param categorical_tags: if True, store the tag column as a pandas categorical column
+        :param energy_dtype: dtype of the energy columns (for example ``'float32'`` to halve their memory usage). If
+                             None, the dtype is inferred from the measured values
+        """
         EnergyHandler.__init__(self)
-        self.traces = []
+        self.categorical_tags = categorical_tags
+        self.energy_dtype = energy_dtype
+
+        self._buffer = _ColumnBuffer()
+        self._dataframe = None
+        self._dataframe_lock = threading.Lock()
+        self._trace_processed = False
 
     def process(self, trace: EnergyTrace):
-        self.traces.append(trace)
+        """
+        append the samples of the trace to the handler columns
 
-    def get_dataframe(self) -> pandas.DataFrame:
+        :raise UnconsistantSamplesError: if the samples of the trace don't have the same energy domains than the
+                                         previously processed samples
+        """
+        self._buffer.append_trace(trace)
+        self._trace_processed = True
+
+    def _append_buffer_to_dataframe(self):
+        pandas = require_module('pandas')
+        new_rows = self._buffer.detach().to_dataframe(self.categorical_tags, self.energy_dtype)
+        if self._dataframe is None or len(self._dataframe) == 0:
+            self._dataframe = new_rows
+            return
+
+        dataframe = pandas.concat([self._dataframe, new_rows], ignore_index=True)
+        if self.categorical_tags:
+            dataframe['tag'] = pandas.api.types.union_categoricals([self._dataframe['tag'], new_rows['tag']])
+        self._dataframe = dataframe
+
+    def get_dataframe(self) -> 'pandas.DataFrame':
         """
         return the DataFrame containing the processed samples
         """
-        if len(self.traces) > 0:
-            faltened_trace = self._flaten_trace()
-            return trace_to_dataframe(faltened_trace)
-        raise NoSampleProcessedError()
+        if not self._trace_processed:
+            raise NoSampleProcessedError()
+        with self._dataframe_lock:
+            if self._dataframe is None or len(self._buffer) > 0:
+                self._append_buffer_to_dataframe()
+            return self._dataframe.copy(deep=False)
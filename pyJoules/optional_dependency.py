@@ -0,0 +1,64 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Optional dependencies are imported on their first use, as importing them (numpy, pandas, pymongo, pynvml) noticeably
+slows down pyJoules import
+"""
+import importlib
+from types import ModuleType
+from typing import Dict, Optional
+
+_loaded_modules: Dict[str, Optional[ModuleType]] = {}
+
+
+def load_module(module_name: str) -> Optional[ModuleType]:
+    """
+    Import the given optional dependency the first time it is needed
+
+    :param module_name: name of the module to import
+    :return: the imported module, None if it is not installed
+    """
+    if module_name not in _loaded_modules:
+        try:
+            _loaded_modules[module_name] = importlib.import_module(module_name)
+        except ImportError:
+            _loaded_modules[module_name] = None
+    return _loaded_modules[module_name]
+
+
+def load_numpy() -> Optional[ModuleType]:
+    """
+    :return: numpy module, None if numpy is not installed
+    """
+    return load_module('numpy')
+
+
+def require_module(module_name: str) -> ModuleType:
+    """
+    Import the given optional dependency the first time it is needed
+
+    :param module_name: name of the module to import
+    :return: the imported module
+    :raise ImportError: if the module is not installed
+    """
+    module = load_module(module_name)
+    if module is None:
+        raise ImportError(module_name + ' is not installed')
+    return module
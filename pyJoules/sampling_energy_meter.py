@@ -0,0 +1,148 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+import threading
+
+from typing import Dict, List, Optional, Tuple
+
+from .clock import WALL_CLOCK
+from .device import Device
+from .energy_meter import EnergyMeter, ColumnarStateBuffer, STOP_TAG
+from .energy_trace import EnergyTrace
+
+
+class SamplingEnergyMeter(EnergyMeter):
+    """
+    Energy meter that, in addition to the states recorded with start, record, resume and stop, reads the monitored
+    devices from a background thread at a fixed rate while the meter is running. Periodic measures are kept in a
+    bounded ring buffer and can be retrieved as a power time series
+    """
+
+    def __init__(self, devices: List[Device], sampling_interval: float, buffer_size: int = 3600,
+                 default_tag: str = '', columnar: bool = False, clock: str = WALL_CLOCK):
+        """
+        :param devices: list of the monitored devices
+        :param sampling_interval: time between two periodic measures, in seconds
+        :param buffer_size: maximum number of periodic measures kept in memory, older measures are dropped first
+        :param default_tag: tag given if no tag were given to a measure
+        :param columnar: store the tagged states in a ColumnarStateBuffer (see :py:class:`EnergyMeter`)
+        :param clock: clock used to timestamp the measures (see :py:class:`EnergyMeter`)
+        :raise ValueError: if the sampling interval isn't strictly positive or the buffer size is lower than 2
+        """
+        if sampling_interval <= 0:
+            raise ValueError('sampling interval must be strictly positive')
+        EnergyMeter.__init__(self, devices, default_tag=default_tag, columnar=columnar, clock=clock)
+
+        self.sampling_interval = sampling_interval
+        domain_number = sum(len(device.get_configured_domains()) for device in devices)
+        self._periodic_buffer = ColumnarStateBuffer(domain_number, self.clock, capacity=buffer_size)
+        self._lock = threading.Lock()
+        self._current_tag = default_tag
+        self._sampling_thread = None
+        self._stop_event = threading.Event()
+
+    def _read_devices(self):
+        # devices are read from the sampling thread and from the thread using the meter
+        with self._lock:
+            return EnergyMeter._read_devices(self)
+
+    def _append_periodic_state(self, tag):
+        with self._lock:
+            timestamp, values = EnergyMeter._read_devices(self)
+            self._periodic_buffer.append(timestamp, tag, values)
+
+    def _sample(self):
+        next_deadline = time.monotonic() + self.sampling_interval
+        while not self._stop_event.wait(max(0.0, next_deadline - time.monotonic())):
+            self._append_periodic_state(self._current_tag)
+            next_deadline += self.sampling_interval
+            late = time.monotonic() - next_deadline
+            if late > 0:
+                # skip the missed periods instead of sampling in burst to catch up
+                next_deadline += (late // self.sampling_interval + 1) * self.sampling_interval
+
+    def _start_sampling(self):
+        self._append_periodic_state(self._current_tag)
+        self._stop_event.clear()
+        self._sampling_thread = threading.Thread(target=self._sample, name='pyJoules-sampler', daemon=True)
+        self._sampling_thread.start()
+
+    def _stop_sampling(self):
+        if self._sampling_thread is None:
+            return
+        self._stop_event.set()
+        self._sampling_thread.join()
+        self._sampling_thread = None
+        self._append_periodic_state(STOP_TAG)
+
+    def _set_current_tag(self, tag):
+        self._current_tag = tag if tag is not None else self.default_tag
+
+    def is_sampling(self) -> bool:
+        """
+        :return: True if the background sampling thread is running
+        """
+        return self._sampling_thread is not None
+
+    def start(self, tag: Optional[str] = None):
+        """
+        Begin a new energy trace and start sampling the devices in background. Previous periodic measures are
+        discarded
+
+        :param tag: sample name
+        """
+        self._stop_sampling()
+        EnergyMeter.start(self, tag)
+        self._set_current_tag(tag)
+        with self._lock:
+            self._periodic_buffer.clear()
+        self._start_sampling()
+
+    def record(self, tag: Optional[str] = None):
+        EnergyMeter.record(self, tag)
+        self._set_current_tag(tag)
+
+    def resume(self, tag: Optional[str] = None):
+        if not self._is_meter_started():
+            return self.start(tag)
+        EnergyMeter.resume(self, tag)
+        self._set_current_tag(tag)
+        self._start_sampling()
+
+    def stop(self):
+        self._stop_sampling()
+        EnergyMeter.stop(self)
+
+    def get_sampled_trace(self) -> EnergyTrace:
+        """
+        return the energy consumed between each periodic measure still kept in the ring buffer. Each sample is tagged
+        with the tag of the region that was measured when the period began
+        """
+        with self._lock:
+            return self._periodic_buffer.generate_trace(self._get_domain_list(), self._get_max_energy_range_list())
+
+    def get_power_trace(self) -> List[Tuple[float, Dict[str, float]]]:
+        """
+        return the mean power of each monitored domain during each sampling period, in energy unit per second
+
+        :return: a list of (timestamp, power) tuples, where timestamp is the beginning of the period and power a
+                 dictionary associating each domain name to its mean power during the period
+        """
+        return self.get_sampled_trace().to_power()
@@ -0,0 +1,54 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import os
+import pytest
+
+from mock import patch
+
+
+def _fake_preadv(fd, buffers, offset):
+    """
+    pyfakefs doesn't emulate os.preadv, use lseek and read on the (fake) file descriptor instead
+    """
+    os.lseek(fd, offset, os.SEEK_SET)
+    read_size = 0
+    for buffer in buffers:
+        data = os.read(fd, len(buffer))
+        buffer[:len(data)] = data
+        read_size += len(data)
+        if len(data) < len(buffer):
+            break
+    return read_size
+
+
+@pytest.fixture(autouse=True)
+def fake_preadv():
+    with patch('os.preadv', side_effect=_fake_preadv) as mocked_preadv:
+        yield mocked_preadv
+
+
+@pytest.fixture(autouse=True)
+def empty_device_registry():
+    """
+    Devices cached by the shared registry during a test refer to its fake file system, drop them without closing them
+    """
+    from pyJoules.device import get_device_registry
+    with patch.object(get_device_registry(), '_entries', {}):
+        yield get_device_registry()
@@ -20,6 +20,8 @@
 
 import pytest
 
+from mock import patch
+
 from .... utils.rapl_fs import *
 
 from pyJoules.device import NotConfiguredDeviceException
@@ -237,3 +239,77 @@ def test_get_package0_and_all_dram_energy_with_pkg_dram_rapl_api_two_sockets_ret
     assert device.get_energy() == [fs_pkg_dram_two_socket.domains_current_energy['package_0'],
                                    fs_pkg_dram_two_socket.domains_current_energy['dram_0'],
                                    fs_pkg_dram_two_socket.domains_current_energy['dram_1']]
+
+
+###########################
+# ENERGY FILES LIFE CYCLE #
+###########################
+def test_get_energy_after_energy_value_update_return_new_value(fs_pkg_dram_one_socket):
+    device = RaplDevice()
+    device.configure()
+    device.get_energy()
+    fs_pkg_dram_one_socket.reset_values()
+    assert device.get_energy() == [fs_pkg_dram_one_socket.domains_current_energy['package_0'],
+                                   fs_pkg_dram_one_socket.domains_current_energy['dram_0']]
+
+
+def test_get_energy_dont_open_energy_files(fs_pkg_dram_one_socket):
+    device = RaplDevice()
+    device.configure()
+    with patch('pyJoules.device.rapl_device.os.open') as mocked_open:
+        device.get_energy()
+        device.get_energy()
+    assert mocked_open.call_count == 0
+
+
+def test_get_energy_on_closed_device_reopen_energy_files(fs_pkg_one_socket):
+    device = RaplDevice()
+    device.configure()
+    device.close()
+    assert device.get_energy() == [fs_pkg_one_socket.domains_current_energy['package_0']]
+
+
+def test_close_a_non_configured_device_do_nothing(fs_pkg_one_socket):
+    device = RaplDevice()
+    device.close()
+
+
+def test_get_energy_on_non_configured_device_raise_NotConfiguredDeviceException(fs_pkg_one_socket):
+    device = RaplDevice()
+    with pytest.raises(NotConfiguredDeviceException):
+        device.get_energy()
+
+
+def test_use_device_as_context_manager_close_energy_files(fs_pkg_one_socket):
+    with RaplDevice() as device:
+        device.configure()
+        device.get_energy()
+    assert device._api_fds is None
+
+
+#####################
+# MAX ENERGY RANGES #
+#####################
+def test_get_max_energy_ranges_on_non_configured_device_raise_NotConfiguredDeviceException(fs_pkg_dram_one_socket):
+    device = RaplDevice()
+    with pytest.raises(NotConfiguredDeviceException):
+        device.get_max_energy_ranges()
+
+
+def test_get_max_energy_ranges_without_max_range_files_return_None_values(fs_pkg_dram_one_socket):
+    device = RaplDevice()
+    device.configure()
+    assert device.get_max_energy_ranges() == [None, None]
+
+
+def test_get_max_energy_ranges_return_configured_domain_ranges_in_correct_order(fs_pkg_dram_one_socket_with_max_range):
+    device = RaplDevice()
+    device.configure([RaplDramDomain(0), RaplPackageDomain(0)])
+    assert device.get_max_energy_ranges() == [DRAM_MAX_ENERGY_RANGE, PKG_MAX_ENERGY_RANGE]
+
+
+def test_get_max_energy_ranges_dont_read_max_range_files(fs_pkg_dram_one_socket_with_max_range):
+    device = RaplDevice()
+    device.configure()
+    fs_pkg_dram_one_socket_with_max_range.fs.remove_object(SOCKET_0_DIR_NAME + '/max_energy_range_uj')
+    assert device.get_max_energy_ranges() == [PKG_MAX_ENERGY_RANGE, DRAM_MAX_ENERGY_RANGE]
@@ -0,0 +1,126 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import pytest
+
+from mock import patch
+
+from .... utils.rapl_fs import *
+
+from pyJoules.device.rapl_topology import RaplTopology, get_topology, set_topology_cache_file, clear_topology_cache
+from pyJoules.device.rapl_topology import BOOT_ID_FILE
+from pyJoules.exception import NoSuchDeviceError
+
+CACHE_FILE_NAME = '/tmp/rapl_topology.json'
+
+
+@pytest.fixture
+def persistent_cache():
+    set_topology_cache_file(CACHE_FILE_NAME)
+    yield CACHE_FILE_NAME
+    set_topology_cache_file(None)
+
+
+@pytest.fixture
+def boot_id(fs_pkg_dram_one_socket_with_max_range):
+    fs_pkg_dram_one_socket_with_max_range.fs.create_file(BOOT_ID_FILE, contents='boot-1\n')
+    return fs_pkg_dram_one_socket_with_max_range
+
+
+########
+# SCAN #
+########
+def test_scan_without_rapl_api_raise_NoSuchDeviceError(empty_fs):
+    with pytest.raises(NoSuchDeviceError):
+        RaplTopology.scan()
+
+
+def test_scan_two_sockets_return_package_and_dram_sockets(fs_pkg_dram_two_socket):
+    topology = RaplTopology.scan()
+    assert topology.get_sockets('package') == [0, 1]
+    assert topology.get_sockets('dram') == [0, 1]
+    assert topology.get_sockets('core') == []
+
+
+def test_scan_return_correct_energy_file_names(fs_pkg_dram_one_socket):
+    topology = RaplTopology.scan()
+    assert topology.get_energy_file_name('package', 0) == PKG_0_FILE_NAME
+    assert topology.get_energy_file_name('dram', 0) == DRAM_0_FILE_NAME
+
+
+def test_scan_dont_index_psys_zone_as_package(fs_pkg_psys_one_socket):
+    topology = RaplTopology.scan()
+    assert topology.get_sockets('package') == [0]
+
+
+def test_scan_return_correct_max_energy_ranges(fs_pkg_dram_one_socket_with_max_range):
+    topology = RaplTopology.scan()
+    assert topology.get_max_energy_range('package', 0) == PKG_MAX_ENERGY_RANGE
+    assert topology.get_max_energy_range('dram', 0) == DRAM_MAX_ENERGY_RANGE
+
+
+def test_get_energy_file_name_of_unavailable_domain_raise_KeyError(fs_pkg_one_socket):
+    with pytest.raises(KeyError):
+        RaplTopology.scan().get_energy_file_name('dram', 0)
+
+
+def test_topology_converted_to_dict_and_back_is_unchanged(fs_pkg_dram_one_socket_with_max_range):
+    topology = RaplTopology.scan()
+    assert RaplTopology.from_dict(json.loads(json.dumps(topology.to_dict()))).to_dict() == topology.to_dict()
+
+
+#################
+# PROCESS CACHE #
+#################
+def test_get_topology_scan_sysfs_only_once(fs_pkg_dram_one_socket):
+    with patch.object(RaplTopology, 'scan', wraps=RaplTopology.scan) as mocked_scan:
+        get_topology()
+        RaplDevice().configure()
+        RaplDevice().configure()
+    assert mocked_scan.call_count == 1
+
+
+####################
+# PERSISTENT CACHE #
+####################
+def test_get_topology_with_cache_file_write_topology_in_cache_file(boot_id, persistent_cache):
+    get_topology()
+    with open(CACHE_FILE_NAME) as cache_file:
+        assert json.load(cache_file)['boot_id'] == 'boot-1'
+
+
+def test_get_topology_with_valid_cache_file_dont_scan_sysfs(boot_id, persistent_cache):
+    get_topology()
+    clear_topology_cache()
+    with patch.object(RaplTopology, 'scan') as mocked_scan:
+        topology = get_topology()
+    assert mocked_scan.call_count == 0
+    assert topology.get_max_energy_range('package', 0) == PKG_MAX_ENERGY_RANGE
+
+
+def test_get_topology_with_cache_file_from_previous_boot_scan_sysfs(boot_id, persistent_cache):
+    get_topology()
+    clear_topology_cache()
+    with open(BOOT_ID_FILE, 'w') as boot_id_file:
+        boot_id_file.write('boot-2\n')
+    with patch.object(RaplTopology, 'scan', wraps=RaplTopology.scan) as mocked_scan:
+        get_topology()
+    assert mocked_scan.call_count == 1
@@ -0,0 +1,172 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import threading
+import pytest
+
+from mock import patch, Mock
+
+from pyJoules.device import DeviceRegistry
+from pyJoules.energy_meter import measure_energy, EnergyContext
+from pyJoules.handler import EnergyHandler
+from pyJoules.device.rapl_device import RaplPackageDomain, RaplDramDomain
+from ..energy_meter.test_EnergyMeter import CounterDevice
+
+
+@pytest.fixture
+def create_devices():
+    def _create_devices(domains=None):
+        return [Mock()]
+    with patch('pyJoules.device.device_registry.DeviceFactory.create_devices',
+               side_effect=_create_devices) as mocked_create_devices:
+        yield mocked_create_devices
+
+
+@pytest.fixture
+def registry(create_devices):
+    return DeviceRegistry()
+
+
+def test_acquire_same_domains_two_times_create_devices_only_once(registry, create_devices):
+    devices1 = registry.acquire([RaplPackageDomain(0)])
+    devices2 = registry.acquire([RaplPackageDomain(0)])
+    assert devices1 is devices2
+    assert create_devices.call_count == 1
+
+
+def test_acquire_different_domains_create_different_devices(registry, create_devices):
+    devices1 = registry.acquire([RaplPackageDomain(0)])
+    devices2 = registry.acquire([RaplDramDomain(0)])
+    assert devices1 is not devices2
+    assert create_devices.call_count == 2
+
+
+def test_acquire_without_domains_create_devices_for_all_domains(registry, create_devices):
+    assert registry.acquire() is registry.acquire(None)
+    create_devices.assert_called_once_with(None)
+
+
+def test_acquire_increment_reference_count(registry):
+    devices = registry.acquire([RaplPackageDomain(0)])
+    registry.acquire([RaplPackageDomain(0)])
+    assert registry.get_reference_count(devices) == 2
+
+
+def test_release_devices_with_other_users_dont_close_them(registry):
+    devices = registry.acquire([RaplPackageDomain(0)])
+    registry.acquire([RaplPackageDomain(0)])
+    registry.release(devices)
+    assert registry.get_reference_count(devices) == 1
+    devices[0].close.assert_not_called()
+
+
+def test_release_devices_last_user_keep_them_open_and_cached(registry, create_devices):
+    devices = registry.acquire([RaplPackageDomain(0)])
+    registry.release(devices)
+    assert registry.get_reference_count(devices) == 0
+    devices[0].close.assert_not_called()
+    assert registry.acquire([RaplPackageDomain(0)]) is devices
+    assert create_devices.call_count == 1
+
+
+def test_release_unknown_devices_raise_ValueError(registry):
+    with pytest.raises(ValueError):
+        registry.release([Mock()])
+
+
+def test_shutdown_close_all_devices_and_empty_registry(registry, create_devices):
+    devices1 = registry.acquire([RaplPackageDomain(0)])
+    devices2 = registry.acquire([RaplDramDomain(0)])
+    registry.shutdown()
+    devices1[0].close.assert_called_once()
+    devices2[0].close.assert_called_once()
+    assert registry.get_reference_count(devices1) == 0
+    assert registry.acquire([RaplPackageDomain(0)]) is not devices1
+
+
+def test_acquire_from_several_threads_create_devices_only_once(registry, create_devices):
+    results = []
+
+    def acquire():
+        results.append(registry.acquire([RaplPackageDomain(0)]))
+
+    threads = [threading.Thread(target=acquire) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert create_devices.call_count == 1
+    assert all(devices is results[0] for devices in results)
+    assert registry.get_reference_count(results[0]) == 8
+
+
+##########################################
+# DECORATOR AND CONTEXT MANAGER SHARING  #
+##########################################
+@pytest.fixture
+def counter_devices():
+    def _create_devices(domains=None):
+        device = CounterDevice()
+        device.configure()
+        return [device]
+    with patch('pyJoules.device.device_registry.DeviceFactory.create_devices',
+               side_effect=_create_devices) as mocked_create_devices:
+        yield mocked_create_devices
+
+
+def test_decorator_and_context_on_same_domains_share_devices(counter_devices):
+    @measure_energy(handler=EnergyHandler())
+    def foo():
+        pass
+
+    with EnergyContext(handler=EnergyHandler()):
+        foo()
+    assert counter_devices.call_count == 1
+
+
+def test_context_exit_release_devices(counter_devices, empty_device_registry):
+    context = EnergyContext(handler=EnergyHandler())
+    with context as energy_meter:
+        devices = energy_meter.devices
+        assert empty_device_registry.get_reference_count(devices) == 1
+    assert empty_device_registry.get_reference_count(devices) == 0
+
+
+def test_context_never_entered_dont_acquire_devices(counter_devices, empty_device_registry):
+    EnergyContext(handler=EnergyHandler())
+    assert counter_devices.call_count == 0
+    assert empty_device_registry._entries == {}
+
+
+def test_contexts_created_for_each_measure_reuse_opened_devices(counter_devices, empty_device_registry):
+    for _ in range(3):
+        with EnergyContext(handler=EnergyHandler()) as energy_meter:
+            devices = energy_meter.devices
+    assert counter_devices.call_count == 1
+    assert empty_device_registry.acquire() is devices
+
+
+def test_context_entered_two_times_acquire_devices_again(counter_devices, empty_device_registry):
+    context = EnergyContext(handler=EnergyHandler())
+    with context:
+        pass
+    with context:
+        assert empty_device_registry.get_reference_count(context.energy_meter.devices) == 1
+    assert counter_devices.call_count == 1
@@ -0,0 +1,74 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from pyJoules.device.rapl_device import RaplPackageDomain, RaplDramDomain, RaplCoreDomain
+from pyJoules.device.nvidia_device import NvidiaGPUDomain
+
+
+@pytest.mark.parametrize('domain_type', [RaplPackageDomain, NvidiaGPUDomain])
+def test_create_same_domain_two_times_return_the_same_instance(domain_type):
+    assert domain_type(0) is domain_type(0)
+
+
+def test_create_domains_with_different_parameters_return_different_instances():
+    assert RaplPackageDomain(0) is not RaplPackageDomain(1)
+    assert RaplPackageDomain(0) is not RaplDramDomain(0)
+
+
+def test_create_domain_with_keyword_argument_return_the_same_instance():
+    assert RaplPackageDomain(socket=0) is RaplPackageDomain(0)
+    assert NvidiaGPUDomain(device_id=1) is NvidiaGPUDomain(1)
+
+
+def test_domains_have_distinct_stable_indexes():
+    package_index = RaplPackageDomain(0).index
+    assert RaplPackageDomain(0).index == package_index
+    assert RaplDramDomain(0).index != package_index
+    assert NvidiaGPUDomain(0).index != package_index
+
+
+def test_domains_can_be_used_as_dictionary_keys_and_set_members():
+    domains = {RaplPackageDomain(0): 'package', NvidiaGPUDomain(0): 'gpu'}
+    assert domains[RaplPackageDomain(0)] == 'package'
+    assert NvidiaGPUDomain(0) in set(domains)
+    assert RaplDramDomain(0) not in set(domains)
+
+
+def test_unpickled_domain_is_the_interned_instance():
+    assert pickle.loads(pickle.dumps(RaplPackageDomain(0))) is RaplPackageDomain(0)
+
+
+def test_unpickled_domain_keep_the_index_of_the_current_process():
+    # the domain is pickled in a process where its index differs from its index in the current process
+    code = ('import pickle, sys; from pyJoules.device.rapl_device import RaplDramDomain, RaplCoreDomain; '
+            'RaplDramDomain(0); sys.stdout.buffer.write(pickle.dumps(RaplDramDomain(0)))')
+    pickled_domain = subprocess.run([sys.executable, '-c', code], capture_output=True, check=True).stdout
+
+    core_index = RaplCoreDomain(0).index
+    dram_index = RaplDramDomain(0).index
+    domain = pickle.loads(pickled_domain)
+    assert domain is RaplDramDomain(0)
+    assert domain.index == dram_index
+    assert RaplCoreDomain(0).index == core_index != dram_index
@@ -0,0 +1,111 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import asyncio
+import threading
+import pytest
+
+from mock import patch
+
+from pyJoules.energy_meter import measure_energy, EnergyContext
+from pyJoules.handler import EnergyHandler
+from .test_EnergyMeter import CounterDevice
+
+
+class ThreadRecordingHandler(EnergyHandler):
+    """
+    Handler that record the thread used to process each trace
+    """
+
+    def __init__(self):
+        EnergyHandler.__init__(self)
+        self.threads = []
+
+    def process(self, trace):
+        self.threads.append(threading.current_thread())
+        EnergyHandler.process(self, trace)
+
+
+@pytest.fixture
+def handler():
+    return ThreadRecordingHandler()
+
+
+@pytest.fixture(autouse=True)
+def counter_devices():
+    def create_devices(domains=None):
+        device = CounterDevice()
+        device.configure()
+        return [device]
+    with patch('pyJoules.device.device_registry.DeviceFactory.create_devices', side_effect=create_devices):
+        yield
+
+
+def test_decorated_coroutine_function_is_still_a_coroutine_function(handler):
+    @measure_energy(handler=handler)
+    async def foo():
+        pass
+
+    assert asyncio.iscoroutinefunction(foo)
+
+
+def test_decorated_coroutine_return_coroutine_result_and_process_one_trace(handler):
+    @measure_energy(handler=handler)
+    async def foo(val):
+        await asyncio.sleep(0)
+        return val + 1
+
+    assert asyncio.run(foo(1)) == 2
+    assert len(handler.traces) == 1
+    assert handler.traces[0][0].tag == 'foo'
+
+
+def test_decorated_coroutine_process_trace_outside_of_event_loop_thread(handler):
+    @measure_energy(handler=handler)
+    async def foo():
+        pass
+
+    asyncio.run(foo())
+    assert handler.threads[0] is not threading.current_thread()
+
+
+def test_concurrent_calls_of_decorated_coroutine_produce_one_trace_each(handler):
+    @measure_energy(handler=handler)
+    async def foo():
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(foo(), foo(), foo())
+
+    asyncio.run(main())
+    assert len(handler.traces) == 3
+    for trace in handler.traces:
+        assert len(trace) == 1
+
+
+def test_async_energy_context_measure_contextualized_code(handler):
+    async def main():
+        async with EnergyContext(handler=handler, start_tag='foo') as ctx:
+            await asyncio.sleep(0)
+            ctx.record(tag='bar')
+
+    asyncio.run(main())
+    assert len(handler.traces) == 1
+    assert [sample.tag for sample in handler.traces[0]] == ['foo', 'bar']
+    assert handler.threads[0] is not threading.current_thread()
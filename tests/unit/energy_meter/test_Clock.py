@@ -0,0 +1,83 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import pytest
+
+from mock import patch
+
+from pyJoules.clock import create_clock, WallClock, NanosecondClock, WALL_CLOCK, PERF_COUNTER_CLOCK, MONOTONIC_CLOCK
+from pyJoules.energy_meter import EnergyMeter
+from .test_EnergyMeter import MockedDevice1
+
+WALL_CLOCK_ANCHOR = 1600000000.5
+NS_TIMESTAMP_TRACE = [1000, 1000, 1500001000, 1500001250]
+
+
+@pytest.fixture
+def device():
+    device = MockedDevice1()
+    device.configure()
+    return device
+
+
+def test_create_unknown_clock_raise_ValueError():
+    with pytest.raises(ValueError):
+        create_clock('sundial')
+
+
+def test_create_wall_clock_return_float_clock():
+    clock = create_clock(WALL_CLOCK)
+    assert isinstance(clock, WallClock)
+    assert not clock.integer
+
+
+@pytest.mark.parametrize('clock_name', [PERF_COUNTER_CLOCK, MONOTONIC_CLOCK])
+def test_create_nanosecond_clock_return_integer_clock(clock_name):
+    clock = create_clock(clock_name)
+    assert isinstance(clock, NanosecondClock)
+    assert clock.integer
+    assert isinstance(clock.now(), int)
+
+
+def test_create_energy_meter_with_unknown_clock_raise_ValueError(device):
+    with pytest.raises(ValueError):
+        EnergyMeter([device], clock='sundial')
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_energy_meter_with_nanosecond_clock_return_absolute_timestamps_and_exact_durations(device, columnar):
+    meter = EnergyMeter([device], columnar=columnar, clock=PERF_COUNTER_CLOCK)
+    with patch('time.perf_counter_ns', side_effect=NS_TIMESTAMP_TRACE), \
+         patch('time.time', return_value=WALL_CLOCK_ANCHOR):
+        meter.start()
+        meter.record()
+        meter.stop()
+    trace = meter.get_trace()
+
+    assert trace[0].timestamp == WALL_CLOCK_ANCHOR
+    assert trace[0].duration == 1.5
+    assert trace[1].timestamp == WALL_CLOCK_ANCHOR + 1.5
+    assert trace[1].duration == 250e-9
+
+
+def test_columnar_energy_meter_with_nanosecond_clock_store_integer_timestamps(device):
+    meter = EnergyMeter([device], columnar=True, clock=MONOTONIC_CLOCK)
+    meter.start()
+    meter.stop()
+    assert meter._state_buffer.timestamps.typecode == 'q'
@@ -24,7 +24,7 @@ from mock import patch
 from pyJoules.energy_meter import EnergyMeter, EnergySample
 from pyJoules.energy_meter import EnergyMeterNotStartedError, EnergyMeterNotStoppedError, SampleNotFoundError
 from pyJoules.device import Device, Domain
-from pyJoules.energy_trace import EnergyTrace
+from pyJoules.energy_trace import EnergyTrace, ColumnarEnergyTrace
 from ...utils.sample import assert_sample_are_equals
 
 DEVICE1_ENERGY_TRACE = [[1.0, 1.1],
@@ -357,3 +357,166 @@ def test_measure_trace_with_one_sample_and_gen_idle_from_this_trace_must_generat
 
     trace = energy_meter.get_trace()
     assert len(energy_meter.gen_idle(trace)) == 1
+
+
+####################
+# COLUMNAR STORAGE #
+####################
+@pytest.fixture
+def columnar_energy_meter():
+    device1 = MockedDevice1()
+    device1.configure()
+    device2 = MockedDevice2()
+    device2.configure()
+    return EnergyMeter([device1, device2], columnar=True)
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'without_numpy'])
+def numpy_availability(request):
+    if request.param:
+        yield
+    else:
+        with patch('pyJoules.energy_meter.load_numpy', return_value=None):
+            yield
+
+
+def test_record_on_non_started_columnar_energy_meter_raise_EnergyMeterNotStartedError(columnar_energy_meter):
+    with pytest.raises(EnergyMeterNotStartedError):
+        columnar_energy_meter.record()
+
+
+def test_get_trace_on_a_non_stopped_columnar_energy_meter_raise_EnergyMeterNotStoppedError(columnar_energy_meter):
+    columnar_energy_meter.start()
+    with pytest.raises(EnergyMeterNotStoppedError):
+        columnar_energy_meter.get_trace()
+
+
+def test_get_trace_on_a_non_started_columnar_energy_meter_return_empty_trace(columnar_energy_meter):
+    assert len(columnar_energy_meter.get_trace()) == 0
+
+
+@patch('time.time', side_effect=TIMESTAMP_TRACE)
+def test_start_record_stop_resume_and_stop_columnar_EnergyMeter_should_return_correct_values(_mocked_fun, numpy_availability, columnar_energy_meter, sample1, sample2, sample3):
+    columnar_energy_meter.start()
+    columnar_energy_meter.record()
+    columnar_energy_meter.stop()
+    columnar_energy_meter.resume()
+    columnar_energy_meter.stop()
+
+    trace = columnar_energy_meter.get_trace()
+    assert len(trace) == 3
+    for sample, correct_sample in zip(trace, [sample1, sample2, sample3]):
+        assert_sample_are_equals(sample, correct_sample)
+
+
+@patch('time.time', side_effect=TIMESTAMP_TRACE)
+def test_columnar_EnergyMeter_with_numpy_return_columnar_trace(_mocked_fun, columnar_energy_meter):
+    columnar_energy_meter.start()
+    columnar_energy_meter.record('foo')
+    columnar_energy_meter.stop()
+
+    trace = columnar_energy_meter.get_trace()
+    assert isinstance(trace, ColumnarEnergyTrace)
+    assert trace.to_numpy().energy.shape == (2, 3)
+    assert trace['foo'].timestamp == TIMESTAMP_TRACE[1]
+
+
+@patch('time.time', side_effect=TIMESTAMP_TRACE)
+def test_second_start_on_a_columnar_energy_meter_should_restart_the_trace(_mocked_fun, columnar_energy_meter, sample3):
+    columnar_energy_meter.start()
+    columnar_energy_meter.record()
+    columnar_energy_meter.stop()
+    columnar_energy_meter.start()
+    columnar_energy_meter.stop()
+
+    samples = list(columnar_energy_meter.get_trace())
+    assert len(samples) == 1
+    assert_sample_are_equals(samples[0], sample3)
+
+
+@patch('time.time', side_effect=TIMESTAMP_TRACE)
+def test_columnar_energy_meter_correct_counter_overflow(_mocked_fun, numpy_availability, columnar_energy_meter):
+    with patch.object(MockedDevice1, 'get_max_energy_ranges', return_value=[10.0, None]):
+        columnar_energy_meter.start()
+        columnar_energy_meter.stop()
+        buffer = columnar_energy_meter._state_buffer
+        buffer.energy_columns[0][1] = buffer.energy_columns[0][0] - 1
+        buffer.energy_columns[1][1] = buffer.energy_columns[1][0] - 1
+        sample = columnar_energy_meter.get_trace()[0]
+
+    assert sample.energy['device1_domain1'] == 9.0
+    assert sample.energy['device1_domain2'] == -1.0
+
+
+##############
+# ITER_TRACE #
+##############
+class CounterDevice(Device):
+
+    def __init__(self):
+        Device.__init__(self)
+        self.value = 0.0
+
+    @staticmethod
+    def available_domains():
+        return [DomainDevice1Domain1()]
+
+    def get_energy(self):
+        self.value += 1.0
+        return [self.value]
+
+
+@pytest.fixture
+def counter_device():
+    device = CounterDevice()
+    device.configure()
+    return device
+
+
+def test_iter_trace_on_a_non_stopped_energy_meter_raise_EnergyMeterNotStoppedError(energy_meter):
+    energy_meter.start()
+    with pytest.raises(EnergyMeterNotStoppedError):
+        energy_meter.iter_trace()
+
+
+def test_iter_trace_on_a_non_started_energy_meter_return_empty_iterator(energy_meter):
+    assert list(energy_meter.iter_trace()) == []
+
+
+@patch('time.time', side_effect=TIMESTAMP_TRACE)
+def test_iter_trace_return_same_samples_than_get_trace(_mocked_fun, energy_meter, sample1, sample2, sample3):
+    energy_meter.start()
+    energy_meter.record()
+    energy_meter.stop()
+    energy_meter.resume()
+    energy_meter.stop()
+
+    samples = list(energy_meter.iter_trace())
+    assert len(samples) == 3
+    for sample, correct_sample in zip(samples, [sample1, sample2, sample3]):
+        assert_sample_are_equals(sample, correct_sample)
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_get_trace_with_more_states_than_the_recursion_limit_return_all_samples(counter_device, columnar):
+    meter = EnergyMeter([counter_device], columnar=columnar)
+    meter.start()
+    for _ in range(5000):
+        meter.record()
+    meter.stop()
+
+    trace = meter.get_trace()
+    assert len(trace) == 5001
+    assert trace[5000].energy['device1_domain1'] == 1.0
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_iter_trace_generate_samples_lazily(counter_device, columnar):
+    meter = EnergyMeter([counter_device], columnar=columnar)
+    meter.start()
+    meter.record()
+    meter.stop()
+
+    samples = meter.iter_trace()
+    assert not isinstance(samples, (list, EnergyTrace))
+    assert len(list(samples)) == 2
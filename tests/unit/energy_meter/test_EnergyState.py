@@ -89,3 +89,18 @@ def test_compute_energy_between_two_state_return_correct_values(two_states):
 def test_add_a_state_to_non_final_state_raise_StateIsNotFinalError(two_states):
     with pytest.raises(StateIsNotFinalError):
         two_states.add_next_state(EnergyState(1, 'third', [1, 2]))
+
+
+def test_compute_energy_between_two_state_with_counter_overflow_return_corrected_values():
+    state1 = EnergyState(TS_FIRST, 'first', [[90.0, E_FIRST_DOMAIN1]])
+    state1.add_next_state(EnergyState(TS_SECOND, 'second', [[10.0, E_SECOND_DOMAIN1]]))
+    energy = state1.compute_energy(['domain0', 'domain1'], [100.0, None])
+    assert energy['domain0'] == 20.0
+    assert energy['domain1'] == E_SECOND_DOMAIN1 - E_FIRST_DOMAIN1
+
+
+def test_compute_energy_with_counter_overflow_and_unknown_range_return_negative_value():
+    state1 = EnergyState(TS_FIRST, 'first', [[90.0]])
+    state1.add_next_state(EnergyState(TS_SECOND, 'second', [[10.0]]))
+    energy = state1.compute_energy(['domain0'], [None])
+    assert energy['domain0'] == -80.0
@@ -0,0 +1,130 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+import pytest
+
+from pyJoules.sampling_energy_meter import SamplingEnergyMeter
+from pyJoules.energy_meter import EnergyMeterNotStoppedError
+from .test_EnergyMeter import CounterDevice
+
+# sampling interval long enough to never be reached during a test
+NEVER = 3600
+
+
+@pytest.fixture
+def counter_device():
+    device = CounterDevice()
+    device.configure()
+    return device
+
+
+def test_create_sampling_energy_meter_with_null_interval_raise_ValueError(counter_device):
+    with pytest.raises(ValueError):
+        SamplingEnergyMeter([counter_device], sampling_interval=0)
+
+
+def test_create_sampling_energy_meter_with_too_small_buffer_raise_ValueError(counter_device):
+    with pytest.raises(ValueError):
+        SamplingEnergyMeter([counter_device], sampling_interval=1, buffer_size=1)
+
+
+def test_start_sampling_energy_meter_launch_sampling_thread_and_stop_end_it(counter_device):
+    meter = SamplingEnergyMeter([counter_device], sampling_interval=NEVER)
+    assert not meter.is_sampling()
+    meter.start()
+    assert meter.is_sampling()
+    meter.stop()
+    assert not meter.is_sampling()
+
+
+def test_sampling_energy_meter_measure_periodic_samples(counter_device):
+    meter = SamplingEnergyMeter([counter_device], sampling_interval=0.005)
+    meter.start('foo')
+    time.sleep(0.1)
+    meter.stop()
+
+    sampled_trace = meter.get_sampled_trace()
+    assert len(sampled_trace) >= 3
+    for sample in sampled_trace:
+        assert sample.tag == 'foo'
+        assert sample.energy['device1_domain1'] > 0
+
+
+def test_sampling_energy_meter_still_return_tagged_trace(counter_device):
+    meter = SamplingEnergyMeter([counter_device], sampling_interval=NEVER)
+    meter.start('foo')
+    meter.record('bar')
+    meter.stop()
+
+    assert [sample.tag for sample in meter.get_trace()] == ['foo', 'bar']
+
+
+def test_periodic_samples_are_tagged_with_the_current_region(counter_device):
+    meter = SamplingEnergyMeter([counter_device], sampling_interval=NEVER)
+    meter.start('foo')
+    meter._append_periodic_state(meter._current_tag)
+    meter.record('bar')
+    meter._append_periodic_state(meter._current_tag)
+    meter.stop()
+
+    assert [sample.tag for sample in meter.get_sampled_trace()] == ['foo', 'foo', 'bar']
+
+
+def test_periodic_samples_are_bounded_by_buffer_size(counter_device):
+    meter = SamplingEnergyMeter([counter_device], sampling_interval=NEVER, buffer_size=4)
+    meter.start()
+    for _ in range(10):
+        meter._append_periodic_state('')
+    meter.stop()
+
+    trace = meter.get_sampled_trace()
+    assert len(trace) == 3
+    timestamps = [sample.timestamp for sample in trace]
+    assert timestamps == sorted(timestamps)
+
+
+def test_stop_and_resume_sampling_energy_meter_dont_sample_the_paused_period(counter_device):
+    meter = SamplingEnergyMeter([counter_device], sampling_interval=NEVER)
+    meter.start('foo')
+    meter.stop()
+    meter.resume('bar')
+    meter.stop()
+
+    assert [sample.tag for sample in meter.get_sampled_trace()] == ['foo', 'bar']
+
+
+def test_resume_a_running_sampling_energy_meter_raise_EnergyMeterNotStoppedError(counter_device):
+    meter = SamplingEnergyMeter([counter_device], sampling_interval=NEVER)
+    meter.start()
+    with pytest.raises(EnergyMeterNotStoppedError):
+        meter.resume()
+    meter.stop()
+
+
+def test_get_power_trace_return_energy_divided_by_duration(counter_device):
+    meter = SamplingEnergyMeter([counter_device], sampling_interval=NEVER)
+    meter.start()
+    time.sleep(0.01)
+    meter.stop()
+
+    sample = meter.get_sampled_trace()[0]
+    timestamp, power = meter.get_power_trace()[0]
+    assert timestamp == sample.timestamp
+    assert power['device1_domain1'] == sample.energy['device1_domain1'] / sample.duration
@@ -0,0 +1,322 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import pytest
+import numpy
+
+from pyJoules.energy_trace import EnergyTrace, EnergySample, ColumnarEnergyTrace
+
+SAMPLE_1 = EnergySample(123, 'tag1', 10, {'domain1': 1, 'domain2': 2})
+SAMPLE_2 = EnergySample(456, 'tag2', 20, {'domain1': 2, 'domain2': 3})
+SAMPLE_3 = EnergySample(789, 'tag1', 30, {'domain1': 3, 'domain2': 4})
+
+NEGATIVE_SAMPLE = EnergySample(456, 'tag2', 20, {'domain1': 2, 'domain2': -3})
+OTHER_DOMAIN_SAMPLE = EnergySample(456, 'tag2', 20, {'domain2': 2, 'domain3': 3})
+
+
+def assert_sample_equals(sample, correct_sample):
+    assert sample.timestamp == correct_sample.timestamp
+    assert sample.tag == correct_sample.tag
+    assert sample.duration == correct_sample.duration
+    assert sample.energy == correct_sample.energy
+
+
+def assert_samples_equals(samples, correct_samples):
+    samples = list(samples)
+    assert len(samples) == len(correct_samples)
+    for sample, correct_sample in zip(samples, correct_samples):
+        assert_sample_equals(sample, correct_sample)
+
+
+@pytest.fixture
+def columnar_trace():
+    return ColumnarEnergyTrace([SAMPLE_1, SAMPLE_2, SAMPLE_3])
+
+
+############
+# CREATION #
+############
+def test_create_empty_columnar_trace_have_zero_length():
+    assert len(ColumnarEnergyTrace()) == 0
+
+
+def test_create_columnar_trace_with_three_samples_iter_on_correct_samples(columnar_trace):
+    assert len(columnar_trace) == 3
+    assert_samples_equals(columnar_trace, [SAMPLE_1, SAMPLE_2, SAMPLE_3])
+
+
+def test_columnar_trace_domains_are_first_sample_domains(columnar_trace):
+    assert columnar_trace.domains == ['domain1', 'domain2']
+
+
+def test_create_columnar_trace_with_samples_with_different_domains_raise_ValueError():
+    with pytest.raises(ValueError):
+        ColumnarEnergyTrace([SAMPLE_1, OTHER_DOMAIN_SAMPLE])
+
+
+def test_convert_trace_to_columnar_keep_its_samples():
+    columnar_trace = EnergyTrace([SAMPLE_1, SAMPLE_2]).to_columnar()
+    assert isinstance(columnar_trace, ColumnarEnergyTrace)
+    assert_samples_equals(columnar_trace, [SAMPLE_1, SAMPLE_2])
+
+
+def test_from_columns_use_given_arrays_without_copy():
+    energy = numpy.array([[1.0, 2.0], [2.0, 3.0]])
+    trace = ColumnarEnergyTrace.from_columns(numpy.array([123.0, 456.0]), numpy.array([0, 1], dtype=numpy.intp),
+                                             numpy.array([10.0, 20.0]), energy, ['tag1', 'tag2'],
+                                             ['domain1', 'domain2'])
+    assert numpy.shares_memory(trace.to_numpy().energy, energy)
+    assert_samples_equals(trace, [SAMPLE_1, SAMPLE_2])
+
+
+def test_from_columns_with_columns_of_different_length_raise_ValueError():
+    with pytest.raises(ValueError):
+        ColumnarEnergyTrace.from_columns([123.0, 456.0], [0], [10.0, 20.0], [[1.0], [2.0]], ['tag1'], ['domain1'])
+
+
+############
+# TO NUMPY #
+############
+def test_to_numpy_return_correct_columns(columnar_trace):
+    columns = columnar_trace.to_numpy()
+    assert columns.timestamps.tolist() == [123, 456, 789]
+    assert columns.durations.tolist() == [10, 20, 30]
+    assert [columns.tag_names[code] for code in columns.tags] == ['tag1', 'tag2', 'tag1']
+    assert columns.energy.tolist() == [[1, 2], [2, 3], [3, 4]]
+    assert columns.domains == ['domain1', 'domain2']
+
+
+def test_to_numpy_return_read_only_views_on_trace_storage(columnar_trace):
+    first_columns = columnar_trace.to_numpy()
+    second_columns = columnar_trace.to_numpy()
+    assert numpy.shares_memory(first_columns.energy, second_columns.energy)
+    assert numpy.shares_memory(first_columns.timestamps, second_columns.timestamps)
+    with pytest.raises(ValueError):
+        first_columns.energy[0, 0] = 0
+
+
+##################
+# DICT INTERFACE #
+##################
+def test_get_sample_by_index_and_tag(columnar_trace):
+    assert_sample_equals(columnar_trace[1], SAMPLE_2)
+    assert_sample_equals(columnar_trace[-1], SAMPLE_3)
+    assert_sample_equals(columnar_trace['tag1'], SAMPLE_1)
+
+
+def test_get_bad_index_raise_IndexError(columnar_trace):
+    with pytest.raises(IndexError):
+        columnar_trace[3]
+
+
+def test_get_bad_tag_raise_KeyError(columnar_trace):
+    with pytest.raises(KeyError):
+        columnar_trace['bad_tag']
+
+
+def test_use_in_keyword_on_columnar_trace(columnar_trace):
+    assert 'tag2' in columnar_trace
+    assert 'bad_tag' not in columnar_trace
+
+
+def test_get_all_return_all_samples_with_the_tag(columnar_trace):
+    assert_samples_equals(columnar_trace.get_all('tag1'), [SAMPLE_1, SAMPLE_3])
+    assert columnar_trace.get_all('bad_tag') == []
+
+
+#######
+# ADD #
+#######
+def test_append_many_samples_to_columnar_trace():
+    trace = ColumnarEnergyTrace()
+    for _ in range(100):
+        trace.append(SAMPLE_1)
+    assert len(trace) == 100
+    assert_sample_equals(trace[99], SAMPLE_1)
+
+
+def test_append_sample_with_other_domains_raise_ValueError(columnar_trace):
+    with pytest.raises(ValueError):
+        columnar_trace.append(OTHER_DOMAIN_SAMPLE)
+
+
+def test_iadd_columnar_traces_merge_their_tags():
+    trace = ColumnarEnergyTrace([SAMPLE_2])
+    trace += ColumnarEnergyTrace([SAMPLE_1, SAMPLE_2])
+    assert_samples_equals(trace, [SAMPLE_2, SAMPLE_1, SAMPLE_2])
+    assert_sample_equals(trace['tag1'], SAMPLE_1)
+    assert len(trace.get_all('tag2')) == 2
+
+
+def test_add_columnar_trace_and_trace_produce_new_columnar_trace(columnar_trace):
+    trace = columnar_trace + EnergyTrace([SAMPLE_2])
+    assert isinstance(trace, ColumnarEnergyTrace)
+    assert len(columnar_trace) == 3
+    assert_samples_equals(trace, [SAMPLE_1, SAMPLE_2, SAMPLE_3, SAMPLE_2])
+
+
+def test_iadd_columnar_trace_to_trace(columnar_trace):
+    trace = EnergyTrace([SAMPLE_2])
+    trace += columnar_trace
+    assert_samples_equals(trace, [SAMPLE_2, SAMPLE_1, SAMPLE_2, SAMPLE_3])
+
+
+##############
+# CLEAN DATA #
+##############
+def test_remove_idle_substract_idle_values(columnar_trace):
+    columnar_trace.remove_idle([{'domain1': 1, 'domain2': 1}] * 3)
+    assert columnar_trace.to_numpy().energy.tolist() == [[0, 1], [1, 2], [2, 3]]
+
+
+def test_remove_idle_with_missing_domain_raise_ValueError(columnar_trace):
+    with pytest.raises(ValueError):
+        columnar_trace.remove_idle([{'domain1': 1}] * 3)
+
+
+def test_clean_data_remove_negative_samples_and_update_tags():
+    trace = ColumnarEnergyTrace([SAMPLE_1, NEGATIVE_SAMPLE, SAMPLE_3])
+    trace.clean_data()
+    assert_samples_equals(trace, [SAMPLE_1, SAMPLE_3])
+    assert 'tag2' not in trace
+
+
+def test_clean_data_with_guard_remove_bad_samples(columnar_trace):
+    columnar_trace.clean_data(guards=[lambda sample: sample.duration < 30])
+    assert_samples_equals(columnar_trace, [SAMPLE_1, SAMPLE_2])
+
+
+def test_remove_idle_with_matrix_substract_idle_values(columnar_trace):
+    columnar_trace.remove_idle(numpy.ones((3, 2)))
+    assert columnar_trace.to_numpy().energy.tolist() == [[0, 1], [1, 2], [2, 3]]
+
+
+def test_remove_idle_with_matrix_of_bad_shape_raise_ValueError(columnar_trace):
+    with pytest.raises(ValueError):
+        columnar_trace.remove_idle(numpy.ones((3, 3)))
+
+
+def test_clean_data_with_column_guard_remove_rejected_samples(columnar_trace):
+    columnar_trace.clean_data(column_guards=[lambda columns: columns.energy[:, 0] > 1])
+    assert_samples_equals(columnar_trace, [SAMPLE_2, SAMPLE_3])
+    assert_sample_equals(columnar_trace['tag1'], SAMPLE_3)
+
+
+def test_clean_data_evaluate_guards_only_on_samples_validated_by_column_guards(columnar_trace):
+    evaluated_tags = []
+
+    def recording_guard(sample):
+        evaluated_tags.append(sample.tag)
+        return True
+
+    columnar_trace.clean_data(guards=[recording_guard], column_guards=[lambda columns: columns.durations > 15])
+    assert evaluated_tags == ['tag2', 'tag1']
+
+
+#############
+# AGGREGATE #
+#############
+def test_aggregate_columnar_trace_by_tag_return_same_statistics_than_trace(columnar_trace):
+    trace = EnergyTrace(list(columnar_trace))
+    aggregates = columnar_trace.aggregate(percentiles=[25, 50])
+    correct_aggregates = trace.aggregate(percentiles=[25, 50])
+
+    assert list(aggregates) == list(correct_aggregates) == ['tag1', 'tag2']
+    for tag in aggregates:
+        aggregate, correct_aggregate = aggregates[tag], correct_aggregates[tag]
+        assert aggregate.count == correct_aggregate.count
+        assert aggregate.duration == correct_aggregate.duration
+        assert aggregate.energy_total == correct_aggregate.energy_total
+        assert aggregate.energy_mean == correct_aggregate.energy_mean
+        assert aggregate.energy_min == correct_aggregate.energy_min
+        assert aggregate.energy_max == correct_aggregate.energy_max
+        assert aggregate.mean_power == correct_aggregate.mean_power
+        for domain in aggregate.percentiles:
+            assert aggregate.percentiles[domain] == pytest.approx(correct_aggregate.percentiles[domain])
+
+
+def test_aggregate_empty_columnar_trace_return_empty_dict():
+    assert ColumnarEnergyTrace().aggregate() == {}
+
+
+###############
+# TIME WINDOW #
+###############
+@pytest.fixture
+def contiguous_columnar_trace():
+    return ColumnarEnergyTrace([EnergySample(0, 'tag1', 10, {'domain1': 10}),
+                                EnergySample(10, 'tag2', 10, {'domain1': 20}),
+                                EnergySample(20, 'tag3', 10, {'domain1': 30}),
+                                EnergySample(40, 'tag4', 10, {'domain1': 40})])
+
+
+def test_between_return_view_on_columnar_trace(contiguous_columnar_trace):
+    trace = contiguous_columnar_trace.between(15, 25)
+    assert [sample.tag for sample in trace] == ['tag2', 'tag3']
+    assert numpy.shares_memory(trace.to_numpy().energy, contiguous_columnar_trace.to_numpy().energy)
+    assert 'tag1' not in trace
+
+
+def test_between_with_prorate_on_columnar_trace_dont_modify_the_trace(contiguous_columnar_trace):
+    trace = contiguous_columnar_trace.between(15, 22, prorate=True)
+    assert trace.to_numpy().timestamps.tolist() == [15, 20]
+    assert trace.to_numpy().energy.tolist() == [[10], [6]]
+    assert contiguous_columnar_trace.to_numpy().energy.tolist() == [[10], [20], [30], [40]]
+
+
+def test_remove_idle_on_between_result_dont_modify_the_trace(contiguous_columnar_trace):
+    trace = contiguous_columnar_trace.between(15, 25)
+    trace.remove_idle([{'domain1': 1}, {'domain1': 1}])
+    assert trace.to_numpy().energy.tolist() == [[19], [29]]
+    assert contiguous_columnar_trace.to_numpy().energy.tolist() == [[10], [20], [30], [40]]
+
+
+def test_remove_idle_dont_modify_between_result(contiguous_columnar_trace):
+    trace = contiguous_columnar_trace.between(15, 25)
+    contiguous_columnar_trace.remove_idle([{'domain1': 1}] * 4)
+    assert trace.to_numpy().energy.tolist() == [[20], [30]]
+
+
+def test_append_to_between_result_dont_modify_the_trace(contiguous_columnar_trace):
+    trace = contiguous_columnar_trace.between(15, 25)
+    trace.append(EnergySample(30, 'foo', 10, {'domain1': 1}))
+    assert contiguous_columnar_trace.to_numpy().energy.tolist() == [[10], [20], [30], [40]]
+    assert [sample.tag for sample in contiguous_columnar_trace] == ['tag1', 'tag2', 'tag3', 'tag4']
+
+
+def test_at_on_columnar_trace(contiguous_columnar_trace):
+    assert contiguous_columnar_trace.at(45).tag == 'tag4'
+    with pytest.raises(KeyError):
+        contiguous_columnar_trace.at(35)
+
+
+#########
+# POWER #
+#########
+def test_to_power_on_columnar_trace_return_same_values_than_trace(contiguous_columnar_trace):
+    assert contiguous_columnar_trace.to_power() == EnergyTrace(list(contiguous_columnar_trace)).to_power()
+
+
+@pytest.mark.parametrize('period, begin, end', [(4, None, None), (3, 5, 27), (7, -10, 60), (4, 1, 22)])
+def test_resample_columnar_trace_return_same_values_than_trace(contiguous_columnar_trace, period, begin, end):
+    power = contiguous_columnar_trace.resample(period, begin, end)
+    correct_power = EnergyTrace(list(contiguous_columnar_trace)).resample(period, begin, end)
+    assert [timestamp for timestamp, _ in power] == pytest.approx([timestamp for timestamp, _ in correct_power])
+    assert [values['domain1'] for _, values in power] == \
+        pytest.approx([values['domain1'] for _, values in correct_power])
@@ -0,0 +1,75 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import pytest
+
+from pyJoules.energy_trace import EnergySample, EnergyTrace, DomainSchema
+
+
+@pytest.fixture
+def sample():
+    return EnergySample(123, 'tag1', 10, {'domain1': 1, 'domain2': 2})
+
+
+def test_sample_have_no_instance_dictionary(sample):
+    assert not hasattr(sample, '__dict__')
+
+
+def test_samples_with_same_domains_share_their_schema(sample):
+    other_sample = EnergySample(456, 'tag2', 20, {'domain1': 3, 'domain2': 4})
+    assert sample.schema is other_sample.schema
+    assert sample.schema is DomainSchema.get(['domain1', 'domain2'])
+
+
+def test_samples_with_domains_in_different_order_dont_share_their_schema(sample):
+    other_sample = EnergySample(456, 'tag2', 20, {'domain2': 4, 'domain1': 3})
+    assert sample.schema is not other_sample.schema
+
+
+def test_sample_energy_is_a_read_only_view_equal_to_its_dictionary(sample):
+    assert sample.energy == {'domain1': 1, 'domain2': 2}
+    assert {'domain1': 1, 'domain2': 2} == sample.energy
+    assert list(sample.energy.items()) == [('domain1', 1), ('domain2', 2)]
+    assert 'domain1' in sample.energy
+    with pytest.raises(TypeError):
+        sample.energy['domain1'] = 0
+
+
+def test_sample_energy_view_raise_KeyError_on_bad_domain(sample):
+    with pytest.raises(KeyError):
+        sample.energy['bad_domain']
+
+
+def test_set_sample_energy_replace_its_values(sample):
+    sample.energy = {'domain3': 3}
+    assert sample.energy == {'domain3': 3}
+    assert sample.values == (3,)
+
+
+def test_create_sample_from_values(sample):
+    other_sample = EnergySample.from_values(123, 'tag1', 10, sample.schema, (1, 2))
+    assert other_sample.energy == sample.energy
+    assert other_sample.schema is sample.schema
+
+
+def test_remove_idle_create_new_samples_and_dont_modify_the_previous_ones(sample):
+    trace = EnergyTrace([sample])
+    trace.remove_idle([{'domain1': 1, 'domain2': 1}])
+    assert trace[0].energy == {'domain1': 0, 'domain2': 1}
+    assert sample.energy == {'domain1': 1, 'domain2': 2}
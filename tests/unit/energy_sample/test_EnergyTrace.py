@@ -183,6 +183,37 @@ def test_get_sample_on_a_two_sample_trace_with_same_names_return_first_sample():
     assert trace['tag1'] == s1
 
 
+
+def test_get_all_on_a_two_sample_trace_with_same_names_return_both_samples():
+    s1 = EnergySample('123', 'tag1', 10, {'domain1': 1, 'domain2': 2})
+    s2 = EnergySample('456', 'tag1', 20, {'domain2': 2, 'domain3': 3})
+
+    trace = EnergyTrace([s1, SAMPLE_2, s2])
+
+    assert trace.get_all('tag1') == [s1, s2]
+
+
+def test_get_all_with_bad_tag_return_empty_list(trace_with_two_sample):
+    assert trace_with_two_sample.get_all('bad_tag') == []
+
+
+def test_append_sample_to_a_trace_make_its_tag_available(trace_with_one_sample):
+    trace_with_one_sample.append(SAMPLE_2)
+    assert 'tag2' in trace_with_one_sample
+    assert trace_with_one_sample['tag2'] == SAMPLE_2
+
+
+def test_iadd_a_trace_make_its_tags_available(trace_with_one_sample):
+    trace_with_one_sample += EnergyTrace([SAMPLE_2, SAMPLE_1])
+    assert trace_with_one_sample['tag2'] == SAMPLE_2
+    assert trace_with_one_sample.get_all('tag1') == [SAMPLE_1, SAMPLE_1]
+
+
+def test_clean_data_remove_tags_of_removed_samples(semi_negative_trace):
+    semi_negative_trace.clean_data()
+    assert 'tag2' not in semi_negative_trace
+    assert semi_negative_trace.get_all('tag1') == [SAMPLE_1]
+
 ###########
 # ITERATE #
 ###########
@@ -266,3 +297,238 @@ def test_clean_with_guard_a_trace_with_a_negative_sample_and_a_bad_sample_must_r
     trace = EnergyTrace([SAMPLE_1, NEGATIVE_SAMPLE_2])
     trace.clean_data(guards=[lambda sample: False if 'domain1' in sample.energy else True])
     assert len(trace) == 0
+
+
+def test_remove_idle_with_value_with_bad_tag_must_not_modify_the_trace():
+    trace = EnergyTrace([EnergySample('123', 'tag1', 10, {'domain1': 1, 'domain2': 2}),
+                         EnergySample('456', 'tag2', 20, {'domain2': 2, 'domain3': 3})])
+    with pytest.raises(ValueError):
+        trace.remove_idle([IDLE_1, IDLE_1])
+    assert trace[0].energy == {'domain1': 1, 'domain2': 2}
+
+
+def test_clean_data_stop_guard_evaluation_at_first_rejecting_guard(trace_with_two_sample):
+    evaluated_samples = []
+
+    def recording_guard(sample):
+        evaluated_samples.append(sample)
+        return True
+
+    trace_with_two_sample.clean_data(guards=[lambda sample: sample.tag == 'tag1', recording_guard])
+    assert evaluated_samples == [SAMPLE_1]
+
+
+def test_clean_data_with_column_guard_remove_rejected_samples():
+    trace = EnergyTrace([SAMPLE_1, EnergySample('456', 'tag2', 20, {'domain1': 2, 'domain2': 3})])
+    trace.clean_data(column_guards=[lambda columns: columns.durations < 15])
+    assert len(trace) == 1
+    assert trace[0] == SAMPLE_1
+    assert 'tag2' not in trace
+
+
+@pytest.fixture
+def same_domains_trace():
+    return EnergyTrace([EnergySample('123', 'tag1', 10, {'domain1': 1, 'domain2': 2}),
+                        EnergySample('456', 'tag2', 20, {'domain1': 3, 'domain2': -1}),
+                        EnergySample('789', 'tag3', 30, {'domain1': 5, 'domain2': 6})])
+
+
+@pytest.fixture
+def trace_without_numpy(monkeypatch):
+    monkeypatch.setattr('pyJoules.energy_trace.load_numpy', lambda: None)
+
+
+def test_remove_idle_on_a_trace_with_same_domains_substract_idle_values(same_domains_trace):
+    same_domains_trace.remove_idle([IDLE_1, IDLE_1, {'domain1': 2, 'domain2': 3}])
+    assert [sample.energy for sample in same_domains_trace] == [{'domain1': 0, 'domain2': 1},
+                                                                {'domain1': 2, 'domain2': -2},
+                                                                {'domain1': 3, 'domain2': 3}]
+
+
+def test_remove_idle_on_a_trace_with_same_domains_with_missing_domain_must_not_modify_the_trace(same_domains_trace):
+    with pytest.raises(ValueError):
+        same_domains_trace.remove_idle([IDLE_1, IDLE_1, {'domain1': 2}])
+    assert same_domains_trace[0].energy == {'domain1': 1, 'domain2': 2}
+
+
+def test_remove_idle_without_numpy_give_the_same_result(same_domains_trace, trace_without_numpy):
+    same_domains_trace.remove_idle([IDLE_1, IDLE_1, {'domain1': 2, 'domain2': 3}])
+    assert [sample.energy for sample in same_domains_trace] == [{'domain1': 0, 'domain2': 1},
+                                                                {'domain1': 2, 'domain2': -2},
+                                                                {'domain1': 3, 'domain2': 3}]
+
+
+def test_clean_data_on_a_trace_with_same_domains_dont_convert_it_to_a_columnar_trace(same_domains_trace, monkeypatch):
+    def fail_conversion(*args):
+        raise AssertionError('trace converted to a columnar trace')
+
+    monkeypatch.setattr('pyJoules.energy_trace.ColumnarEnergyTrace', fail_conversion)
+    same_domains_trace.clean_data(column_guards=[lambda columns: columns.durations < 25])
+    assert [sample.tag for sample in same_domains_trace] == ['tag1']
+
+
+def test_clean_data_on_a_trace_with_same_domains_evaluate_guards_only_on_valid_samples(same_domains_trace):
+    evaluated_tags = []
+
+    def recording_guard(sample):
+        evaluated_tags.append(sample.tag)
+        return True
+
+    same_domains_trace.clean_data(guards=[recording_guard], column_guards=[lambda columns: columns.timestamps < 500])
+    assert evaluated_tags == ['tag1']
+    assert [sample.tag for sample in same_domains_trace] == ['tag1']
+
+
+def test_clean_data_without_numpy_remove_negative_samples(same_domains_trace, trace_without_numpy):
+    same_domains_trace.clean_data()
+    assert [sample.tag for sample in same_domains_trace] == ['tag1', 'tag3']
+
+
+#############
+# AGGREGATE #
+#############
+@pytest.fixture
+def trace_with_repeated_tags():
+    return EnergyTrace([EnergySample(1, 'tag1', 1, {'domain1': 1, 'domain2': 10}),
+                        EnergySample(2, 'tag2', 2, {'domain1': 4, 'domain2': 40}),
+                        EnergySample(4, 'tag1', 3, {'domain1': 3, 'domain2': 30})])
+
+
+def test_aggregate_empty_trace_return_empty_dict():
+    assert EnergyTrace([]).aggregate() == {}
+
+
+def test_aggregate_by_tag_return_one_aggregate_per_tag_in_trace_order(trace_with_repeated_tags):
+    aggregates = trace_with_repeated_tags.aggregate()
+    assert list(aggregates) == ['tag1', 'tag2']
+    assert aggregates['tag1'].key == 'tag1'
+    assert aggregates['tag1'].count == 2
+    assert aggregates['tag2'].count == 1
+
+
+def test_aggregate_by_tag_compute_correct_statistics(trace_with_repeated_tags):
+    aggregate = trace_with_repeated_tags.aggregate(percentiles=[0, 50, 90])['tag1']
+    assert aggregate.duration == 4
+    assert aggregate.energy_total == {'domain1': 4, 'domain2': 40}
+    assert aggregate.energy_mean == {'domain1': 2, 'domain2': 20}
+    assert aggregate.energy_min == {'domain1': 1, 'domain2': 10}
+    assert aggregate.energy_max == {'domain1': 3, 'domain2': 30}
+    assert aggregate.mean_power == {'domain1': 1, 'domain2': 10}
+    assert aggregate.percentiles['domain1'] == pytest.approx({0: 1, 50: 2, 90: 2.8})
+
+
+def test_aggregate_with_null_duration_return_None_mean_power():
+    aggregate = EnergyTrace([EnergySample(1, 'tag1', 0, {'domain1': 1})]).aggregate()['tag1']
+    assert aggregate.mean_power == {'domain1': None}
+
+
+def test_aggregate_with_grouping_function(trace_with_repeated_tags):
+    aggregates = trace_with_repeated_tags.aggregate(by=lambda sample: sample.duration > 1)
+    assert aggregates[False].count == 1
+    assert aggregates[True].count == 2
+    assert aggregates[True].energy_total == {'domain1': 7, 'domain2': 70}
+
+
+def test_aggregate_with_unknown_criterion_raise_ValueError(trace_with_repeated_tags):
+    with pytest.raises(ValueError):
+        trace_with_repeated_tags.aggregate(by='domain')
+
+
+###############
+# TIME WINDOW #
+###############
+@pytest.fixture
+def contiguous_trace():
+    return EnergyTrace([EnergySample(0, 'tag1', 10, {'domain1': 10}),
+                        EnergySample(10, 'tag2', 10, {'domain1': 20}),
+                        EnergySample(20, 'tag3', 10, {'domain1': 30}),
+                        EnergySample(40, 'tag4', 10, {'domain1': 40})])
+
+
+def test_between_return_samples_overlapping_the_window(contiguous_trace):
+    trace = contiguous_trace.between(15, 25)
+    assert [sample.tag for sample in trace] == ['tag2', 'tag3']
+
+
+def test_between_share_samples_with_the_trace(contiguous_trace):
+    assert contiguous_trace.between(10, 20)[0] is contiguous_trace[1]
+
+
+def test_between_exclude_samples_ending_at_window_begining_and_starting_at_window_end(contiguous_trace):
+    trace = contiguous_trace.between(10, 20)
+    assert [sample.tag for sample in trace] == ['tag2']
+
+
+def test_between_in_a_gap_return_empty_trace(contiguous_trace):
+    assert len(contiguous_trace.between(32, 38)) == 0
+
+
+def test_between_with_prorate_scale_boundary_samples(contiguous_trace):
+    trace = contiguous_trace.between(15, 22, prorate=True)
+    assert trace[0].timestamp == 15
+    assert trace[0].duration == 5
+    assert trace[0].energy == {'domain1': 10}
+    assert trace[1].timestamp == 20
+    assert trace[1].duration == 2
+    assert trace[1].energy == {'domain1': 6}
+    assert contiguous_trace[1].energy == {'domain1': 20}
+
+
+def test_between_with_end_before_begin_raise_ValueError(contiguous_trace):
+    with pytest.raises(ValueError):
+        contiguous_trace.between(20, 10)
+
+
+def test_at_return_sample_covering_the_timestamp(contiguous_trace):
+    assert contiguous_trace.at(10).tag == 'tag2'
+    assert contiguous_trace.at(29.5).tag == 'tag3'
+
+
+def test_at_timestamp_in_a_gap_raise_KeyError(contiguous_trace):
+    with pytest.raises(KeyError):
+        contiguous_trace.at(35)
+    with pytest.raises(KeyError):
+        contiguous_trace.at(-1)
+
+
+#########
+# POWER #
+#########
+def test_to_power_return_mean_power_of_each_sample(contiguous_trace):
+    assert contiguous_trace.to_power() == [(0, {'domain1': 1}), (10, {'domain1': 2}), (20, {'domain1': 3}),
+                                           (40, {'domain1': 4})]
+
+
+def test_to_power_ignore_samples_with_null_duration():
+    trace = EnergyTrace([EnergySample(0, 'tag1', 0, {'domain1': 10}), EnergySample(0, 'tag2', 2, {'domain1': 10})])
+    assert trace.to_power() == [(0, {'domain1': 5})]
+
+
+def test_resample_empty_trace_return_empty_list():
+    assert EnergyTrace([]).resample(1) == []
+
+
+def test_resample_redistribute_energy_on_periods(contiguous_trace):
+    power = contiguous_trace.resample(4)
+    assert [timestamp for timestamp, _ in power] == [0, 4, 8, 12, 16, 20, 24, 28, 32, 36, 40, 44, 48]
+    assert [values['domain1'] for _, values in power] == pytest.approx([1, 1, 1.5, 2, 2, 3, 3, 1.5, 0, 0, 4, 4, 4])
+
+
+def test_resample_compute_last_period_power_on_its_truncated_length():
+    power = EnergyTrace([EnergySample(0, 'tag1', 10, {'domain1': 10})]).resample(3)
+    assert [values['domain1'] for _, values in power] == pytest.approx([1, 1, 1, 1])
+
+
+def test_resample_on_a_window_ending_inside_a_sample():
+    power = EnergyTrace([EnergySample(0, 'tag1', 10, {'domain1': 10})]).resample(3, end=5)
+    assert [values['domain1'] for _, values in power] == pytest.approx([1, 1])
+
+
+def test_resample_on_a_window(contiguous_trace):
+    power = contiguous_trace.resample(5, begin=5, end=15)
+    assert power == [(5, {'domain1': 1}), (10, {'domain1': 2})]
+
+
+def test_resample_with_non_positive_period_raise_ValueError(contiguous_trace):
+    with pytest.raises(ValueError):
+        contiguous_trace.resample(0)
@@ -0,0 +1,205 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+
+import pytest
+
+from pyJoules.handler import EnergyHandler
+from pyJoules.handler.csv_handler import CSVHandler, load_trace
+from pyJoules.handler.async_dispatch_handler import AsyncDispatchHandler, BLOCK_POLICY, DROP_POLICY
+from pyJoules.energy_trace import EnergySample, EnergyTrace
+
+
+class RecordingHandler(EnergyHandler):
+    """
+    Handler that record the processed traces and the thread that processed them
+    """
+    def __init__(self):
+        EnergyHandler.__init__(self)
+        self.threads = []
+        self.save_threads = []
+        self.saved = 0
+
+    def process(self, trace):
+        self.threads.append(threading.current_thread())
+        EnergyHandler.process(self, trace)
+
+    def save_data(self):
+        self.save_threads.append(threading.current_thread())
+        self.saved += 1
+
+
+class BlockingHandler(RecordingHandler):
+    """
+    Handler that wait for its event to be set before processing a trace
+    """
+    def __init__(self):
+        RecordingHandler.__init__(self)
+        self.started = threading.Event()
+        self.event = threading.Event()
+
+    def process(self, trace):
+        self.started.set()
+        self.event.wait(5)
+        RecordingHandler.process(self, trace)
+
+
+class FailingHandler(EnergyHandler):
+
+    def process(self, trace):
+        raise RuntimeError('failure')
+
+    def save_data(self):
+        raise RuntimeError('failure')
+
+
+def make_trace(tag):
+    return EnergyTrace([EnergySample(1, tag, 2, {'d1': 1})])
+
+
+@pytest.fixture
+def recording_handler():
+    return RecordingHandler()
+
+
+def test_flush_dispatch_processed_traces_to_wrapped_handler(recording_handler):
+    with AsyncDispatchHandler(recording_handler) as handler:
+        handler.process(make_trace('foo'))
+        handler.process(make_trace('bar'))
+        handler.flush()
+        assert [trace[0].tag for trace in recording_handler.traces] == ['foo', 'bar']
+        assert handler.metrics.dispatched_count == 2
+        assert handler.queue_depth == 0
+
+
+def test_traces_are_dispatched_from_another_thread(recording_handler):
+    with AsyncDispatchHandler(recording_handler) as handler:
+        handler.process(make_trace('foo'))
+        handler.flush()
+    assert recording_handler.threads[0] is not threading.current_thread()
+
+
+def test_close_dispatch_queued_traces(recording_handler):
+    handler = AsyncDispatchHandler(recording_handler)
+    for i in range(10):
+        handler.process(make_trace(str(i)))
+    handler.close()
+    assert [trace[0].tag for trace in recording_handler.traces] == [str(i) for i in range(10)]
+
+
+def test_process_trace_on_closed_handler_raise_ValueError(recording_handler):
+    handler = AsyncDispatchHandler(recording_handler)
+    handler.close()
+    with pytest.raises(ValueError):
+        handler.process(make_trace('foo'))
+
+
+def test_drop_policy_drop_traces_when_queue_is_full():
+    wrapped = BlockingHandler()
+    handler = AsyncDispatchHandler(wrapped, max_queue_size=1, policy=DROP_POLICY)
+    handler.process(make_trace('foo'))
+    assert wrapped.started.wait(5)
+    handler.process(make_trace('bar'))
+    handler.process(make_trace('baz'))
+    assert handler.metrics.dropped_count == 1
+    assert handler.metrics.max_queue_depth == 1
+
+    wrapped.event.set()
+    handler.close()
+    assert [trace[0].tag for trace in wrapped.traces] == ['foo', 'bar']
+
+
+def test_block_policy_does_not_drop_traces():
+    wrapped = BlockingHandler()
+    handler = AsyncDispatchHandler(wrapped, max_queue_size=1, policy=BLOCK_POLICY)
+    handler.process(make_trace('foo'))
+    assert wrapped.started.wait(5)
+    handler.process(make_trace('bar'))
+
+    producer = threading.Thread(target=handler.process, args=(make_trace('baz'),))
+    producer.start()
+    producer.join(0.05)
+    assert producer.is_alive()
+
+    wrapped.event.set()
+    producer.join(5)
+    handler.close()
+    assert handler.metrics.dropped_count == 0
+    assert [trace[0].tag for trace in wrapped.traces] == ['foo', 'bar', 'baz']
+
+
+def test_save_data_call_wrapped_handler_save_data_after_dispatch(recording_handler):
+    with AsyncDispatchHandler(recording_handler) as handler:
+        handler.process(make_trace('foo'))
+        handler.save_data()
+        assert len(recording_handler.traces) == 1
+        assert recording_handler.saved == 1
+        assert recording_handler.save_threads == recording_handler.threads
+
+
+def test_save_after_dispatch_save_wrapped_handler_data_when_queue_is_empty(recording_handler):
+    with AsyncDispatchHandler(recording_handler, save_after_dispatch=True) as handler:
+        handler.process(make_trace('foo'))
+        handler.flush()
+        assert recording_handler.saved == 1
+
+
+def test_dispatch_errors_are_counted():
+    with AsyncDispatchHandler(FailingHandler()) as handler:
+        handler.process(make_trace('foo'))
+        handler.flush()
+        assert handler.metrics.error_count == 1
+        assert handler.metrics.dispatched_count == 0
+
+
+def test_create_handler_with_unknown_policy_raise_ValueError(recording_handler):
+    with pytest.raises(ValueError):
+        AsyncDispatchHandler(recording_handler, policy='foo')
+
+
+def test_create_handler_with_non_positive_queue_size_raise_ValueError(recording_handler):
+    with pytest.raises(ValueError):
+        AsyncDispatchHandler(recording_handler, max_queue_size=0)
+
+
+def test_save_data_raise_wrapped_handler_save_data_exception():
+    with AsyncDispatchHandler(FailingHandler()) as handler:
+        with pytest.raises(RuntimeError):
+            handler.save_data()
+
+
+def test_save_data_on_closed_handler_call_wrapped_handler_save_data(recording_handler):
+    handler = AsyncDispatchHandler(recording_handler)
+    handler.close()
+    handler.save_data()
+    assert recording_handler.saved == 1
+
+
+def test_traces_processed_while_saving_are_not_lost(tmp_path):
+    filename = str(tmp_path / 'file.csv')
+    with AsyncDispatchHandler(CSVHandler(filename)) as handler:
+        producer = threading.Thread(target=lambda: [handler.process(make_trace(str(i))) for i in range(200)])
+        producer.start()
+        while producer.is_alive():
+            handler.save_data()
+        producer.join()
+        handler.save_data()
+    assert [sample.tag for sample in load_trace(filename)] == [str(i) for i in range(200)]
@@ -22,9 +22,11 @@ import pytest
 import pyfakefs
 import os.path
 
-from pyJoules.handler.csv_handler import CSVHandler
+from mock import patch
+
+from pyJoules.handler.csv_handler import CSVHandler, load_trace, iter_samples, iter_trace_chunks
 from pyJoules.handler import UnconsistantSamplesError
-from pyJoules.energy_trace import EnergySample, EnergyTrace
+from pyJoules.energy_trace import EnergySample, EnergyTrace, ColumnarEnergyTrace
 
 
 @pytest.fixture
@@ -161,3 +163,188 @@ def test_process_one_trace_and_record_in_existing_file_only_append_one_correct_l
         assert lines[0] == 'timestamp;tag;duration;d1;d2\n'
         assert lines[1] == '1;sample1;2;1;2\n'
         assert lines[1] == '1;sample1;2;1;2\n'
+
+
+###################
+# PERSISTENT MODE #
+###################
+def read_lines(filename):
+    with open(filename, 'r') as csv:
+        return csv.readlines()
+
+
+def test_persistent_handler_save_two_times_produce_a_file_with_header_and_two_lines(fs, trace1, trace2):
+    with CSVHandler('/file.csv', persistent=True) as handler:
+        handler.process(trace1)
+        handler.save_data()
+        handler.process(trace2)
+        handler.save_data()
+
+    assert read_lines('/file.csv') == ['timestamp;tag;duration;d1;d2\n', '1;sample1;2;1;2\n', '1;sample1;2;1;2\n',
+                                       '2;sample2;3;3;4\n']
+
+
+def test_persistent_handler_open_the_file_only_once(fs, trace1):
+    handler = CSVHandler('/file.csv', persistent=True)
+    with patch('builtins.open', side_effect=open) as mocked_open:
+        for _ in range(3):
+            handler.process(trace1)
+            handler.save_data()
+    handler.close()
+    assert mocked_open.call_count == 1
+
+
+def test_persistent_handler_buffer_lines_until_close(fs, trace1):
+    handler = CSVHandler('/file.csv', persistent=True)
+    handler.process(trace1)
+    handler.save_data()
+    assert read_lines('/file.csv') == []
+    handler.close()
+    assert len(read_lines('/file.csv')) == 2
+
+
+def test_persistent_handler_flush_when_flush_interval_is_elapsed(fs, trace1):
+    handler = CSVHandler('/file.csv', persistent=True, flush_interval=0)
+    handler.process(trace1)
+    handler.save_data()
+    assert len(read_lines('/file.csv')) == 2
+    handler.close()
+
+
+def test_persistent_handler_append_to_existing_file_with_same_header(fs, trace1):
+    fs.create_file('/file.csv', contents='timestamp;tag;duration;d1;d2\n1;sample1;2;1;2\n')
+    with CSVHandler('/file.csv', persistent=True) as handler:
+        handler.process(trace1)
+        handler.save_data()
+    assert len(read_lines('/file.csv')) == 3
+
+
+def test_persistent_handler_on_existing_file_with_other_header_raise_UnconsistantSamplesError(fs, trace1):
+    fs.create_file('/file.csv', contents='timestamp;tag;duration;d3\n1;sample1;2;1\n')
+    handler = CSVHandler('/file.csv', persistent=True)
+    handler.process(trace1)
+    with pytest.raises(UnconsistantSamplesError):
+        handler.save_data()
+
+
+def test_persistent_handler_save_trace_with_other_domains_raise_UnconsistantSamplesError(fs, trace1, bad_trace):
+    with CSVHandler('/file.csv', persistent=True) as handler:
+        handler.process(trace1)
+        handler.save_data()
+        handler.process(bad_trace)
+        with pytest.raises(UnconsistantSamplesError):
+            handler.save_data()
+
+
+###########
+# LOADING #
+###########
+def assert_traces_are_equals(trace, correct_trace):
+    assert len(trace) == len(correct_trace)
+    for sample, correct_sample in zip(trace, correct_trace):
+        assert sample.timestamp == correct_sample.timestamp
+        assert sample.tag == correct_sample.tag
+        assert sample.duration == correct_sample.duration
+        assert sample.energy == correct_sample.energy
+
+
+def test_load_trace_saved_by_handler_return_the_saved_trace(fs, trace1, trace2):
+    handler = CSVHandler('/file.csv')
+    handler.process(trace1)
+    handler.process(trace2)
+    handler.save_data()
+
+    assert_traces_are_equals(load_trace('/file.csv'), trace1 + trace2)
+
+
+def test_load_trace_in_columnar_form(fs, trace2):
+    handler = CSVHandler('/file.csv')
+    handler.process(trace2)
+    handler.save_data()
+
+    trace = load_trace('/file.csv', columnar=True)
+    assert isinstance(trace, ColumnarEnergyTrace)
+    assert_traces_are_equals(trace, trace2)
+
+
+def test_load_trace_keep_tags_containing_the_separator(fs):
+    fs.create_file('/file.csv', contents='timestamp;tag;duration;d1\n1.5;foo;bar;2.5;3\n')
+    sample = load_trace('/file.csv')[0]
+    assert sample.tag == 'foo;bar'
+    assert sample.duration == 2.5
+    assert sample.energy == {'d1': 3}
+
+
+def test_load_empty_file_return_empty_trace(fs):
+    fs.create_file('/file.csv', contents='')
+    assert len(load_trace('/file.csv')) == 0
+
+
+def test_load_file_with_bad_header_raise_ValueError(fs):
+    fs.create_file('/file.csv', contents='a;b;c\n1;2;3\n')
+    with pytest.raises(ValueError):
+        load_trace('/file.csv')
+
+
+def test_iter_samples_read_the_file_lazily(fs, trace2):
+    handler = CSVHandler('/file.csv')
+    handler.process(trace2)
+    handler.save_data()
+
+    samples = iter_samples('/file.csv')
+    assert next(samples).tag == 'sample1'
+    assert next(samples).tag == 'sample2'
+    with pytest.raises(StopIteration):
+        next(samples)
+
+
+def test_iter_trace_chunks_return_traces_of_chunk_size_samples(fs, trace1, trace2):
+    handler = CSVHandler('/file.csv')
+    handler.process(trace2)
+    handler.process(trace1)
+    handler.save_data()
+
+    chunks = list(iter_trace_chunks('/file.csv', chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert_traces_are_equals(chunks[0], trace2)
+
+
+def test_save_data_write_traces_spilled_to_disk(fs, trace1, trace2):
+    handler = CSVHandler('/file.csv', max_memory_samples=1)
+    handler.process(trace1)
+    handler.process(trace2)
+    handler.process(trace1)
+    assert handler.spilled_trace_count == 2
+    handler.save_data()
+
+    assert_traces_are_equals(load_trace('/file.csv'), trace1 + trace2 + trace1)
+    assert handler.spilled_trace_count == 0
+
+
+def test_trace_processed_while_saving_is_kept_for_next_save(fs, trace1, trace2):
+    handler = CSVHandler('/file.csv', max_memory_samples=1)
+    handler.process(trace1)
+    handler.process(trace1)
+    gen_lines = handler._gen_lines
+    processed = []
+
+    def process_while_saving(trace, domain_names):
+        if not processed:
+            handler.process(trace2)
+            processed.append(trace2)
+        return gen_lines(trace, domain_names)
+
+    with patch.object(handler, '_gen_lines', side_effect=process_while_saving):
+        handler.save_data()
+    assert len(load_trace('/file.csv')) == 2
+    handler.save_data()
+    assert_traces_are_equals(load_trace('/file.csv'), trace1 + trace1 + trace2)
+
+
+def test_traces_are_kept_when_save_data_fail(fs, trace1, bad_trace):
+    handler = CSVHandler('/file.csv', max_memory_samples=1)
+    handler.process(trace1)
+    handler.process(bad_trace)
+    with pytest.raises(UnconsistantSamplesError):
+        handler.save_data()
+    assert [trace[0].tag for trace in handler._iter_traces()] == [trace1[0].tag, bad_trace[0].tag]
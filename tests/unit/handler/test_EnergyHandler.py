@@ -0,0 +1,173 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import pickle
+import tempfile
+
+import pytest
+
+from mock import patch
+
+from pyJoules.handler import EnergyHandler, UnconsistantSamplesError
+from pyJoules.energy_trace import EnergySample, EnergyTrace, ColumnarEnergyTrace
+
+
+def make_trace(tag, sample_number=1):
+    return EnergyTrace([EnergySample(i, tag, 1, {'d1': i}) for i in range(sample_number)])
+
+
+def stored_tags(handler):
+    return [trace[0].tag for trace in handler._iter_traces()]
+
+
+def test_handler_without_memory_cap_never_spill_traces():
+    handler = EnergyHandler()
+    for i in range(10):
+        handler.process(make_trace(str(i), 10))
+    assert len(handler.traces) == 10
+    assert handler.spilled_trace_count == 0
+
+
+def test_oldest_traces_are_spilled_when_memory_cap_is_exceeded():
+    handler = EnergyHandler(max_memory_samples=5)
+    for i in range(4):
+        handler.process(make_trace(str(i), 2))
+    assert [trace[0].tag for trace in handler.traces] == ['2', '3']
+    assert handler.spilled_trace_count == 2
+
+
+def test_stored_traces_are_replayed_in_processing_order():
+    handler = EnergyHandler(max_memory_samples=3)
+    for i in range(10):
+        handler.process(make_trace(str(i), 2))
+    assert stored_tags(handler) == [str(i) for i in range(10)]
+    assert stored_tags(handler) == [str(i) for i in range(10)]
+
+
+def test_replayed_traces_keep_their_samples():
+    handler = EnergyHandler(max_memory_samples=0)
+    trace = ColumnarEnergyTrace(make_trace('foo', 3))
+    handler.process(trace)
+    replayed_trace, = handler._iter_traces()
+    assert isinstance(replayed_trace, ColumnarEnergyTrace)
+    assert [(sample.timestamp, sample.tag, dict(sample.energy)) for sample in replayed_trace] == \
+        [(sample.timestamp, sample.tag, dict(sample.energy)) for sample in trace]
+    assert replayed_trace[0].schema is trace[0].schema
+
+
+def test_traces_processed_while_replaying_are_spilled_after_the_replayed_traces():
+    handler = EnergyHandler(max_memory_samples=1)
+    handler.process(make_trace('0'))
+    handler.process(make_trace('1'))
+    replay = handler._iter_traces()
+    assert next(replay)[0].tag == '0'
+    handler.process(make_trace('2'))
+    assert [trace[0].tag for trace in replay] == ['1']
+    assert stored_tags(handler) == ['0', '1', '2']
+
+
+def test_flaten_trace_contains_spilled_traces():
+    handler = EnergyHandler(max_memory_samples=2)
+    for i in range(3):
+        handler.process(make_trace(str(i), 2))
+    assert [sample.tag for sample in handler._flaten_trace()] == ['0', '0', '1', '1', '2', '2']
+
+
+def test_clear_traces_remove_spilled_traces():
+    handler = EnergyHandler(max_memory_samples=1)
+    for i in range(3):
+        handler.process(make_trace(str(i)))
+    handler._clear_traces()
+    assert stored_tags(handler) == []
+    assert handler.spilled_trace_count == 0
+
+    handler.process(make_trace('foo'))
+    handler.process(make_trace('bar'))
+    assert stored_tags(handler) == ['foo', 'bar']
+
+
+def test_detached_traces_are_removed_from_handler():
+    handler = EnergyHandler(max_memory_samples=1)
+    for i in range(3):
+        handler.process(make_trace(str(i)))
+    stored = handler._detach_traces()
+    handler.process(make_trace('foo'))
+
+    assert [trace[0].tag for trace in stored] == ['0', '1', '2']
+    assert stored_tags(handler) == ['foo']
+    stored.close()
+
+
+def test_detached_traces_report_energy_domains_consistency():
+    handler = EnergyHandler(max_memory_samples=1)
+    assert handler._detach_traces().schema is None
+
+    handler.process(make_trace('foo'))
+    handler.process(ColumnarEnergyTrace(make_trace('bar')))
+    stored = handler._detach_traces()
+    assert stored.schema.names == ('d1',)
+    assert stored.consistent
+
+    handler.process(make_trace('foo'))
+    handler.process(EnergyTrace([EnergySample(1, 'baz', 1, {'d2': 1})]))
+    assert not handler._detach_traces().consistent
+
+
+def test_spilled_traces_are_read_once_when_detached_traces_are_iterated():
+    handler = EnergyHandler(max_memory_samples=0)
+    for i in range(3):
+        handler.process(make_trace(str(i)))
+    stored = handler._detach_traces()
+    with patch('pyJoules.handler.handler.pickle.load', wraps=pickle.load) as load:
+        assert [trace[0].tag for trace in stored] == ['0', '1', '2']
+    assert load.call_count == 3
+
+
+@pytest.mark.parametrize('max_memory_samples', [None, 0, 1, 3])
+def test_restored_traces_are_stored_before_traces_processed_since_detach(max_memory_samples):
+    handler = EnergyHandler(max_memory_samples=max_memory_samples)
+    for i in range(3):
+        handler.process(make_trace(str(i)))
+    stored = handler._detach_traces()
+    for i in range(3, 6):
+        handler.process(make_trace(str(i)))
+    handler._restore_traces(stored)
+    assert stored_tags(handler) == [str(i) for i in range(6)]
+
+
+def test_restored_traces_keep_energy_domains_consistency():
+    handler = EnergyHandler()
+    handler.process(make_trace('foo'))
+    stored = handler._detach_traces()
+    handler.process(EnergyTrace([EnergySample(1, 'baz', 1, {'d2': 1})]))
+    handler._restore_traces(stored)
+    assert not handler._detach_traces().consistent
+
+
+def test_spill_file_is_created_in_spill_directory(tmp_path):
+    handler = EnergyHandler(max_memory_samples=0, spill_directory=str(tmp_path))
+    with patch('pyJoules.handler.handler.tempfile.TemporaryFile', wraps=tempfile.TemporaryFile) as temporary_file:
+        handler.process(make_trace('foo'))
+    assert temporary_file.call_args.kwargs['dir'] == str(tmp_path)
+
+
+def test_create_handler_with_negative_memory_cap_raise_ValueError():
+    with pytest.raises(ValueError):
+        EnergyHandler(max_memory_samples=-1)
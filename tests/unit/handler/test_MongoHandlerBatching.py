@@ -0,0 +1,206 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+
+import pytest
+import pymongo
+
+from mock import patch, MagicMock
+
+from pyJoules.handler import UnconsistantSamplesError
+from pyJoules.handler.mongo_handler import MongoHandler, COLUMNAR_LAYOUT, iter_traces
+from pyJoules.energy_trace import EnergySample, EnergyTrace
+
+
+class FakeCollection:
+    """
+    collection that record the inserted documents and raise the given errors before inserting them
+    """
+    def __init__(self):
+        self.documents = []
+        self.calls = []
+        self.errors = []
+        self.inserted = threading.Event()
+
+    def insert_many(self, documents, ordered=True):
+        self.calls.append((len(documents), ordered))
+        if self.errors:
+            raise self.errors.pop(0)
+        self.documents += documents
+        self.inserted.set()
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
+
+
+@pytest.fixture
+def mongo_client(collection):
+    client = MagicMock()
+    client.__getitem__.return_value.__getitem__.return_value = collection
+    with patch('pymongo.MongoClient', return_value=client):
+        yield client
+
+
+@pytest.fixture
+def sleep():
+    with patch('pyJoules.handler.mongo_handler.time.sleep') as sleep_mock:
+        yield sleep_mock
+
+
+def make_trace(tag):
+    return EnergyTrace([EnergySample(1, tag, 2, {'d1': 1})])
+
+
+def sample_fields(sample):
+    return sample.timestamp, sample.tag, sample.duration, dict(sample.energy)
+
+
+def make_handler(**kwargs):
+    return MongoHandler('mongodb://localhost', 'db', 'col', **kwargs)
+
+
+def test_save_data_write_traces_by_batch_with_unordered_bulk_writes(mongo_client, collection):
+    handler = make_handler(batch_size=2)
+    for i in range(5):
+        handler.process(make_trace(str(i)))
+    handler.save_data()
+
+    assert collection.calls == [(2, False), (2, False), (1, False)]
+    assert [doc['name'] for doc in collection.documents] == ['trace_' + str(i) for i in range(5)]
+    assert handler.traces == []
+
+
+def test_save_data_without_processed_trace_does_not_write(mongo_client, collection):
+    make_handler().save_data()
+    assert collection.calls == []
+
+
+def test_auto_flush_save_data_when_batch_is_full(mongo_client, collection):
+    handler = make_handler(batch_size=2, auto_flush=True)
+    handler.process(make_trace('foo'))
+    assert collection.documents == []
+    handler.process(make_trace('bar'))
+    assert [doc['trace'][0]['tag'] for doc in collection.documents] == ['foo', 'bar']
+
+
+def test_transient_error_is_retried_with_backoff(mongo_client, collection, sleep):
+    collection.errors = [pymongo.errors.AutoReconnect(), pymongo.errors.AutoReconnect()]
+    handler = make_handler(retry_backoff=0.5)
+    handler.process(make_trace('foo'))
+    handler.save_data()
+
+    assert len(collection.documents) == 1
+    assert [call.args[0] for call in sleep.call_args_list] == [0.5, 1.0]
+
+
+def test_unsaved_traces_are_kept_when_retries_are_exhausted(mongo_client, collection, sleep):
+    collection.errors = [pymongo.errors.AutoReconnect()] * 3
+    handler = make_handler(max_retries=2)
+    handler.process(make_trace('foo'))
+    with pytest.raises(pymongo.errors.AutoReconnect):
+        handler.save_data()
+
+    handler.save_data()
+    assert [doc['name'] for doc in collection.documents] == ['trace_0']
+
+
+def test_duplicate_key_errors_of_retried_bulk_write_are_ignored(mongo_client, collection):
+    details = {'writeErrors': [{'code': 11000, 'index': 0}], 'writeConcernErrors': []}
+    collection.errors = [pymongo.errors.BulkWriteError(details)]
+    handler = make_handler()
+    handler.process(make_trace('foo'))
+    handler.save_data()
+    assert collection.calls == [(1, False)]
+
+
+def test_other_bulk_write_errors_are_raised(mongo_client, collection):
+    details = {'writeErrors': [{'code': 121, 'index': 0}], 'writeConcernErrors': []}
+    collection.errors = [pymongo.errors.BulkWriteError(details)]
+    handler = make_handler()
+    handler.process(make_trace('foo'))
+    with pytest.raises(pymongo.errors.BulkWriteError):
+        handler.save_data()
+
+
+def test_background_flusher_save_data_periodically(mongo_client, collection):
+    handler = make_handler(flush_interval=0.01)
+    handler.process(make_trace('foo'))
+    assert collection.inserted.wait(5)
+    handler.close()
+    assert len(collection.documents) == 1
+
+
+def test_close_save_remaining_traces(mongo_client, collection):
+    with make_handler(flush_interval=60) as handler:
+        handler.process(make_trace('foo'))
+    assert len(collection.documents) == 1
+
+
+def test_create_handler_with_non_positive_batch_size_raise_ValueError(mongo_client):
+    with pytest.raises(ValueError):
+        make_handler(batch_size=0)
+
+
+def test_columnar_layout_store_columnar_documents(mongo_client, collection):
+    handler = make_handler(layout=COLUMNAR_LAYOUT)
+    handler.process(make_trace('foo'))
+    handler.save_data()
+    assert collection.documents[0]['tags'] == ['foo']
+    assert collection.documents[0]['energy'] == {'d1': [1]}
+
+
+def test_iter_traces_read_traces_stored_with_both_layouts(mongo_client, collection):
+    for layout in ('row', COLUMNAR_LAYOUT):
+        handler = make_handler(layout=layout, trace_name_prefix=layout + '_')
+        handler.process(make_trace('foo'))
+        handler.save_data()
+    collection.find = lambda: iter(collection.documents)
+
+    traces = list(iter_traces(collection))
+    assert [name for name, _ in traces] == ['row_0', 'columnar_0']
+    assert [list(map(sample_fields, trace)) for _, trace in traces] == [[(1, 'foo', 2, {'d1': 1})]] * 2
+
+
+def test_create_handler_with_unknown_layout_raise_ValueError(mongo_client):
+    with pytest.raises(ValueError):
+        make_handler(layout='foo')
+
+
+def test_save_data_write_traces_spilled_to_disk(mongo_client, collection):
+    handler = make_handler(max_memory_samples=1)
+    for i in range(3):
+        handler.process(make_trace(str(i)))
+    assert handler.spilled_trace_count == 2
+    handler.save_data()
+    assert [doc['trace'][0]['tag'] for doc in collection.documents] == ['0', '1', '2']
+
+
+def test_traces_not_converted_are_kept_when_a_trace_cant_be_converted(mongo_client, collection):
+    handler = make_handler(layout=COLUMNAR_LAYOUT, max_memory_samples=1)
+    handler.process(make_trace('a'))
+    handler.process(EnergyTrace([EnergySample(1, 'bad', 2, {'d1': 1}), EnergySample(2, 'bad', 2, {'d2': 1})]))
+    handler.process(make_trace('c'))
+    with pytest.raises(UnconsistantSamplesError):
+        handler.save_data()
+    assert [doc['name'] for doc in collection.documents] == ['trace_0']
+    assert [trace[0].tag for trace in handler._iter_traces()] == ['bad', 'c']
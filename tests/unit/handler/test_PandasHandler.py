@@ -18,11 +18,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import threading
+
 import pytest
 import pandas
 
+from mock import patch
+
 from pyJoules.handler.pandas_handler import PandasHandler, NoSampleProcessedError, UnconsistantSamplesError
-from pyJoules.energy_trace import EnergySample, EnergyTrace
+from pyJoules.energy_trace import EnergySample, EnergyTrace, ColumnarEnergyTrace
 
 
 @pytest.fixture
@@ -129,3 +133,94 @@ def test_process_trace_with_two_different_sample_and_get_dataframe_must_raise_Un
         handler.process(bad_trace)
     
         df = handler.get_dataframe()
+
+
+def test_process_trace_with_other_domains_than_previous_traces_must_raise_UnconsistantSamplesError(trace1):
+    handler = PandasHandler()
+    handler.process(trace1)
+    with pytest.raises(UnconsistantSamplesError):
+        handler.process(EnergyTrace([EnergySample(2, 'toto', 3, {'d3': 3})]))
+    assert len(handler.get_dataframe()) == 1
+
+
+def test_processed_traces_are_stored_in_columns_and_not_in_traces(trace1):
+    handler = PandasHandler()
+    handler.process(trace1)
+    assert handler.traces == []
+    assert len(handler.get_dataframe()) == 1
+
+
+def test_get_dataframe_after_processing_new_trace_must_return_all_samples(trace1, trace2):
+    handler = PandasHandler()
+    handler.process(trace1)
+    assert len(handler.get_dataframe()) == 1
+    handler.process(trace2)
+    df = handler.get_dataframe()
+    assert list(df['tag']) == ['sample1', 'sample1', 'sample2']
+    assert list(df.index) == [0, 1, 2]
+
+
+def test_get_dataframe_two_times_without_new_trace_must_not_rebuild_dataframe(trace2):
+    handler = PandasHandler()
+    handler.process(trace2)
+    handler.get_dataframe()
+    with patch('pyJoules.handler.pandas_handler._ColumnBuffer.to_dataframe') as to_dataframe:
+        df = handler.get_dataframe()
+        to_dataframe.assert_not_called()
+    assert len(df) == 2
+
+
+def test_process_columnar_trace_and_get_dataframe_must_return_good_values(trace2):
+    handler = PandasHandler()
+    handler.process(ColumnarEnergyTrace(trace2))
+    df = handler.get_dataframe()
+    assert list(df['timestamp']) == [1, 2]
+    assert list(df['tag']) == ['sample1', 'sample2']
+    assert list(df['d2']) == [2, 4]
+
+
+def test_categorical_tags_must_produce_categorical_tag_column(trace1, trace2):
+    handler = PandasHandler(categorical_tags=True)
+    handler.process(trace1)
+    handler.get_dataframe()
+    handler.process(EnergyTrace([EnergySample(3, 'sample3', 3, {'d1': 3, 'd2': 4})]))
+    df = handler.get_dataframe()
+    assert isinstance(df['tag'].dtype, pandas.CategoricalDtype)
+    assert list(df['tag']) == ['sample1', 'sample3']
+
+
+def test_energy_dtype_must_be_used_for_energy_columns(trace2):
+    handler = PandasHandler(energy_dtype='float32')
+    handler.process(trace2)
+    df = handler.get_dataframe()
+    assert df['d1'].dtype == 'float32'
+    assert df['d2'].dtype == 'float32'
+    assert df['duration'].dtype == 'float64'
+
+
+def test_process_empty_trace_and_get_dataframe_must_return_empty_dataframe():
+    handler = PandasHandler()
+    handler.process(EnergyTrace([]))
+    assert len(handler.get_dataframe()) == 0
+
+
+def test_traces_processed_concurrently_must_produce_consistent_rows():
+    traces = [EnergyTrace([EnergySample(t, str(t), 1, {'d1': t, 'd2': -t}) for t in range(offset, offset + 5000)])
+              for offset in range(0, 40000, 5000)]
+    handler = PandasHandler()
+
+    def process_traces(thread_traces):
+        for trace in thread_traces:
+            handler.process(trace)
+
+    threads = [threading.Thread(target=process_traces, args=(traces[i::2],)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    df = handler.get_dataframe()
+    assert len(df) == 40000
+    assert (df['tag'] == df['timestamp'].astype(int).astype(str)).all()
+    assert (df['d1'] == df['timestamp']).all()
+    assert (df['d2'] == -df['timestamp']).all()
@@ -19,8 +19,9 @@
 # SOFTWARE.
 import pytest
 
-from pyJoules.handler.mongo_handler import trace_to_dict
-from pyJoules.energy_trace import EnergySample
+from pyJoules.handler import UnconsistantSamplesError
+from pyJoules.handler.mongo_handler import trace_to_dict, trace_to_columnar_dict, dict_to_trace
+from pyJoules.energy_trace import EnergySample, EnergyTrace, ColumnarEnergyTrace
 
 @pytest.fixture
 def sample1():
@@ -72,3 +73,50 @@ def test_converting_two_trace_sample_to_dict_must_return_dict_with_correct_value
     assert d['trace'][1]['tag'] == sample2.tag
     assert d['trace'][1]['duration'] == sample2.duration
     assert d['trace'][1]['energy'] == sample2.energy
+
+
+def test_converting_trace_to_columnar_dict_must_return_dict_with_one_array_per_field(sample1, sample2):
+    d = trace_to_columnar_dict([sample1, sample2], 'trace1')
+    assert d['name'] == 'trace1'
+    assert d['timestamps'] == [1, 2]
+    assert d['tags'] == ['sample1', 'sample2']
+    assert d['durations'] == [2, 3]
+    assert d['energy'] == {'d1': [1, 3], 'd2': [2, 4]}
+
+
+def test_converting_trace_to_columnar_dict_must_return_dict_with_trace_totals(sample1, sample2):
+    d = trace_to_columnar_dict([sample1, sample2], 'trace1')
+    assert d['total'] == {'duration': 5, 'energy': {'d1': 4, 'd2': 6}}
+
+
+def test_converting_columnar_trace_to_columnar_dict_must_return_same_dict(sample1, sample2):
+    d = trace_to_columnar_dict(ColumnarEnergyTrace([sample1, sample2]), 'trace1')
+    assert d == trace_to_columnar_dict([sample1, sample2], 'trace1')
+
+
+def test_converting_empty_list_to_columnar_dict_must_return_dict_with_empty_arrays():
+    d = trace_to_columnar_dict([], 'trace1')
+    assert d['timestamps'] == []
+    assert d['energy'] == {}
+
+
+def test_converting_inconsistent_trace_to_columnar_dict_must_raise_UnconsistantSamplesError(sample1):
+    with pytest.raises(UnconsistantSamplesError):
+        trace_to_columnar_dict([sample1, EnergySample(2, 'sample2', 3, {'d1': 3, 'd3': 4})], 'trace1')
+
+
+def sample_fields(sample):
+    return sample.timestamp, sample.tag, sample.duration, dict(sample.energy)
+
+
+@pytest.mark.parametrize('to_dict', [trace_to_dict, trace_to_columnar_dict])
+@pytest.mark.parametrize('columnar', [False, True])
+def test_converting_dict_to_trace_must_return_the_converted_trace(to_dict, columnar, sample1, sample2):
+    trace = dict_to_trace(to_dict([sample1, sample2], 'trace1'), columnar)
+    assert isinstance(trace, ColumnarEnergyTrace if columnar else EnergyTrace)
+    assert list(map(sample_fields, trace)) == [sample_fields(sample1), sample_fields(sample2)]
+
+
+def test_converting_dict_with_unknown_layout_to_trace_must_raise_ValueError():
+    with pytest.raises(ValueError):
+        dict_to_trace({'name': 'trace1', 'layout': 'foo'})
@@ -0,0 +1,52 @@
+# MIT License
+# Copyright (c) 2019, INRIA
+# Copyright (c) 2019, University of Lille
+# All rights reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import subprocess
+import sys
+import pytest
+
+# cumulated import time budget of pyJoules modules, in microseconds
+IMPORT_TIME_BUDGET = 150000
+
+OPTIONAL_DEPENDENCIES = ['numpy', 'pandas', 'pymongo', 'pynvml']
+
+PYJOULES_MODULES = ['pyJoules.energy_meter', 'pyJoules.handler.csv_handler', 'pyJoules.handler.pandas_handler',
+                    'pyJoules.handler.mongo_handler']
+
+
+def _run_python(code, *options):
+    return subprocess.run([sys.executable, *options, '-c', code], capture_output=True, text=True, check=True)
+
+
+@pytest.mark.parametrize('module_name', PYJOULES_MODULES)
+def test_import_pyjoules_module_dont_import_optional_dependencies(module_name):
+    result = _run_python('import sys, ' + module_name + '; print(" ".join(sys.modules))')
+    loaded_modules = result.stdout.split()
+    for dependency in OPTIONAL_DEPENDENCIES:
+        assert dependency not in loaded_modules
+
+
+def test_import_energy_meter_fit_in_import_time_budget():
+    result = _run_python('import pyJoules.energy_meter', '-X', 'importtime')
+    for line in result.stderr.splitlines():
+        _, cumulative_time, module_name = line.split('|')
+        if module_name.strip() == 'pyJoules.energy_meter':
+            assert int(cumulative_time) < IMPORT_TIME_BUDGET
+            return
+    pytest.fail('pyJoules.energy_meter import time not found')
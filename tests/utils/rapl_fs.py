@@ -24,6 +24,7 @@ import pytest
 import pyfakefs
 
 from pyJoules.device.rapl_device import RaplDevice
+from pyJoules.device.rapl_topology import clear_topology_cache
 from .fake_api import FakeAPI
 
 
@@ -49,16 +50,22 @@ CORE_1_DIR_NAME = SOCKET_1_DIR_NAME + '/intel-rapl:1:1'
 CORE_0_FILE_NAME = CORE_0_DIR_NAME + '/energy_uj'
 CORE_1_FILE_NAME = CORE_1_DIR_NAME + '/energy_uj'
 
+PKG_MAX_ENERGY_RANGE = 262143328850
+DRAM_MAX_ENERGY_RANGE = 65712999613
+
 
 class RaplFS(FakeAPI):
 
     def __init__(self, fs):
+        clear_topology_cache()
         self.fs = fs
         self.domains_current_energy = {}
         self.domains_energy_file = {}
 
-    def add_domain(self, domain_dir_name, domain_name, domain_id):
+    def add_domain(self, domain_dir_name, domain_name, domain_id, max_energy_range=None):
         self.fs.create_file(domain_dir_name + '/name', contents=domain_name + '\n')
+        if max_energy_range is not None:
+            self.fs.create_file(domain_dir_name + '/max_energy_range_uj', contents=str(max_energy_range) + '\n')
         energy_value = random.random()
         self.fs.create_file(domain_dir_name + '/energy_uj', contents=str(energy_value) + '\n')
         self.domains_energy_file[domain_id] = domain_dir_name + '/energy_uj'
@@ -119,6 +126,18 @@ def fs_pkg_psys_one_socket(fs):
     return rapl_fs
 
 
+@pytest.fixture
+def fs_pkg_dram_one_socket_with_max_range(fs):
+    """
+    filesystem describing a machine with one CPU and RAPL API for package and dram, exposing the energy counters ranges
+    """
+    rapl_fs = RaplFS(fs)
+    rapl_fs.add_domain(SOCKET_0_DIR_NAME, 'package-0', 'package_0', max_energy_range=PKG_MAX_ENERGY_RANGE)
+    rapl_fs.add_domain(DRAM_0_DIR_NAME, 'dram', 'dram_0', max_energy_range=DRAM_MAX_ENERGY_RANGE)
+    rapl_fs.reset_values()
+    return rapl_fs
+
+
 @pytest.fixture
 def fs_pkg_dram_core_one_socket(fs):
     """